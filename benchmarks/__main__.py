@@ -0,0 +1,80 @@
+import argparse
+import dataclasses
+import json
+import os
+import platform
+import sys
+import tempfile
+from pathlib import Path
+
+from benchmarks.corpus import CorpusSpec, generate_corpus
+from benchmarks.scenarios import SCENARIOS, BenchmarkContext
+from foogle.engine import weighting
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description='Search engine'
+                                                 ' benchmarks')
+    defaults = CorpusSpec()
+    for spec_field in dataclasses.fields(CorpusSpec):
+        parser.add_argument(f'--{spec_field.name.replace("_", "-")}',
+                            type=spec_field.type,
+                            default=getattr(defaults, spec_field.name),
+                            help=f'Corpus {spec_field.name}')
+    parser.add_argument('--rounds', type=int, default=3,
+                        help='Repetitions of build and load scenarios')
+    parser.add_argument('--queries', type=int, default=200,
+                        help='Queries per query shape')
+    parser.add_argument('--workers', type=int, default=os.cpu_count(),
+                        help='Workers of the parallel build scenario')
+    parser.add_argument('--scenarios', nargs='+', choices=list(SCENARIOS),
+                        default=list(SCENARIOS), help='Scenarios to run')
+    parser.add_argument('--output', help='Write JSON results to the file')
+    parser.add_argument('--baseline', help='JSON results to compare with')
+    return parser.parse_args()
+
+
+def compare(results: dict, baseline: dict):
+    for name, metrics in results['results'].items():
+        baseline_metrics = baseline['results'].get(name, {})
+        for metric, value in metrics.items():
+            if metric not in baseline_metrics:
+                continue
+            old_value = baseline_metrics[metric]
+            ratio = value / old_value if old_value else float('inf')
+            print(f'{name}.{metric}: {old_value:.4g} -> {value:.4g}'
+                  f' ({ratio:.2f}x)', file=sys.stderr)
+
+
+def main():
+    args = parse_args()
+    spec = CorpusSpec(**{spec_field.name: getattr(args, spec_field.name)
+                         for spec_field in dataclasses.fields(CorpusSpec)})
+    results = {'spec': dataclasses.asdict(spec),
+               'environment': {'python': platform.python_version(),
+                               'platform': platform.platform(),
+                               'numpy': weighting.NUMPY_AVAILABLE,
+                               'cpu_count': os.cpu_count()},
+               'results': {}}
+    cwd = Path.cwd()
+    with tempfile.TemporaryDirectory() as workdir:
+        root = Path(workdir) / 'corpus'
+        generate_corpus(root, spec)
+        context = BenchmarkContext(root, spec, args.rounds, args.queries,
+                                   args.workers)
+        os.chdir(workdir)
+        try:
+            for name in args.scenarios:
+                results['results'][name] = SCENARIOS[name](context)
+        finally:
+            os.chdir(cwd)
+    output = json.dumps(results, indent=2)
+    if args.output:
+        Path(args.output).write_text(output)
+    else:
+        print(output)
+    if args.baseline:
+        compare(results, json.loads(Path(args.baseline).read_text()))
+
+
+main()
@@ -0,0 +1,65 @@
+import itertools
+import math
+import random
+import string
+from dataclasses import dataclass
+from pathlib import Path
+from typing import List
+
+
+@dataclass
+class CorpusSpec:
+    files: int = 1000
+    mean_size: int = 4096
+    size_sigma: float = 1.0
+    vocabulary: int = 5000
+    zipf_exponent: float = 1.1
+    binary_ratio: float = 0.05
+    directories: int = 20
+    seed: int = 0
+
+
+class Vocabulary:
+
+    def __init__(self, size: int, zipf_exponent: float):
+        self.words = [self.word(rank) for rank in range(size)]
+        weights = [1 / (rank + 1) ** zipf_exponent for rank in range(size)]
+        self.cum_weights = list(itertools.accumulate(weights))
+
+    @staticmethod
+    def word(rank: int) -> str:
+        letters = []
+        rank += 1
+        while rank:
+            rank, letter = divmod(rank - 1, len(string.ascii_lowercase))
+            letters.append(string.ascii_lowercase[letter])
+        return 'w' + ''.join(reversed(letters))
+
+    def sample(self, generator: random.Random, count: int) -> List[str]:
+        return generator.choices(self.words, cum_weights=self.cum_weights,
+                                 k=count)
+
+
+def generate_corpus(root: Path, spec: CorpusSpec) -> List[Path]:
+    generator = random.Random(spec.seed)
+    vocabulary = Vocabulary(spec.vocabulary, spec.zipf_exponent)
+    mean_log_size = max(0.0, math.log(spec.mean_size) -
+                        spec.size_sigma ** 2 / 2)
+    paths = []
+    for i in range(spec.files):
+        directory = root / f'dir{generator.randrange(spec.directories)}'
+        directory.mkdir(parents=True, exist_ok=True)
+        size = max(1, int(generator.lognormvariate(mean_log_size,
+                                                   spec.size_sigma)))
+        path = directory / f'file{i}.txt'
+        if generator.random() < spec.binary_ratio:
+            path = path.with_suffix('.bin')
+            noise = generator.getrandbits(size * 8).to_bytes(size, 'little')
+            path.write_bytes(b'\x00' + noise)
+        else:
+            words = vocabulary.sample(generator, max(1, size // 6))
+            lines = (' '.join(words[j:j + 12])
+                     for j in range(0, len(words), 12))
+            path.write_text('\n'.join(lines))
+        paths.append(path)
+    return paths
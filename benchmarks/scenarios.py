@@ -0,0 +1,222 @@
+import random
+import statistics
+import time
+import tracemalloc
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Callable, Dict, Iterable, List, Optional
+
+from benchmarks.corpus import CorpusSpec, Vocabulary
+from foogle.engine import weighting
+from foogle.engine.cache import QueryCache
+from foogle.engine.search_engine import SearchEngine
+
+QUERY_SHAPES = {
+    'single': '{}',
+    'and': '{} && {}',
+    'not': '{} && -{}',
+    'or': '{} || {}'
+}
+
+PATH_SHAPES = {
+    'substring': 'file{}.',
+    'glob': 'file{}*.txt'
+}
+
+RANKING_SHAPES = ('single', 'or')
+
+RANKING_LIMITS: Dict[str, Optional[int]] = {
+    'top10': 10,
+    'all': None
+}
+
+EXTERNAL_MEMORY_BUDGET = 16 * 2 ** 20
+
+SCENARIOS: Dict[str, Callable[['BenchmarkContext'], Dict[str, float]]] = {}
+
+
+@dataclass
+class BenchmarkContext:
+    root: Path
+    spec: CorpusSpec
+    rounds: int = 3
+    queries: int = 200
+    workers: int = 4
+
+    @property
+    def corpus_bytes(self) -> int:
+        return sum(path.stat().st_size for path in self.root.rglob('*')
+                   if path.is_file())
+
+    def engine(self) -> SearchEngine:
+        return SearchEngine(cache=QueryCache(max_size=0))
+
+    def built_engine(self) -> SearchEngine:
+        engine = self.engine()
+        engine.build_index(str(self.root), '')
+        return engine
+
+
+def scenario(name: str):
+    def register(function):
+        SCENARIOS[name] = function
+        return function
+    return register
+
+
+def summarize(samples: List[float]) -> Dict[str, float]:
+    ordered = sorted(samples)
+
+    def percentile(fraction: float) -> float:
+        return ordered[min(len(ordered) - 1, int(fraction * len(ordered)))]
+
+    return {'mean_ms': statistics.mean(ordered) * 1000,
+            'min_ms': ordered[0] * 1000,
+            'p50_ms': percentile(0.5) * 1000,
+            'p90_ms': percentile(0.9) * 1000,
+            'p99_ms': percentile(0.99) * 1000,
+            'max_ms': ordered[-1] * 1000}
+
+
+def timed(function: Callable[[], object], rounds: int) -> List[float]:
+    samples = []
+    for _ in range(rounds):
+        start = time.perf_counter()
+        function()
+        samples.append(time.perf_counter() - start)
+    return samples
+
+
+def build_metrics(context: BenchmarkContext,
+                  samples: List[float]) -> Dict[str, float]:
+    best = min(samples)
+    return dict(summarize(samples),
+                files_per_second=context.spec.files / best,
+                megabytes_per_second=context.corpus_bytes / best / 2 ** 20)
+
+
+@scenario('build')
+def build(context: BenchmarkContext) -> Dict[str, float]:
+    engine = context.engine()
+    samples = timed(lambda: engine.build_index(str(context.root), ''),
+                    context.rounds)
+    return build_metrics(context, samples)
+
+
+@scenario('build_parallel')
+def build_parallel(context: BenchmarkContext) -> Dict[str, float]:
+    engine = context.engine()
+    samples = timed(lambda: engine.build_index(str(context.root), '',
+                                               context.workers),
+                    context.rounds)
+    return dict(build_metrics(context, samples), workers=context.workers)
+
+
+@scenario('build_external')
+def build_external(context: BenchmarkContext) -> Dict[str, float]:
+    engine = context.engine()
+
+    def build():
+        engine.build_index(str(context.root), '',
+                           memory_budget=EXTERNAL_MEMORY_BUDGET)
+
+    samples = timed(build, context.rounds)
+    tracemalloc.start()
+    before, _ = tracemalloc.get_traced_memory()
+    build()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return dict(build_metrics(context, samples),
+                build_peak_bytes=peak - before,
+                memory_budget_bytes=EXTERNAL_MEMORY_BUDGET)
+
+
+@scenario('index_size')
+def index_size(context: BenchmarkContext) -> Dict[str, float]:
+    tracemalloc.start()
+    before, _ = tracemalloc.get_traced_memory()
+    engine = context.built_engine()
+    after, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    engine.save_index()
+    on_disk = Path('search_index').stat().st_size
+    return {'in_memory_bytes': after - before,
+            'build_peak_bytes': peak - before,
+            'on_disk_bytes': on_disk,
+            'on_disk_to_corpus_ratio': on_disk / context.corpus_bytes}
+
+
+@scenario('load')
+def load(context: BenchmarkContext) -> Dict[str, float]:
+    context.built_engine().save_index()
+    engine = context.engine()
+    samples = timed(engine.load_index, max(context.rounds, 10))
+    return summarize(samples)
+
+
+def sample_queries(context: BenchmarkContext,
+                   shapes: Iterable[str]) -> Dict[str, List[str]]:
+    vocabulary = Vocabulary(context.spec.vocabulary,
+                            context.spec.zipf_exponent)
+    generator = random.Random(context.spec.seed)
+    sampled = {}
+    for shape in shapes:
+        queries = []
+        for _ in range(context.queries):
+            words = vocabulary.sample(generator, 2)
+            if words[0] == words[1]:
+                words[1] = vocabulary.words[-1]
+            queries.append(QUERY_SHAPES[shape].format(*words))
+        sampled[shape] = queries
+    return sampled
+
+
+@scenario('query')
+def query(context: BenchmarkContext) -> Dict[str, float]:
+    engine = context.built_engine()
+    metrics = {}
+    for shape, queries in sample_queries(context, QUERY_SHAPES).items():
+        samples = []
+        for raw_query in queries:
+            start = time.perf_counter()
+            engine.search(raw_query)
+            samples.append(time.perf_counter() - start)
+        for name, value in summarize(samples).items():
+            metrics[f'{shape}_{name}'] = value
+    return metrics
+
+
+@scenario('ranking')
+def ranking(context: BenchmarkContext) -> Dict[str, float]:
+    engine = context.built_engine()
+    modes = ['python'] + (['numpy'] if weighting.NUMPY_AVAILABLE else [])
+    metrics = {}
+    for shape, queries in sample_queries(context, RANKING_SHAPES).items():
+        for mode in modes:
+            engine.use_numpy = mode == 'numpy'
+            for limit_name, limit in RANKING_LIMITS.items():
+                samples = []
+                for raw_query in queries:
+                    start = time.perf_counter()
+                    engine.search_page(raw_query, 0, limit)
+                    samples.append(time.perf_counter() - start)
+                for name, value in summarize(samples).items():
+                    metrics[f'{mode}_{shape}_{limit_name}_{name}'] = value
+    return metrics
+
+
+@scenario('path_query')
+def path_query(context: BenchmarkContext) -> Dict[str, float]:
+    engine = context.built_engine()
+    generator = random.Random(context.spec.seed)
+    metrics = {}
+    for shape, template in PATH_SHAPES.items():
+        samples = []
+        for _ in range(context.queries):
+            pattern = template.format(generator.randrange(context.spec.files))
+            start = time.perf_counter()
+            engine.search_paths(pattern)
+            samples.append(time.perf_counter() - start)
+        for name, value in summarize(samples).items():
+            metrics[f'{shape}_{name}'] = value
+    return metrics
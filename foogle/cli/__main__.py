@@ -1,14 +1,37 @@
 import argparse
+from pathlib import Path
 
+from foogle.daemon.client import DaemonClient, SOCKET_PATH
+from foogle.engine.errors import SearcherError
 from .cli import SearchEngineShell
 
 
 def parse_args():
     parser = argparse.ArgumentParser(description='Search engine'
                                                  ' cli interface')
-    return parser.parse_args().__dict__
+    parser.add_argument('--connect', help='Send commands to a running'
+                                          ' search daemon',
+                        action='store_true')
+    parser.add_argument('--socket', help='Search daemon socket path',
+                        type=Path, default=SOCKET_PATH)
+    parser.add_argument('command', nargs=argparse.REMAINDER,
+                        help='Run one command and exit')
+    return parser.parse_args()
 
 
-parse_args()
-shell = SearchEngineShell()
-shell.cmdloop()
+def controller_for(args):
+    if args.connect:
+        return DaemonClient(args.socket)
+    from foogle.engine.controller import Controller
+    return Controller()
+
+
+args = parse_args()
+try:
+    shell = SearchEngineShell(controller_for(args))
+except SearcherError as e:
+    raise SystemExit(e.message)
+if args.command:
+    shell.onecmd(' '.join(args.command))
+else:
+    shell.cmdloop()
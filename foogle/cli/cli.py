@@ -1,25 +1,89 @@
 import cmd
 
-from foogle.engine.controller import Controller
-
 
 class SearchEngineShell(cmd.Cmd):
     intro = 'Welcome to the search engine shell. ' \
             'Type help or ? to list commands.\n'
     prompt = '> '
 
-    def __init__(self):
+    def __init__(self, controller):
         super().__init__()
-        self.controller = Controller()
+        self.controller = controller
+        self.limit = ''
 
     def do_search(self, arg):
-        print(self.controller.execute('search', arg))
+        print(self.controller.execute('search', arg, self.limit))
+
+    def do_search_paths(self, arg):
+        print(self.controller.execute('search_paths', arg.strip(),
+                                      self.limit))
+
+    def do_explain(self, arg):
+        print(self.controller.execute('explain', arg))
+
+    def do_limit(self, arg):
+        self.limit = arg.strip()
+        print(f'Search results limit: {self.limit or "none"}')
 
     def do_load_index(self, arg):
         print(self.controller.execute('load_index'))
 
+    def do_update_index(self, arg):
+        print(self.controller.execute('update_index'))
+
     def do_save_index(self, arg):
         print(self.controller.execute('save_index'))
 
     def do_build_index(self, arg):
         print(self.controller.execute('build_index', *arg.split(' ')))
+
+    def do_start_build(self, arg):
+        print(self.controller.execute('start_build', *arg.split(' ')))
+
+    def do_build_status(self, arg):
+        print(self.controller.execute('build_status', arg.strip()))
+
+    def do_cancel_build(self, arg):
+        print(self.controller.execute('cancel_build', arg.strip()))
+
+    def do_index_size(self, arg):
+        print(self.controller.execute('index_size'))
+
+    def do_add_shard(self, arg):
+        print(self.controller.execute('add_shard', *arg.split(' ')))
+
+    def do_remove_shard(self, arg):
+        print(self.controller.execute('remove_shard', arg.strip()))
+
+    def do_list_shards(self, arg):
+        print(self.controller.execute('list_shards'))
+
+    def do_update_shards(self, arg):
+        print(self.controller.execute('update_shards'))
+
+    def do_save_shards(self, arg):
+        print(self.controller.execute('save_shards'))
+
+    def do_load_shards(self, arg):
+        print(self.controller.execute('load_shards'))
+
+    def do_search_shards(self, arg):
+        print(self.controller.execute('search_shards', arg, self.limit))
+
+    def do_start_watch(self, arg):
+        print(self.controller.execute('start_watch', *arg.split()))
+
+    def do_watch_status(self, arg):
+        print(self.controller.execute('watch_status'))
+
+    def do_stop_watch(self, arg):
+        print(self.controller.execute('stop_watch'))
+
+    def do_cache_stats(self, arg):
+        print(self.controller.execute('cache_stats'))
+
+    def do_stats(self, arg):
+        print(self.controller.execute('stats', arg.strip()))
+
+    def do_ranking(self, arg):
+        print(self.controller.execute('ranking', arg.strip()))
@@ -0,0 +1,54 @@
+import argparse
+import signal
+import threading
+from pathlib import Path
+
+from foogle.daemon.client import SOCKET_PATH
+from foogle.daemon.server import DaemonServer
+from foogle.engine.errors import SearcherError
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description='Search engine daemon'
+                                                 ' on a Unix socket')
+    parser.add_argument('--socket', help='Unix socket path', type=Path,
+                        default=SOCKET_PATH)
+    parser.add_argument('--load-index', help='Load saved index on start',
+                        action='store_true')
+    parser.add_argument('--watch', help='Apply file changes under the'
+                                        ' loaded index root as they happen',
+                        action='store_true')
+    parser.add_argument('--metrics', help='Collect build and search'
+                                          ' metrics', action='store_true')
+    parser.add_argument('--numpy', help='Rank with NumPy instead of'
+                                        ' MaxScore top-k pruning',
+                        action='store_true')
+    return parser.parse_args()
+
+
+def run_daemon(socket: Path, load_index: bool = False, watch: bool = False,
+               metrics: bool = False, numpy: bool = False):
+    try:
+        server = DaemonServer(socket)
+    except SearcherError as e:
+        raise SystemExit(e.message)
+    if metrics:
+        server.execute(['stats', 'enable'])
+    if numpy:
+        print(server.execute(['ranking', 'numpy']))
+    if load_index:
+        print(server.execute(['load_index']))
+    if watch:
+        print(server.execute(['start_watch']))
+    signal.signal(signal.SIGTERM, lambda *_: threading.Thread(
+        target=server.shutdown, daemon=True).start())
+    print(f'Search daemon listening on {server.socket_path}')
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+
+
+run_daemon(**parse_args().__dict__)
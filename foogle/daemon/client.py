@@ -0,0 +1,55 @@
+import os
+import socket
+import tempfile
+from pathlib import Path
+from typing import Optional
+
+from foogle.daemon.protocol import recv_frame, send_frame
+from foogle.engine.errors import DaemonNotRunning
+
+SOCKET_NAME = 'foogle.sock'
+
+
+def default_socket_path() -> Path:
+    if os.environ.get('FOOGLE_SOCKET'):
+        return Path(os.environ['FOOGLE_SOCKET']).absolute()
+    if os.environ.get('XDG_RUNTIME_DIR'):
+        return Path(os.environ['XDG_RUNTIME_DIR']) / SOCKET_NAME
+    return Path(tempfile.gettempdir()) / f'foogle-{os.getuid()}.sock'
+
+
+SOCKET_PATH = default_socket_path()
+
+
+class DaemonClient:
+
+    def __init__(self, socket_path: Path = SOCKET_PATH,
+                 timeout: Optional[float] = None):
+        self.socket_path = socket_path
+        self.connection = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        self.connection.settimeout(timeout)
+        try:
+            self.connection.connect(str(socket_path))
+        except OSError:
+            self.connection.close()
+            raise DaemonNotRunning(str(socket_path))
+
+    def execute(self, command: str, *args) -> str:
+        try:
+            send_frame(self.connection, {'cwd': os.getcwd(),
+                                         'command': [command, *args]})
+            response = recv_frame(self.connection)
+        except OSError:
+            response = None
+        if response is None:
+            return DaemonNotRunning(str(self.socket_path)).message
+        return response
+
+    def close(self):
+        self.connection.close()
+
+    def __enter__(self) -> 'DaemonClient':
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
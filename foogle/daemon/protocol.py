@@ -0,0 +1,35 @@
+import json
+import socket
+import struct
+from typing import Optional
+
+FRAME_HEADER = struct.Struct('>I')
+MAX_FRAME = 64 * 2 ** 20
+
+
+def send_frame(connection: socket.socket, payload: object):
+    data = json.dumps(payload, separators=(',', ':')).encode()
+    connection.sendall(FRAME_HEADER.pack(len(data)) + data)
+
+
+def recv_frame(connection: socket.socket) -> Optional[object]:
+    header = recv_exactly(connection, FRAME_HEADER.size)
+    if header is None:
+        return None
+    length, = FRAME_HEADER.unpack(header)
+    if length > MAX_FRAME:
+        raise ValueError(f'frame of {length} bytes is too large')
+    data = recv_exactly(connection, length)
+    if data is None:
+        return None
+    return json.loads(data)
+
+
+def recv_exactly(connection: socket.socket, size: int) -> Optional[bytes]:
+    buffer = bytearray()
+    while len(buffer) < size:
+        chunk = connection.recv(size - len(buffer))
+        if not chunk:
+            return None
+        buffer += chunk
+    return bytes(buffer)
@@ -0,0 +1,130 @@
+import json
+import os
+import socket
+import socketserver
+import stat
+import threading
+from pathlib import Path
+from typing import Iterator, List, Optional, Tuple
+
+from foogle.daemon.client import SOCKET_PATH
+from foogle.daemon.protocol import recv_frame, send_frame
+from foogle.engine.controller import Controller
+from foogle.engine.errors import DaemonAlreadyRunning, NotASocket
+from foogle.engine.search_engine import INDEX_PATH
+from foogle.engine.shards import SHARDS_PATH
+
+SHUTDOWN_COMMAND = 'shutdown'
+PING_COMMAND = 'ping'
+PATH_ARGUMENTS = {'build_index': 2, 'start_build': 2, 'add_shard': 2,
+                  'remove_shard': 1, 'load_index': 1, 'save_index': 1,
+                  'index_size': 1, 'save_shards': 1, 'load_shards': 1}
+DEFAULT_PATHS = {'load_index': INDEX_PATH, 'save_index': INDEX_PATH,
+                 'index_size': INDEX_PATH, 'save_shards': SHARDS_PATH,
+                 'load_shards': SHARDS_PATH}
+
+
+def unpack(request: object) -> Tuple[object, Optional[Path]]:
+    if not isinstance(request, dict):
+        return request, None
+    cwd = request.get('cwd')
+    return request.get('command'), Path(cwd) if isinstance(cwd, str) \
+        else None
+
+
+def resolve_paths(command: str, args: List, cwd: Optional[Path]) -> List:
+    if cwd is None:
+        return args
+    args = list(args)
+    if command in DEFAULT_PATHS and not args:
+        args.append(str(DEFAULT_PATHS[command]))
+    for i in range(min(PATH_ARGUMENTS.get(command, 0), len(args))):
+        if isinstance(args[i], str) and args[i]:
+            args[i] = os.path.join(cwd, args[i])
+    return args
+
+
+def render(result: object) -> str:
+    if isinstance(result, str):
+        return result
+    if isinstance(result, Iterator):
+        return '\n'.join(render(batch) for batch in result)
+    if isinstance(result, list):
+        return '\n'.join(json.dumps(item.as_dict()) for item in result)
+    return str(result)
+
+
+class CommandHandler(socketserver.StreamRequestHandler):
+    server: 'DaemonServer'
+
+    def handle(self):
+        while True:
+            try:
+                request = recv_frame(self.connection)
+            except (OSError, ValueError):
+                return
+            if request is None:
+                return
+            request, cwd = unpack(request)
+            send_frame(self.connection, self.server.execute(request, cwd))
+            if request == [SHUTDOWN_COMMAND]:
+                return
+
+
+class DaemonServer(socketserver.ThreadingMixIn,
+                   socketserver.UnixStreamServer):
+    daemon_threads = True
+
+    def __init__(self, socket_path: Path = SOCKET_PATH,
+                 controller: Optional[Controller] = None):
+        self.socket_path = socket_path.absolute()
+        self.controller = controller or Controller()
+        remove_stale_socket(self.socket_path)
+        super().__init__(str(self.socket_path), CommandHandler)
+        os.chmod(self.socket_path, 0o600)
+
+    def execute(self, request: object, cwd: Optional[Path] = None) -> str:
+        if not isinstance(request, list) or not request or \
+                not isinstance(request[0], str):
+            return 'error: request must be a command followed by arguments'
+        command, *args = request
+        args = resolve_paths(command, args, cwd)
+        if command == PING_COMMAND:
+            return 'pong'
+        if command == SHUTDOWN_COMMAND:
+            threading.Thread(target=self.shutdown, daemon=True).start()
+            return 'Search daemon stopped'
+        if command not in self.controller.commands:
+            return f'error: unknown command "{command}"'
+        try:
+            return render(self.controller.execute(command, *args))
+        except Exception as e:
+            return f'error: {e}'
+
+    def server_close(self):
+        watcher = self.controller.watcher
+        if watcher is not None and watcher.running:
+            watcher.stop()
+        super().server_close()
+        try:
+            self.socket_path.unlink()
+        except FileNotFoundError:
+            pass
+
+
+def remove_stale_socket(socket_path: Path):
+    try:
+        mode = socket_path.lstat().st_mode
+    except FileNotFoundError:
+        return
+    if not stat.S_ISSOCK(mode):
+        raise NotASocket(str(socket_path))
+    probe = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    try:
+        probe.connect(str(socket_path))
+    except OSError:
+        socket_path.unlink()
+        return
+    finally:
+        probe.close()
+    raise DaemonAlreadyRunning(str(socket_path))
@@ -0,0 +1,41 @@
+import codecs
+import threading
+from pathlib import Path
+
+import magic
+
+BINARY = 'binary'
+ASCII = 'us-ascii'
+UTF8 = 'utf-8'
+PREFIX_SIZE = 8192
+UNICODE_BOMS = (codecs.BOM_UTF32_LE, codecs.BOM_UTF32_BE,
+                codecs.BOM_UTF16_LE, codecs.BOM_UTF16_BE)
+MAX_UTF8_CHAR_SIZE = 4
+
+local = threading.local()
+
+
+def magic_handle() -> magic.Magic:
+    handle = getattr(local, 'magic', None)
+    if handle is None:
+        handle = local.magic = magic.Magic(mime_encoding=True)
+    return handle
+
+
+def classify(path: Path, size: int) -> str:
+    with path.open('rb') as f:
+        prefix = f.read(PREFIX_SIZE)
+    if prefix.startswith(UNICODE_BOMS):
+        return magic_handle().from_file(str(path))
+    if b'\x00' in prefix:
+        return BINARY
+    whole_file = size <= len(prefix)
+    if whole_file and prefix.isascii():
+        return ASCII
+    try:
+        prefix.decode(UTF8)
+    except UnicodeDecodeError as e:
+        truncated_char = e.start > len(prefix) - MAX_UTF8_CHAR_SIZE
+        if whole_file or not truncated_char:
+            return magic_handle().from_file(str(path))
+    return UTF8
@@ -0,0 +1,88 @@
+import itertools
+from typing import Iterable, List, Optional, Sequence, Tuple
+
+VARINT_CONTINUATION = 0x80
+VARINT_PAYLOAD = 0x7F
+
+
+def write_varint(buffer: bytearray, value: int):
+    while value >= VARINT_CONTINUATION:
+        buffer.append(value & VARINT_PAYLOAD | VARINT_CONTINUATION)
+        value >>= 7
+    buffer.append(value)
+
+
+def encode_varints(values: Iterable[int]) -> bytes:
+    buffer = bytearray()
+    for value in values:
+        write_varint(buffer, value)
+    return bytes(buffer)
+
+
+def decode_varints(data: bytes, start: int = 0,
+                   count: Optional[int] = None) -> Tuple[List[int], int]:
+    if count is not None:
+        chunk = data[start:start + count]
+        if len(chunk) == count and (not chunk or
+                                    max(chunk) < VARINT_CONTINUATION):
+            return list(chunk), start + count
+    values = []
+    value = 0
+    shift = 0
+    position = start
+    while position < len(data) and (count is None or len(values) < count):
+        byte = data[position]
+        position += 1
+        value |= (byte & VARINT_PAYLOAD) << shift
+        if byte & VARINT_CONTINUATION:
+            shift += 7
+            continue
+        values.append(value)
+        value = 0
+        shift = 0
+    return values, position
+
+
+def encode_deltas(values: Sequence[int]) -> bytes:
+    return encode_varints(value - previous for previous, value
+                          in zip(itertools.chain((0,), values), values))
+
+
+def decode_deltas(data: bytes, start: int = 0,
+                  count: Optional[int] = None) -> Tuple[List[int], int]:
+    gaps, end = decode_varints(data, start, count)
+    return list(itertools.accumulate(gaps)), end
+
+
+def common_prefix_length(first: bytes, second: bytes) -> int:
+    length = 0
+    for first_byte, second_byte in zip(first, second):
+        if first_byte != second_byte:
+            break
+        length += 1
+    return length
+
+
+def front_code(strings: Iterable[bytes]) -> bytes:
+    buffer = bytearray()
+    previous = b''
+    for string in strings:
+        shared = common_prefix_length(previous, string)
+        write_varint(buffer, shared)
+        write_varint(buffer, len(string) - shared)
+        buffer += string[shared:]
+        previous = string
+    return bytes(buffer)
+
+
+def front_decode(data: bytes, start: int = 0,
+                 count: Optional[int] = None) -> Tuple[List[bytes], int]:
+    strings = []
+    previous = b''
+    position = start
+    while position < len(data) and (count is None or len(strings) < count):
+        (shared, length), position = decode_varints(data, position, 2)
+        previous = previous[:shared] + data[position:position + length]
+        position += length
+        strings.append(previous)
+    return strings, position
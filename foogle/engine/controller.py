@@ -1,39 +1,285 @@
-from typing import Union
+import threading
+from pathlib import Path
+from typing import Iterator, List, Optional, Tuple, Union
 
-from foogle.engine.search_engine import SearchEngine, \
-    SearchByManyQueriesResult
-from foogle.engine.errors import SearcherError
+from foogle.engine import weighting
+from foogle.engine.jobs import BuildJob, BuildJobs, BuildProgress
+from foogle.engine.metrics import MetricsReport
+from foogle.engine.planner import QueryPlan
+from foogle.engine.search_engine import INDEX_PATH, SearchEngine, \
+    SearchByManyQueriesResult, ScoredSearchResult, PathSearchResult
+from foogle.engine.shards import SHARDS_PATH, ShardedSearchEngine
+from foogle.engine.watcher import IndexWatcher
+from foogle.engine.errors import SearcherError, InvalidWorkersCount, \
+    InvalidResultsLimit, InvalidResultsOffset, IndexBusyError, \
+    InvalidMemoryBudget, InvalidStatsAction, InvalidWatchInterval, \
+    WatchNotRunning, InvalidRankingMode, NumpyNotAvailable
+
+MEBIBYTE = 2 ** 20
 
 
 class Controller:
 
     def __init__(self):
         self.engine = SearchEngine()
+        self.shards = ShardedSearchEngine()
+        self.jobs = BuildJobs()
+        self.index_lock = threading.Lock()
+        self.watcher: Optional[IndexWatcher] = None
+        self.index_path = INDEX_PATH
         self.commands = {
             'search': self.__search,
+            'search_page': self.__search_page,
+            'search_batch': self.__search_batch,
+            'search_paths': self.__search_paths,
+            'explain': self.__explain,
             'build_index': self.__build_index,
+            'start_build': self.__start_build,
+            'build_status': self.__build_status,
+            'cancel_build': self.__cancel_build,
+            'update_index': self.__update_index,
             'load_index': self.__load_index,
-            'save_index': self.__save_index
+            'save_index': self.__save_index,
+            'index_size': self.__index_size,
+            'add_shard': self.__add_shard,
+            'remove_shard': self.__remove_shard,
+            'list_shards': self.__list_shards,
+            'update_shards': self.__update_shards,
+            'save_shards': self.__save_shards,
+            'load_shards': self.__load_shards,
+            'search_shards': self.__search_shards,
+            'start_watch': self.__start_watch,
+            'watch_status': self.__watch_status,
+            'stop_watch': self.__stop_watch,
+            'cache_stats': self.__cache_stats,
+            'stats': self.__stats,
+            'ranking': self.__ranking
         }
+        self.exclusive_commands = {'build_index', 'start_build',
+                                   'update_index', 'load_index',
+                                   'save_index', 'add_shard',
+                                   'remove_shard', 'update_shards',
+                                   'save_shards', 'load_shards'}
 
     def execute(self, command: str, *args) -> \
-            Union[SearchByManyQueriesResult, str]:
+            Union[SearchByManyQueriesResult, List[ScoredSearchResult],
+                  Iterator[Union[List[ScoredSearchResult], str]],
+                  PathSearchResult, QueryPlan, BuildJob, IndexWatcher,
+                  MetricsReport, str]:
         try:
-            return self.commands[command](*args)
+            if command not in self.exclusive_commands:
+                return self.commands[command](*args)
+            if not self.index_lock.acquire(blocking=False):
+                raise IndexBusyError()
+            try:
+                return self.commands[command](*args)
+            finally:
+                self.index_lock.release()
         except SearcherError as e:
             return e.message
 
-    def __search(self, query: str) -> SearchByManyQueriesResult:
-        return self.engine.search(query)
+    def __search(self, query: str, limit: str = '') -> \
+            SearchByManyQueriesResult:
+        if limit and not limit.isdigit():
+            raise InvalidResultsLimit(limit)
+        return self.engine.search(query, int(limit) if limit else None)
+
+    def __search_page(self, query: str, offset: str = '',
+                      limit: str = '') -> List[ScoredSearchResult]:
+        return self.engine.search_page(query, *self.__page(offset, limit))
+
+    def __search_batch(self, queries: List[str], offset: str = '',
+                       limit: str = '') -> \
+            Iterator[Union[List[ScoredSearchResult], str]]:
+        return self.__batch_results(
+            self.engine.search_batch(queries, *self.__page(offset, limit)))
+
+    @staticmethod
+    def __batch_results(batches: Iterator[List[ScoredSearchResult]]) -> \
+            Iterator[Union[List[ScoredSearchResult], str]]:
+        while True:
+            try:
+                yield next(batches)
+            except StopIteration:
+                return
+            except SearcherError as e:
+                yield e.message
 
-    def __build_index(self, root_dir: str, robot_txt: str = '') -> str:
-        self.engine.build_index(root_dir, robot_txt)
+    def __search_paths(self, pattern: str, limit: str = '') -> \
+            PathSearchResult:
+        if limit and not limit.isdigit():
+            raise InvalidResultsLimit(limit)
+        return self.engine.search_paths(pattern,
+                                        int(limit) if limit else None)
+
+    def __explain(self, query: str) -> QueryPlan:
+        return self.engine.explain(query)
+
+    @staticmethod
+    def __page(offset: str, limit: str) -> Tuple[int, Optional[int]]:
+        if offset and not offset.isdigit():
+            raise InvalidResultsOffset(offset)
+        if limit and not limit.isdigit():
+            raise InvalidResultsLimit(limit)
+        return int(offset) if offset else 0, int(limit) if limit else None
+
+    def __build_index(self, root_dir: str, robot_txt: str = '',
+                      workers: str = '1', positions: str = '',
+                      memory: str = '') -> str:
+        if not workers.isdigit():
+            raise InvalidWorkersCount(workers)
+        self.engine.build_index(root_dir, robot_txt, int(workers),
+                                store_positions=bool(positions),
+                                memory_budget=self.__memory_budget(memory))
         return f'Index built for "{self.engine.index.root_path}"'
 
-    def __load_index(self) -> str:
-        self.engine.load_index()
+    def __start_build(self, root_dir: str, robot_txt: str = '',
+                      workers: str = '1', positions: str = '',
+                      memory: str = '') -> BuildJob:
+        if not workers.isdigit():
+            raise InvalidWorkersCount(workers)
+        memory_budget = self.__memory_budget(memory)
+        if self.jobs.running():
+            raise IndexBusyError()
+
+        def build(progress: BuildProgress) -> str:
+            with self.index_lock:
+                self.engine.build_index(root_dir, robot_txt, int(workers),
+                                        progress, bool(positions),
+                                        memory_budget)
+                return f'Index built for "{self.engine.index.root_path}"'
+
+        return self.jobs.start(build)
+
+    @staticmethod
+    def __memory_budget(memory: str) -> Optional[int]:
+        if not memory:
+            return None
+        if not memory.isdigit() or not int(memory):
+            raise InvalidMemoryBudget(memory)
+        return int(memory) * MEBIBYTE
+
+    def __build_status(self, job_id: str) -> BuildJob:
+        return self.jobs.get(job_id)
+
+    def __cancel_build(self, job_id: str) -> str:
+        job = self.jobs.get(job_id)
+        job.cancel()
+        return f'Index build {job.id} cancellation requested'
+
+    def __update_index(self) -> str:
+        result = self.engine.update_index()
+        return f'Index for {self.engine.index.root_path} updated: {result}'
+
+    def __load_index(self, index_path: str = '') -> str:
+        path = Path(index_path or self.index_path)
+        self.engine.load_index(path)
+        self.index_path = path
         return f'Index for {self.engine.index.root_path} loaded'
 
-    def __save_index(self) -> str:
-        self.engine.save_index()
+    def __save_index(self, index_path: str = '') -> str:
+        path = Path(index_path or self.index_path)
+        self.engine.save_index(path)
+        self.index_path = path
         return f'Index for {self.engine.index.root_path} saved'
+
+    def __index_size(self, index_path: str = '') -> str:
+        return str(self.engine.size_report(
+            Path(index_path or self.index_path)))
+
+    def __start_watch(self, debounce: str = '',
+                      checkpoint: str = '') -> IndexWatcher:
+        if self.watcher is not None and self.watcher.running:
+            self.watcher.stop()
+        kwargs = {}
+        if debounce:
+            kwargs['debounce'] = self.__interval(debounce)
+        if checkpoint:
+            kwargs['checkpoint_interval'] = self.__interval(checkpoint)
+        self.watcher = IndexWatcher(self.engine, self.index_lock,
+                                    index_path=self.index_path,
+                                    **kwargs).start()
+        return self.watcher
+
+    def __watch_status(self) -> IndexWatcher:
+        if self.watcher is None:
+            raise WatchNotRunning()
+        return self.watcher
+
+    def __stop_watch(self) -> IndexWatcher:
+        if self.watcher is None or not self.watcher.running:
+            raise WatchNotRunning()
+        self.watcher.stop()
+        return self.watcher
+
+    @staticmethod
+    def __interval(seconds: str) -> float:
+        try:
+            interval = float(seconds)
+        except ValueError:
+            raise InvalidWatchInterval(seconds)
+        if not interval > 0:
+            raise InvalidWatchInterval(seconds)
+        return interval
+
+    def __add_shard(self, root_dir: str, robot_txt: str = '',
+                    workers: str = '1', positions: str = '') -> str:
+        if not workers.isdigit():
+            raise InvalidWorkersCount(workers)
+        root = self.shards.build_shard(root_dir, robot_txt, int(workers),
+                                       store_positions=bool(positions))
+        return f'Shard built for "{root}"'
+
+    def __remove_shard(self, root_dir: str) -> str:
+        self.shards.remove_shard(root_dir)
+        return f'Shard for "{root_dir}" removed'
+
+    def __list_shards(self) -> str:
+        shards = self.shards.shards
+        lines = [f'{root}: {index.collection_size} documents'
+                 for root, index in shards.items()]
+        return '\n'.join([f'Shards: {len(shards)}'] + lines)
+
+    def __update_shards(self) -> str:
+        result = self.shards.update_index()
+        return f'Shards updated: {result}'
+
+    def __save_shards(self, shards_path: str = '') -> str:
+        self.shards.save_index(Path(shards_path or SHARDS_PATH))
+        return f'{len(self.shards.shards)} shards saved'
+
+    def __load_shards(self, shards_path: str = '') -> str:
+        self.shards.load_index(Path(shards_path or SHARDS_PATH))
+        return f'{len(self.shards.shards)} shards loaded'
+
+    def __search_shards(self, query: str, limit: str = '') -> \
+            SearchByManyQueriesResult:
+        if limit and not limit.isdigit():
+            raise InvalidResultsLimit(limit)
+        return self.shards.search(query, int(limit) if limit else None)
+
+    def __cache_stats(self) -> str:
+        return str(self.engine.cache.stats())
+
+    def __stats(self, action: str = '') -> MetricsReport:
+        metrics = self.engine.metrics
+        if action == 'enable':
+            metrics.enabled = True
+        elif action == 'disable':
+            metrics.enabled = False
+        elif action == 'reset':
+            metrics.reset()
+        elif action:
+            raise InvalidStatsAction(action)
+        return self.engine.stats()
+
+    def __ranking(self, mode: str = '') -> str:
+        if mode == 'numpy' and not weighting.NUMPY_AVAILABLE:
+            raise NumpyNotAvailable()
+        if mode in ('numpy', 'python'):
+            self.engine.use_numpy = mode == 'numpy'
+            self.engine.cache.invalidate()
+            self.shards.use_numpy = mode == 'numpy'
+        elif mode:
+            raise InvalidRankingMode(mode)
+        return f'Ranking: {"numpy" if self.engine.use_numpy else "python"}'
@@ -0,0 +1,226 @@
+import os
+import queue
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+from pathlib import Path
+from typing import FrozenSet, Iterator, List, Optional, Tuple
+
+from foogle.engine.errors import InvalidRootDirectory
+from foogle.engine import metrics
+from foogle.engine.index import Fingerprint
+from foogle.engine.robots import ExclusionRules
+
+SKIP_SYMLINKS = 'skip'
+FILE_SYMLINKS = 'files'
+FOLLOW_SYMLINKS = 'follow'
+PUT_TIMEOUT = 0.1
+
+CrawledFile = Tuple[Path, Fingerprint]
+Directory = Tuple[str, str, int]
+
+
+@dataclass(frozen=True)
+class CrawlOptions:
+    threads: int = 4
+    queue_size: int = 1024
+    max_depth: Optional[int] = None
+    symlinks: str = FILE_SYMLINKS
+    max_file_size: Optional[int] = None
+    extensions: Optional[FrozenSet[str]] = None
+
+
+class Crawler:
+
+    def __init__(self, root_dir: str, rules: Optional[ExclusionRules] = None,
+                 options: Optional[CrawlOptions] = None,
+                 crawl_metrics: metrics.Metrics = metrics.DISABLED):
+        self.root_path = Path(root_dir).absolute()
+        if not self.root_path.is_dir():
+            raise InvalidRootDirectory(root_dir)
+        self.rules = rules
+        self.options = options or CrawlOptions()
+        self.metrics = crawl_metrics
+        self.visited = set()
+        self.visited_lock = threading.Lock()
+
+    def __iter__(self) -> Iterator[CrawledFile]:
+        root = (str(self.root_path), '', 0)
+        self.visited = set()
+        if self.options.threads <= 1:
+            return self.crawl_sequential(root)
+        return self.crawl_parallel(root)
+
+    def subtree(self, directory: Path) -> Iterator[CrawledFile]:
+        relative = self.relative(directory)
+        if relative is None or self.excluded(relative):
+            return iter(())
+        self.visited = set()
+        depth = relative.count('/') + 1
+        if self.options.max_depth is not None and \
+                depth > self.options.max_depth:
+            return iter(())
+        return self.crawl_sequential((str(directory), relative + '/', depth))
+
+    def crawl_path(self, path: Path) -> Optional[CrawledFile]:
+        relative = self.relative(path)
+        if relative is None or self.excluded(relative):
+            return None
+        if self.options.max_depth is not None and \
+                relative.count('/') > self.options.max_depth:
+            return None
+        try:
+            if path.is_symlink() and \
+                    self.options.symlinks == SKIP_SYMLINKS:
+                return None
+            if not path.is_file() or not self.has_extension(path.name):
+                return None
+            return self.accept(path, path.stat())
+        except OSError:
+            return None
+
+    def relative(self, path: Path) -> Optional[str]:
+        try:
+            relative = path.relative_to(self.root_path).as_posix()
+        except ValueError:
+            return None
+        return relative if relative != '.' else None
+
+    def excluded(self, relative: str) -> bool:
+        if self.rules is None:
+            return False
+        parts = relative.split('/')
+        return any(self.rules.excludes('/'.join(parts[:i]))
+                   for i in range(1, len(parts) + 1))
+
+    def crawl_sequential(self, root: Directory) -> Iterator[CrawledFile]:
+        directories = [root]
+        while directories:
+            files, subdirectories = self.scan(*directories.pop())
+            yield from files
+            directories.extend(reversed(subdirectories))
+
+    def crawl_parallel(self, root: Directory) -> Iterator[CrawledFile]:
+        results = queue.Queue(self.options.queue_size)
+        stopped = threading.Event()
+        finished = object()
+        pending = [1]
+        pending_lock = threading.Lock()
+        executor = ThreadPoolExecutor(self.options.threads)
+
+        def put(item: object) -> bool:
+            while not stopped.is_set():
+                try:
+                    results.put(item, timeout=PUT_TIMEOUT)
+                    return True
+                except queue.Full:
+                    continue
+            return False
+
+        def visit(directory: str, relative: str, depth: int):
+            try:
+                if stopped.is_set():
+                    return
+                files, subdirectories = self.scan(directory, relative, depth)
+                with pending_lock:
+                    pending[0] += len(subdirectories)
+                for subdirectory in subdirectories:
+                    executor.submit(visit, *subdirectory)
+                for crawled_file in files:
+                    if not put(crawled_file):
+                        return
+            except Exception as e:
+                put(e)
+            finally:
+                with pending_lock:
+                    pending[0] -= 1
+                    done = pending[0] == 0
+                if done:
+                    put(finished)
+
+        executor.submit(visit, *root)
+        try:
+            while True:
+                item = results.get()
+                if item is finished:
+                    return
+                if isinstance(item, Exception):
+                    raise item
+                yield item
+        finally:
+            stopped.set()
+            executor.shutdown(wait=True)
+
+    def scan(self, directory: str, relative: str, depth: int) -> \
+            Tuple[List[CrawledFile], List[Directory]]:
+        files = []
+        subdirectories = []
+        if not self.first_visit(directory):
+            return files, subdirectories
+        ignored = 0
+        try:
+            with os.scandir(directory) as entries:
+                for entry in entries:
+                    relative_path = relative + entry.name
+                    if self.rules is not None and \
+                            self.rules.excludes(relative_path):
+                        ignored += 1
+                        continue
+                    try:
+                        if self.is_directory(entry):
+                            if self.options.max_depth is None or \
+                                    depth < self.options.max_depth:
+                                subdirectories.append((entry.path,
+                                                       relative_path + '/',
+                                                       depth + 1))
+                            continue
+                        crawled_file = self.crawl_file(entry)
+                    except OSError:
+                        continue
+                    if crawled_file is not None:
+                        files.append(crawled_file)
+        except OSError:
+            pass
+        self.metrics.increment('directories_scanned')
+        self.metrics.increment('paths_ignored', ignored)
+        return files, subdirectories
+
+    def is_directory(self, entry: os.DirEntry) -> bool:
+        if not entry.is_dir():
+            return False
+        if entry.is_symlink():
+            return self.options.symlinks == FOLLOW_SYMLINKS
+        return True
+
+    def crawl_file(self, entry: os.DirEntry) -> Optional[CrawledFile]:
+        if entry.is_symlink() and self.options.symlinks == SKIP_SYMLINKS:
+            return None
+        if not entry.is_file() or not self.has_extension(entry.name):
+            return None
+        return self.accept(Path(entry.path), entry.stat())
+
+    def has_extension(self, name: str) -> bool:
+        extensions = self.options.extensions
+        return extensions is None or \
+            os.path.splitext(name)[1].lower() in extensions
+
+    def accept(self, path: Path, stat: os.stat_result) -> \
+            Optional[CrawledFile]:
+        max_file_size = self.options.max_file_size
+        if max_file_size is not None and stat.st_size > max_file_size:
+            return None
+        return path, Fingerprint.from_stat(stat)
+
+    def first_visit(self, directory: str) -> bool:
+        if self.options.symlinks != FOLLOW_SYMLINKS:
+            return True
+        try:
+            stat = os.stat(directory)
+        except OSError:
+            return False
+        with self.visited_lock:
+            key = stat.st_dev, stat.st_ino
+            if key in self.visited:
+                return False
+            self.visited.add(key)
+            return True
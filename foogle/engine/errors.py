@@ -16,17 +16,17 @@ class IndexBrokenError(SearcherError):
               ' it was deleted'
 
 
-class IndexNotExistError(SearcherError):
-    message = 'error: you dont have a saved index'
-
-
-class IndexOutDatedError(SearcherError):
+class IndexRecordBrokenError(SearcherError):
 
     def __init__(self, msg: str):
         self.message = self.message.format(msg)
 
-    message = 'error: your index for "{}" is outdated' \
-              ' please, create new index'
+    message = 'error: {} of your saved index is broken,' \
+              ' update or rebuild the index'
+
+
+class IndexNotExistError(SearcherError):
+    message = 'error: you dont have a saved index'
 
 
 class InvalidRootDirectory(SearcherError):
@@ -43,3 +43,127 @@ class RobotTxtNotFound(SearcherError):
         self.message = self.message.format(msg)
 
     message = 'error: robot.txt file "{}" want found'
+
+
+class InvalidWorkersCount(SearcherError):
+
+    def __init__(self, msg: str):
+        self.message = self.message.format(msg)
+
+    message = 'error: workers count "{}" must be a positive integer'
+
+
+class InvalidResultsLimit(SearcherError):
+
+    def __init__(self, msg: str):
+        self.message = self.message.format(msg)
+
+    message = 'error: results limit "{}" must be a non-negative integer'
+
+
+class BuildCancelledError(SearcherError):
+    message = 'error: index build was cancelled'
+
+
+class BuildJobNotFound(SearcherError):
+
+    def __init__(self, msg: str):
+        self.message = self.message.format(msg)
+
+    message = 'error: index build "{}" not found'
+
+
+class IndexBusyError(SearcherError):
+    message = 'error: index is being built right now, try again later'
+
+
+class InvalidResultsOffset(SearcherError):
+
+    def __init__(self, msg: str):
+        self.message = self.message.format(msg)
+
+    message = 'error: results offset "{}" must be a non-negative integer'
+
+
+class PositionsNotIndexedError(SearcherError):
+    message = 'error: index has no term positions, rebuild it with' \
+              ' positions to search phrases'
+
+
+class ShardNotFound(SearcherError):
+
+    def __init__(self, msg: str):
+        self.message = self.message.format(msg)
+
+    message = 'error: index shard for "{}" not found'
+
+
+class InvalidMemoryBudget(SearcherError):
+
+    def __init__(self, msg: str):
+        self.message = self.message.format(msg)
+
+    message = 'error: memory budget "{}" must be a positive integer'
+
+
+class InvalidStatsAction(SearcherError):
+
+    def __init__(self, msg: str):
+        self.message = self.message.format(msg)
+
+    message = 'error: stats action "{}" must be one of enable, disable,' \
+              ' reset'
+
+
+class WatchNotSupported(SearcherError):
+    message = 'error: watching the index root needs inotify (Linux)'
+
+
+class WatchNotRunning(SearcherError):
+    message = 'error: index watch is not running'
+
+
+class InvalidWatchInterval(SearcherError):
+
+    def __init__(self, msg: str):
+        self.message = self.message.format(msg)
+
+    message = 'error: watch interval "{}" must be a positive number of' \
+              ' seconds'
+
+
+class DaemonNotRunning(SearcherError):
+
+    def __init__(self, msg: str):
+        self.message = self.message.format(msg)
+
+    message = 'error: search daemon is not running on "{}"'
+
+
+class DaemonAlreadyRunning(SearcherError):
+
+    def __init__(self, msg: str):
+        self.message = self.message.format(msg)
+
+    message = 'error: search daemon is already running on "{}"'
+
+
+class NotASocket(SearcherError):
+
+    def __init__(self, msg: str):
+        self.message = self.message.format(msg)
+
+    message = 'error: "{}" exists and is not a socket'
+
+
+class InvalidRankingMode(SearcherError):
+
+    def __init__(self, msg: str):
+        self.message = self.message.format(msg)
+
+    message = 'error: ranking "{}" must be one of python, numpy'
+
+
+class NumpyNotAvailable(SearcherError):
+    message = 'error: numpy is not installed, install foogle[numpy] to' \
+              ' rank with it'
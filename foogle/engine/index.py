@@ -0,0 +1,144 @@
+import math
+import os
+from array import array
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import AbstractSet, Set, Dict, List, Counter, Optional, \
+    Iterable, Sequence, MutableMapping
+
+from foogle.engine import postings
+from foogle.engine.overlay import Overlay, OverlaySequence
+from foogle.engine.terms import TermDictionary
+
+
+@dataclass(frozen=True)
+class Fingerprint:
+    mtime: float
+    size: int
+    inode: int
+    encoding: str = field(default='', compare=False)
+
+    @staticmethod
+    def from_stat(stat: os.stat_result) -> 'Fingerprint':
+        return Fingerprint(stat.st_mtime, stat.st_size, stat.st_ino)
+
+
+@dataclass
+class Index:
+    root_path: Path
+    mtime: float
+    doc_table: List[Optional[Path]]
+    documents_to_terms: Dict[int, Counter[str]]
+    terms_to_documents: Dict[str, array]
+    tf: Dict[str, array]
+    max_tf: Dict[str, float]
+    fingerprints: Dict[Path, Fingerprint]
+    robot_txt: str = ''
+    positions: Optional[Dict[int, Dict[str, bytes]]] = None
+    trigrams: Dict[str, array] = field(default_factory=dict)
+    dictionary: Optional[TermDictionary] = field(default=None, repr=False,
+                                                 compare=False)
+    paths_to_ids: Optional[MutableMapping[Path, int]] = field(
+        default=None, repr=False, compare=False)
+
+    @property
+    def unique_terms(self) -> AbstractSet[str]:
+        return self.terms_to_documents.keys()
+
+    @property
+    def documents(self) -> Set[Path]:
+        return {self.doc_table[doc_id] for doc_id in self.documents_to_terms}
+
+    @property
+    def collection_size(self) -> int:
+        return len(self.documents_to_terms)
+
+    def doc_ids(self) -> MutableMapping[Path, int]:
+        if self.paths_to_ids is None:
+            self.paths_to_ids = {doc: doc_id for doc_id, doc
+                                 in enumerate(self.doc_table)
+                                 if doc is not None}
+        return self.paths_to_ids
+
+    def live_doc_ids(self) -> array:
+        return array(postings.DOC_ID_TYPE, sorted(self.documents_to_terms))
+
+    def postings(self, term: str) -> array:
+        return self.terms_to_documents.get(term, postings.empty_postings())
+
+    def idf(self, term: str) -> float:
+        return compute_idf(len(self.terms_to_documents[term]),
+                           self.collection_size)
+
+    def max_score(self, term: str) -> float:
+        return self.max_tf[term] * self.idf(term)
+
+    def paths(self, doc_ids: Iterable[int]) -> List[Path]:
+        return [self.doc_table[doc_id] for doc_id in doc_ids]
+
+    def term_dictionary(self) -> TermDictionary:
+        if self.dictionary is None:
+            if self.is_mapped():
+                terms = self.terms_to_documents.sorted_terms()
+            else:
+                terms = sorted(self.terms_to_documents)
+            self.dictionary = TermDictionary(terms)
+        return self.dictionary
+
+    def is_mapped(self) -> bool:
+        return not isinstance(self.terms_to_documents, dict)
+
+    def materialize(self) -> 'Index':
+        if not self.is_mapped():
+            return self
+        return Index(self.root_path,
+                     self.mtime,
+                     self.doc_table.materialize(),
+                     self.documents_to_terms.materialize(),
+                     self.terms_to_documents.materialize(),
+                     self.tf.materialize(),
+                     self.max_tf.materialize(),
+                     self.fingerprints.materialize(),
+                     self.robot_txt,
+                     self.positions.materialize()
+                     if self.positions is not None else None,
+                     self.trigrams.materialize())
+
+    def copy(self) -> 'Index':
+        return Index(self.root_path,
+                     self.mtime,
+                     OverlaySequence.of(self.doc_table),
+                     Overlay.of(self.documents_to_terms),
+                     Overlay.of(self.terms_to_documents),
+                     Overlay.of(self.tf),
+                     Overlay.of(self.max_tf),
+                     Overlay.of(self.fingerprints),
+                     self.robot_txt,
+                     Overlay.of(self.positions)
+                     if self.positions is not None else None,
+                     Overlay.of(self.trigrams),
+                     paths_to_ids=Overlay.of(self.doc_ids()))
+
+
+class CollectionStatistics:
+
+    def __init__(self, indexes: Sequence[Index]):
+        self.indexes = indexes
+        self.collection_size = sum(index.collection_size
+                                   for index in indexes)
+        self.frequencies: Dict[str, int] = {}
+
+    def document_frequency(self, term: str) -> int:
+        frequency = self.frequencies.get(term)
+        if frequency is None:
+            frequency = self.frequencies[term] = sum(
+                len(index.postings(term)) for index in self.indexes)
+        return frequency
+
+    def idf(self, term: str) -> float:
+        return compute_idf(self.document_frequency(term),
+                           self.collection_size)
+
+
+def compute_idf(document_frequency: int, collection_size: int) -> float:
+    return math.log(collection_size / document_frequency, math.e)
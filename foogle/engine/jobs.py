@@ -0,0 +1,141 @@
+import itertools
+import threading
+import time
+from typing import Callable, Dict, Iterable, Iterator, Optional, Tuple
+
+from foogle.engine.errors import SearcherError, BuildCancelledError, \
+    BuildJobNotFound
+from foogle.engine.index import Fingerprint
+
+RUNNING = 'running'
+FINISHED = 'finished'
+FAILED = 'failed'
+CANCELLED = 'cancelled'
+
+
+class BuildProgress:
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.cancelled = threading.Event()
+        self.started = time.monotonic()
+        self.scan_started: Optional[float] = None
+        self.files_discovered = 0
+        self.bytes_discovered = 0
+        self.files_scanned = 0
+        self.bytes_read = 0
+        self.crawl_finished = False
+
+    def discover(self, documents: Iterable[Tuple[object, Fingerprint]]) -> \
+            Iterator[Tuple[object, Fingerprint]]:
+        for document in documents:
+            self.check_cancelled()
+            with self.lock:
+                self.files_discovered += 1
+                self.bytes_discovered += document[1].size
+            yield document
+        with self.lock:
+            self.crawl_finished = True
+
+    def scanned(self, fingerprint: Fingerprint):
+        with self.lock:
+            if self.scan_started is None:
+                self.scan_started = time.monotonic()
+            self.files_scanned += 1
+            self.bytes_read += fingerprint.size
+
+    def check_cancelled(self):
+        if self.cancelled.is_set():
+            raise BuildCancelledError()
+
+    @property
+    def eta(self) -> Optional[float]:
+        with self.lock:
+            if not self.crawl_finished or not self.bytes_read:
+                return None
+            elapsed = time.monotonic() - self.scan_started
+            remaining = self.bytes_discovered - self.bytes_read
+            return remaining * elapsed / self.bytes_read
+
+    def as_dict(self) -> dict:
+        eta = self.eta
+        with self.lock:
+            return {'files_discovered': self.files_discovered,
+                    'bytes_discovered': self.bytes_discovered,
+                    'files_scanned': self.files_scanned,
+                    'bytes_read': self.bytes_read,
+                    'crawl_finished': self.crawl_finished,
+                    'elapsed': time.monotonic() - self.started,
+                    'eta': eta}
+
+
+class BuildJob:
+
+    def __init__(self, job_id: str, build: Callable[[BuildProgress], str]):
+        self.id = job_id
+        self.progress = BuildProgress()
+        self.status = RUNNING
+        self.message = ''
+        self.thread = threading.Thread(target=self.run, args=(build,),
+                                       name=f'build-{job_id}', daemon=True)
+
+    def run(self, build: Callable[[BuildProgress], str]):
+        try:
+            self.message = build(self.progress)
+            self.status = FINISHED
+        except BuildCancelledError as e:
+            self.message = e.message
+            self.status = CANCELLED
+        except SearcherError as e:
+            self.message = e.message
+            self.status = FAILED
+        except Exception as e:
+            self.message = f'error: {e}'
+            self.status = FAILED
+
+    def cancel(self):
+        self.progress.cancelled.set()
+
+    @property
+    def running(self) -> bool:
+        return self.status == RUNNING
+
+    def as_dict(self) -> dict:
+        return dict(self.progress.as_dict(), id=self.id, status=self.status,
+                    message=self.message)
+
+    def __str__(self) -> str:
+        progress = self.progress.as_dict()
+        eta = progress['eta']
+        eta = f'{eta:.1f}s' if eta is not None else 'unknown'
+        message = f'\n{self.message}' if self.message else ''
+        return f'Index build {self.id}: {self.status}{message}\n' \
+               f'Files scanned: {progress["files_scanned"]}' \
+               f'/{progress["files_discovered"]},' \
+               f' bytes read: {progress["bytes_read"]}' \
+               f'/{progress["bytes_discovered"]}, ETA: {eta}'
+
+
+class BuildJobs:
+
+    def __init__(self):
+        self.jobs: Dict[str, BuildJob] = {}
+        self.lock = threading.Lock()
+        self.ids = itertools.count(1)
+
+    def start(self, build: Callable[[BuildProgress], str]) -> BuildJob:
+        with self.lock:
+            job = BuildJob(str(next(self.ids)), build)
+            self.jobs[job.id] = job
+        job.thread.start()
+        return job
+
+    def get(self, job_id: str) -> BuildJob:
+        with self.lock:
+            if job_id not in self.jobs:
+                raise BuildJobNotFound(job_id)
+            return self.jobs[job_id]
+
+    def running(self) -> bool:
+        with self.lock:
+            return any(job.running for job in self.jobs.values())
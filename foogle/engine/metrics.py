@@ -0,0 +1,257 @@
+import collections
+import contextlib
+import sys
+import threading
+import time
+from bisect import bisect_left
+from dataclasses import dataclass, field
+from typing import Collection, ContextManager, Counter, Dict, Iterable, List, \
+    Optional, Tuple
+
+from foogle.engine.cache import CacheStats
+from foogle.engine.index import Index
+from foogle.engine.query_parser import Query
+
+LATENCY_BUCKETS = (0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01,
+                   0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5)
+PREFIX = 'foogle'
+NULL_STAGE = contextlib.nullcontext()
+
+
+class Histogram:
+
+    def __init__(self, buckets: Tuple[float, ...] = LATENCY_BUCKETS):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value: float):
+        self.counts[bisect_left(self.buckets, value)] += 1
+        self.sum += value
+        self.count += 1
+
+    def quantile(self, fraction: float) -> float:
+        rank = fraction * self.count
+        seen = 0
+        for bound, count in zip(self.buckets, self.counts):
+            seen += count
+            if seen >= rank:
+                return bound
+        return float('inf')
+
+    def cumulative(self) -> List[Tuple[str, int]]:
+        bounds = [str(bound) for bound in self.buckets] + ['+Inf']
+        totals = []
+        seen = 0
+        for count in self.counts:
+            seen += count
+            totals.append(seen)
+        return list(zip(bounds, totals))
+
+    def copy(self) -> 'Histogram':
+        histogram = Histogram(self.buckets)
+        histogram.counts = list(self.counts)
+        histogram.sum = self.sum
+        histogram.count = self.count
+        return histogram
+
+
+class StageTimer:
+
+    def __init__(self, metrics: 'Metrics', stage: str):
+        self.metrics = metrics
+        self.stage = stage
+        self.started = 0.0
+
+    def __enter__(self) -> 'StageTimer':
+        self.started = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc_info):
+        self.metrics.record_stage(self.stage,
+                                  time.perf_counter() - self.started)
+
+
+@dataclass
+class MetricsReport:
+    enabled: bool
+    stages: Dict[str, Tuple[int, float]]
+    counters: Dict[str, int]
+    latencies: Dict[str, Histogram]
+    footprint: Dict[str, int] = field(default_factory=dict)
+    cache: Optional[CacheStats] = None
+
+    def __str__(self) -> str:
+        lines = [f'Metrics: {"enabled" if self.enabled else "disabled"}']
+        if self.stages:
+            lines.append('Stages:')
+            lines.extend(f'  {stage}: {calls} calls, {seconds:.3f} s'
+                         for stage, (calls, seconds)
+                         in sorted(self.stages.items()))
+        if self.counters:
+            lines.append('Counters:')
+            lines.extend(f'  {name}: {value}'
+                         for name, value in sorted(self.counters.items()))
+        if self.latencies:
+            lines.append('Query latency:')
+            lines.extend(
+                f'  {shape}: {histogram.count} queries,'
+                f' mean {histogram.sum / histogram.count * 1000:.3f} ms,'
+                f' p50 <= {histogram.quantile(0.5) * 1000:g} ms,'
+                f' p99 <= {histogram.quantile(0.99) * 1000:g} ms'
+                for shape, histogram in sorted(self.latencies.items()))
+        if self.footprint:
+            lines.append('Index memory:')
+            lines.extend(f'  {part}: {size} bytes'
+                         for part, size in sorted(self.footprint.items()))
+        if self.cache is not None:
+            lines.append(str(self.cache))
+        return '\n'.join(lines)
+
+    def prometheus(self) -> str:
+        lines = []
+
+        def family(name: str, kind: str, help_text: str,
+                   samples: Iterable[Tuple[str, object]]):
+            lines.append(f'# HELP {PREFIX}_{name} {help_text}')
+            lines.append(f'# TYPE {PREFIX}_{name} {kind}')
+            lines.extend(f'{PREFIX}_{sample} {value}'
+                         for sample, value in samples)
+
+        family('stage_seconds_total', 'counter',
+               'Time spent in index build and maintenance stages.',
+               [(f'stage_seconds_total{{stage="{stage}"}}', seconds)
+                for stage, (_, seconds) in sorted(self.stages.items())])
+        family('stage_calls_total', 'counter',
+               'Completed index build and maintenance stages.',
+               [(f'stage_calls_total{{stage="{stage}"}}', calls)
+                for stage, (calls, _) in sorted(self.stages.items())])
+        for name, value in sorted(self.counters.items()):
+            family(f'{name}_total', 'counter', name.replace('_', ' ') + '.',
+                   [(f'{name}_total', value)])
+        samples = []
+        for shape, histogram in sorted(self.latencies.items()):
+            samples.extend(
+                (f'query_latency_seconds_bucket{{shape="{shape}",le="{le}"}}',
+                 count) for le, count in histogram.cumulative())
+            samples.append((f'query_latency_seconds_sum{{shape="{shape}"}}',
+                            histogram.sum))
+            samples.append((f'query_latency_seconds_count{{shape="{shape}"}}',
+                            histogram.count))
+        family('query_latency_seconds', 'histogram',
+               'Search latency by query shape.', samples)
+        family('index_memory_bytes', 'gauge',
+               'Approximate index memory footprint.',
+               [(f'index_memory_bytes{{part="{part}"}}', size)
+                for part, size in sorted(self.footprint.items())])
+        if self.cache is not None:
+            family('query_cache_hits_total', 'counter', 'Query cache hits.',
+                   [('query_cache_hits_total', self.cache.hits)])
+            family('query_cache_misses_total', 'counter',
+                   'Query cache misses.',
+                   [('query_cache_misses_total', self.cache.misses)])
+            family('query_cache_entries', 'gauge', 'Query cache entries.',
+                   [('query_cache_entries', self.cache.size)])
+        return '\n'.join(lines) + '\n'
+
+
+class Metrics:
+
+    def __init__(self, enabled: bool = False):
+        self.enabled = enabled
+        self.lock = threading.Lock()
+        self.counters: Counter[str] = collections.Counter()
+        self.stage_calls: Counter[str] = collections.Counter()
+        self.stage_seconds: Dict[str, float] = collections.defaultdict(float)
+        self.latencies: Dict[str, Histogram] = {}
+
+    def stage(self, name: str) -> ContextManager:
+        if not self.enabled:
+            return NULL_STAGE
+        return StageTimer(self, name)
+
+    def record_stage(self, name: str, seconds: float):
+        with self.lock:
+            self.stage_calls[name] += 1
+            self.stage_seconds[name] += seconds
+
+    def merge_stages(self, stages: Dict[str, Tuple[int, float]]):
+        with self.lock:
+            for name, (calls, seconds) in stages.items():
+                self.stage_calls[name] += calls
+                self.stage_seconds[name] += seconds
+
+    def increment(self, name: str, value: int = 1):
+        if not self.enabled:
+            return
+        with self.lock:
+            self.counters[name] += value
+
+    def observe_query(self, shape: str, seconds: float):
+        if not self.enabled:
+            return
+        with self.lock:
+            histogram = self.latencies.get(shape)
+            if histogram is None:
+                histogram = self.latencies[shape] = Histogram()
+            histogram.observe(seconds)
+
+    def reset(self):
+        with self.lock:
+            self.counters.clear()
+            self.stage_calls.clear()
+            self.stage_seconds.clear()
+            self.latencies.clear()
+
+    def report(self, footprint: Optional[Dict[str, int]] = None,
+               cache: Optional[CacheStats] = None) -> MetricsReport:
+        with self.lock:
+            return MetricsReport(
+                self.enabled,
+                {stage: (calls, self.stage_seconds[stage])
+                 for stage, calls in self.stage_calls.items()},
+                dict(self.counters),
+                {shape: histogram.copy()
+                 for shape, histogram in self.latencies.items()},
+                footprint or {}, cache)
+
+
+DISABLED = Metrics()
+
+
+def query_shape(queries: Collection[Query]) -> str:
+    if len(queries) > 1:
+        return 'or'
+    query = next(iter(queries))
+    if query.proximities:
+        return 'phrase'
+    if query.expansions or query.bad_expansions:
+        return 'expansion'
+    if query.bad_terms:
+        return 'not'
+    if len(query.good_terms) > 1:
+        return 'and'
+    if query.good_terms:
+        return 'single'
+    return 'all'
+
+
+def index_footprint(index: Index) -> Dict[str, int]:
+    doc_table = getattr(index.doc_table, 'base', index.doc_table)
+    if hasattr(doc_table, 'segment'):
+        return {'mapped': len(doc_table.segment.buffer)}
+    return {
+        'postings': sum(doc_ids.itemsize * len(doc_ids) for doc_ids
+                        in index.terms_to_documents.values()),
+        'weights': sum(weights.itemsize * len(weights)
+                       for weights in index.tf.values()),
+        'terms': sum(len(term) for term in index.terms_to_documents),
+        'forward': sum(sys.getsizeof(terms)
+                       for terms in index.documents_to_terms.values()),
+        'positions': sum(len(encoded) for doc_positions
+                         in (index.positions or {}).values()
+                         for encoded in doc_positions.values()),
+        'path_trigrams': sum(doc_ids.itemsize * len(doc_ids)
+                             for doc_ids in index.trigrams.values()),
+    }
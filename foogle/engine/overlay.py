@@ -0,0 +1,139 @@
+from typing import Any, Dict, Iterator, List, Mapping, MutableMapping, \
+    Optional, Sequence
+
+COMPACT_RATIO = 4
+
+DELETED = object()
+
+
+def materialize(base: Any) -> Any:
+    if hasattr(base, 'materialize'):
+        return base.materialize()
+    if isinstance(base, Mapping):
+        return dict(base)
+    return list(base)
+
+
+class Overlay(MutableMapping):
+
+    def __init__(self, base: Mapping, changes: Optional[Dict] = None,
+                 size: Optional[int] = None):
+        self.base = base
+        self.changes = changes if changes is not None else {}
+        self.size = len(base) if size is None else size
+
+    @staticmethod
+    def of(mapping: Mapping) -> 'Overlay':
+        if isinstance(mapping, Overlay):
+            return mapping.copy()
+        return Overlay(mapping)
+
+    def __len__(self) -> int:
+        return self.size
+
+    def __iter__(self) -> Iterator:
+        for key in self.base:
+            if key not in self.changes:
+                yield key
+        for key, value in self.changes.items():
+            if value is not DELETED:
+                yield key
+
+    def __contains__(self, key: object) -> bool:
+        value = self.changes.get(key)
+        if value is not None:
+            return value is not DELETED
+        return key in self.changes or key in self.base
+
+    def __getitem__(self, key: Any) -> Any:
+        if key in self.changes:
+            value = self.changes[key]
+            if value is DELETED:
+                raise KeyError(key)
+            return value
+        return self.base[key]
+
+    def __setitem__(self, key: Any, value: Any):
+        if key not in self:
+            self.size += 1
+        self.changes[key] = value
+
+    def __delitem__(self, key: Any):
+        if key not in self:
+            raise KeyError(key)
+        self.changes[key] = DELETED
+        self.size -= 1
+
+    def copy(self) -> 'Overlay':
+        if len(self.changes) * COMPACT_RATIO > len(self.base):
+            return Overlay(self.materialize())
+        return Overlay(self.base, dict(self.changes), self.size)
+
+    def sorted_terms(self) -> List:
+        return sorted(self)
+
+    def materialize(self) -> Dict:
+        items = materialize(self.base)
+        for key, value in self.changes.items():
+            if value is DELETED:
+                del items[key]
+            else:
+                items[key] = value
+        return items
+
+
+class OverlaySequence(Sequence):
+
+    def __init__(self, base: Sequence, changes: Optional[Dict] = None,
+                 appended: Optional[List] = None):
+        self.base = base
+        self.changes = changes if changes is not None else {}
+        self.appended = appended if appended is not None else []
+
+    @staticmethod
+    def of(sequence: Sequence) -> 'OverlaySequence':
+        if isinstance(sequence, OverlaySequence):
+            return sequence.copy()
+        return OverlaySequence(sequence)
+
+    def __len__(self) -> int:
+        return len(self.base) + len(self.appended)
+
+    def __getitem__(self, position: int) -> Any:
+        if not 0 <= position < len(self):
+            raise IndexError(position)
+        if position >= len(self.base):
+            return self.appended[position - len(self.base)]
+        if position in self.changes:
+            return self.changes[position]
+        return self.base[position]
+
+    def __setitem__(self, position: int, value: Any):
+        if not 0 <= position < len(self):
+            raise IndexError(position)
+        if position >= len(self.base):
+            self.appended[position - len(self.base)] = value
+        else:
+            self.changes[position] = value
+
+    def __eq__(self, other: object) -> bool:
+        if not isinstance(other, Sequence):
+            return NotImplemented
+        return len(self) == len(other) and list(self) == list(other)
+
+    def append(self, value: Any):
+        self.appended.append(value)
+
+    def copy(self) -> 'OverlaySequence':
+        if (len(self.changes) + len(self.appended)) * COMPACT_RATIO > \
+                len(self.base):
+            return OverlaySequence(self.materialize())
+        return OverlaySequence(self.base, dict(self.changes),
+                               list(self.appended))
+
+    def materialize(self) -> List:
+        items = materialize(self.base)
+        for position, value in self.changes.items():
+            items[position] = value
+        items.extend(self.appended)
+        return items
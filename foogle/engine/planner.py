@@ -0,0 +1,179 @@
+from array import array
+from dataclasses import dataclass, field
+from typing import Dict, List, Optional, Tuple
+
+from foogle.engine import positions, postings
+from foogle.engine.errors import PositionsNotIndexedError
+from foogle.engine.index import Index
+from foogle.engine.query_parser import Expansion, Proximity, Query
+
+ALL = 'all'
+SCAN = 'scan'
+INTERSECT = 'intersect'
+EXCLUDE = 'exclude'
+PROXIMITY = 'proximity'
+MISSING = 'missing'
+
+
+class PostingsLookup(dict):
+
+    def __init__(self, index: Index):
+        super().__init__()
+        self.index = index
+
+    def __missing__(self, term: str) -> array:
+        term_postings = self[term] = self.index.postings(term)
+        return term_postings
+
+
+@dataclass
+class PlanStep:
+    operation: str
+    operand: str
+    operand_size: int
+    result_size: int
+    shared: bool = False
+
+    def __str__(self) -> str:
+        shared = ' (shared)' if self.shared else ''
+        return f'{self.operation} {self.operand} [{self.operand_size}]' \
+               f' -> {self.result_size}{shared}'
+
+    def as_dict(self) -> dict:
+        return {'operation': self.operation, 'operand': self.operand,
+                'operand_size': self.operand_size,
+                'result_size': self.result_size, 'shared': self.shared}
+
+
+@dataclass
+class BranchPlan:
+    query: Query
+    steps: List[PlanStep] = field(default_factory=list)
+
+    @property
+    def result_size(self) -> int:
+        return self.steps[-1].result_size if self.steps else 0
+
+    def __str__(self) -> str:
+        steps = ''.join(f'  {step}\n' for step in self.steps)
+        return f'{self.query}\n{steps}'
+
+    def as_dict(self) -> dict:
+        return {'query': str(self.query), 'result_size': self.result_size,
+                'steps': [step.as_dict() for step in self.steps]}
+
+
+@dataclass
+class QueryPlan:
+    branches: List[BranchPlan]
+
+    def __str__(self) -> str:
+        return 'Query plan:\n{}'.format(''.join(map(str, self.branches)))
+
+    def as_dict(self) -> dict:
+        return {'branches': [branch.as_dict() for branch in self.branches]}
+
+
+class QueryPlanner:
+
+    def __init__(self, index: Index, lookup: Optional[PostingsLookup] = None):
+        self.index = index
+        self.lookup = lookup if lookup is not None else PostingsLookup(index)
+        self.shared: Dict[Tuple[str, ...], array] = {}
+        self.expansions: Dict[Expansion, Tuple[List[str], array]] = {}
+        self.branches: List[BranchPlan] = []
+
+    def plan(self) -> QueryPlan:
+        return QueryPlan(self.branches)
+
+    def match(self, query: Query) -> Tuple[List[str], array]:
+        branch = BranchPlan(query)
+        self.branches.append(branch)
+        if not query.good_terms and not query.expansions:
+            found_docs = self.index.live_doc_ids()
+            branch.steps.append(PlanStep(ALL, '*', len(found_docs),
+                                         len(found_docs)))
+            return [], self.exclude(branch, found_docs)
+        scoring_terms, found_docs = self.intersect(branch)
+        found_docs = self.exclude(branch, found_docs)
+        if query.proximities and found_docs:
+            found_docs = self.match_proximities(branch, found_docs)
+        return scoring_terms, found_docs
+
+    def intersect(self, branch: BranchPlan) -> Tuple[List[str], array]:
+        query = branch.query
+        good_terms = [term for term in query.good_terms
+                      if term in self.index.terms_to_documents]
+        if query.good_terms and not good_terms:
+            branch.steps.append(PlanStep(MISSING, ' '.join(query.good_terms),
+                                         0, 0))
+            return [], postings.empty_postings()
+        operands = [(term, self.lookup[term]) for term in good_terms]
+        for expansion in query.expansions:
+            terms, expanded = self.expand(expansion)
+            good_terms.extend(term for term in terms
+                              if term not in good_terms)
+            operands.append((str(expansion), expanded))
+        operands.sort(key=lambda operand: (len(operand[1]), operand[0]))
+        key = ()
+        found_docs = None
+        for label, operand in operands:
+            key += (label,)
+            shared = key in self.shared
+            if not shared:
+                self.shared[key] = operand if found_docs is None else \
+                    postings.intersect(found_docs, operand)
+            found_docs = self.shared[key]
+            branch.steps.append(PlanStep(SCAN if len(key) == 1 else INTERSECT,
+                                         label, len(operand),
+                                         len(found_docs), shared))
+            if not found_docs:
+                return [], found_docs
+        return good_terms, found_docs
+
+    def exclude(self, branch: BranchPlan, found_docs: array) -> array:
+        query = branch.query
+        operands = [(term, self.lookup[term]) for term in query.bad_terms]
+        operands.extend((str(expansion), self.expand(expansion)[1])
+                        for expansion in query.bad_expansions)
+        for label, operand in operands:
+            if not found_docs:
+                break
+            if not operand:
+                continue
+            found_docs = postings.difference(found_docs, operand)
+            branch.steps.append(PlanStep(EXCLUDE, label, len(operand),
+                                         len(found_docs)))
+        return found_docs
+
+    def expand(self, expansion: Expansion) -> Tuple[List[str], array]:
+        if expansion not in self.expansions:
+            terms = self.index.term_dictionary().expand(expansion.pattern,
+                                                        expansion.distance)
+            self.expansions[expansion] = terms, postings.union_all(
+                self.lookup[term] for term in terms)
+        return self.expansions[expansion]
+
+    def match_proximities(self, branch: BranchPlan,
+                          candidates: array) -> array:
+        if self.index.positions is None:
+            raise PositionsNotIndexedError()
+        found_docs = postings.empty_postings()
+        for doc_id in candidates:
+            doc_positions = self.index.positions[doc_id]
+            if all(match_proximity(proximity, doc_positions)
+                   for proximity in branch.query.proximities):
+                found_docs.append(doc_id)
+        branch.steps.append(PlanStep(
+            PROXIMITY, ' '.join(map(str, branch.query.proximities)),
+            len(candidates), len(found_docs)))
+        return found_docs
+
+
+def match_proximity(proximity: Proximity,
+                    doc_positions: Dict[str, bytes]) -> bool:
+    position_lists = [positions.decode(doc_positions.get(term, b''))
+                      for term in proximity.terms]
+    if proximity.distance is None:
+        return positions.phrase(position_lists)
+    return positions.near(*position_lists, proximity.distance)
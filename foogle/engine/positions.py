@@ -0,0 +1,57 @@
+from array import array
+from typing import Dict, List, Sequence
+
+from foogle.engine import codec
+
+POSITION_TYPE = 'I'
+
+
+def encode(positions: Sequence[int]) -> bytes:
+    return codec.encode_deltas(positions)
+
+
+def decode(encoded: bytes) -> array:
+    return array(POSITION_TYPE, codec.decode_deltas(encoded)[0])
+
+
+def encode_all(positions: Dict[str, List[int]]) -> Dict[str, bytes]:
+    return {term: encode(term_positions)
+            for term, term_positions in positions.items()}
+
+
+def shifted_intersection(first: Sequence[int], second: Sequence[int],
+                         shift: int) -> List[int]:
+    result = []
+    i = j = 0
+    while i < len(first) and j < len(second):
+        target = first[i] + shift
+        if target == second[j]:
+            result.append(first[i])
+            i += 1
+            j += 1
+        elif target < second[j]:
+            i += 1
+        else:
+            j += 1
+    return result
+
+
+def phrase(position_lists: Sequence[Sequence[int]]) -> bool:
+    starts = position_lists[0]
+    for shift, term_positions in enumerate(position_lists[1:], 1):
+        starts = shifted_intersection(starts, term_positions, shift)
+        if not starts:
+            return False
+    return bool(starts)
+
+
+def near(first: Sequence[int], second: Sequence[int], distance: int) -> bool:
+    i = j = 0
+    while i < len(first) and j < len(second):
+        if abs(first[i] - second[j]) <= distance:
+            return True
+        if first[i] < second[j]:
+            i += 1
+        else:
+            j += 1
+    return False
@@ -0,0 +1,108 @@
+import heapq
+from array import array
+from bisect import bisect_left
+from typing import Iterable, Optional
+
+DOC_ID_TYPE = 'I'
+WEIGHT_TYPE = 'd'
+GALLOP_RATIO = 8
+
+
+def empty_postings() -> array:
+    return array(DOC_ID_TYPE)
+
+
+def empty_weights() -> array:
+    return array(WEIGHT_TYPE)
+
+
+def intersect(left: array, right: array) -> array:
+    if len(left) > len(right):
+        left, right = right, left
+    result = empty_postings()
+    if len(right) > len(left) * GALLOP_RATIO:
+        position = 0
+        for doc_id in left:
+            position = bisect_left(right, doc_id, position)
+            if position == len(right):
+                break
+            if right[position] == doc_id:
+                result.append(doc_id)
+        return result
+    i = j = 0
+    while i < len(left) and j < len(right):
+        if left[i] < right[j]:
+            i += 1
+        elif left[i] > right[j]:
+            j += 1
+        else:
+            result.append(left[i])
+            i += 1
+            j += 1
+    return result
+
+
+def difference(left: array, right: array) -> array:
+    result = empty_postings()
+    if not right:
+        result.extend(left)
+        return result
+    position = 0
+    for doc_id in left:
+        position = bisect_left(right, doc_id, position)
+        if position == len(right) or right[position] != doc_id:
+            result.append(doc_id)
+    return result
+
+
+def union(left: array, right: array) -> array:
+    result = empty_postings()
+    i = j = 0
+    while i < len(left) and j < len(right):
+        if left[i] < right[j]:
+            result.append(left[i])
+            i += 1
+        elif left[i] > right[j]:
+            result.append(right[j])
+            j += 1
+        else:
+            result.append(left[i])
+            i += 1
+            j += 1
+    result.extend(left[i:])
+    result.extend(right[j:])
+    return result
+
+
+def union_all(lists: Iterable[array]) -> array:
+    result = empty_postings()
+    for doc_id in heapq.merge(*lists):
+        if not result or result[-1] != doc_id:
+            result.append(doc_id)
+    return result
+
+
+def find(doc_ids: array, doc_id: int) -> int:
+    position = bisect_left(doc_ids, doc_id)
+    if position < len(doc_ids) and doc_ids[position] == doc_id:
+        return position
+    return -1
+
+
+def insert(doc_ids: array, weights: array, doc_id: int, weight: float):
+    position = bisect_left(doc_ids, doc_id)
+    if position < len(doc_ids) and doc_ids[position] == doc_id:
+        weights[position] = weight
+        return
+    doc_ids.insert(position, doc_id)
+    weights.insert(position, weight)
+
+
+def remove(doc_ids: array, weights: array, doc_id: int) -> Optional[float]:
+    position = find(doc_ids, doc_id)
+    if position == -1:
+        return None
+    weight = weights[position]
+    del doc_ids[position]
+    del weights[position]
+    return weight
@@ -1,24 +1,66 @@
 import re
 
 from dataclasses import dataclass, field
-from typing import Set, List, Optional
+from typing import Set, List, Optional, Tuple, Union
 
 from foogle.engine.errors import QueryError
+from foogle.engine.tokenizer import TOKEN_PATTERN
+
+QUERY_TOKEN_PATTERN = re.compile(r'-?"[^"]*"|\S+')
+NEAR_PATTERN = re.compile(r'near/(\d+)')
+FUZZY_PATTERN = re.compile(r'([^\W_]+)~(\d?)')
+WILDCARD_PATTERN = re.compile(r'[^\w*?]|_')
+DEFAULT_FUZZY_DISTANCE = 2
+MAX_FUZZY_DISTANCE = 2
+
+
+@dataclass(frozen=True)
+class Expansion:
+    pattern: str
+    distance: Optional[int] = None
+
+    def __str__(self):
+        if self.distance is None:
+            return self.pattern
+        return f'{self.pattern}~{self.distance}'
+
+
+@dataclass(frozen=True)
+class Proximity:
+    terms: Tuple[str, ...]
+    distance: Optional[int] = None
+
+    def __str__(self):
+        if self.distance is None:
+            return '"{}"'.format(' '.join(self.terms))
+        return f' NEAR/{self.distance} '.join(self.terms)
 
 
 @dataclass
 class Query:
     good_terms: Set[str] = field(default_factory=set)
     bad_terms: Set[str] = field(default_factory=set)
+    proximities: Set[Proximity] = field(default_factory=set)
+    expansions: Set[Expansion] = field(default_factory=set)
+    bad_expansions: Set[Expansion] = field(default_factory=set)
 
     def __eq__(self, other: 'Query'):
         return self.good_terms == other.good_terms and \
-               self.bad_terms == other.bad_terms
+               self.bad_terms == other.bad_terms and \
+               self.proximities == other.proximities and \
+               self.expansions == other.expansions and \
+               self.bad_expansions == other.bad_expansions
 
     def __hash__(self):
         hsh = 0
         for term in self.good_terms | self.bad_terms:
             hsh += hash(term)
+        for proximity in self.proximities:
+            hsh += hash(proximity)
+        for expansion in self.expansions:
+            hsh += hash(expansion)
+        for expansion in self.bad_expansions:
+            hsh -= hash(expansion)
         return hsh
 
     def __str__(self):
@@ -30,11 +72,15 @@ class Query:
         if bad_terms_str:
             bad_terms_str = '-' + bad_terms_str
             query.append(bad_terms_str)
+        query.extend(map(str, self.proximities))
+        query.extend(map(str, self.expansions))
+        query.extend(f'-{expansion}' for expansion in self.bad_expansions)
         query_str = ' && '.join(query)
         return f'Query(transformed): {query_str}'
 
     def is_empty(self):
-        return not self.bad_terms and not self.good_terms
+        return not self.bad_terms and not self.good_terms and \
+            not self.expansions and not self.bad_expansions
 
 
 class QueryParser:
@@ -42,13 +88,17 @@ class QueryParser:
     def parse_query(raw_query: str) -> Set[Query]:
         if not raw_query:
             raise QueryError(raw_query)
-        query_parts = raw_query.lower().split(' ')
+        query_parts = QUERY_TOKEN_PATTERN.findall(raw_query.lower())
         stack = []
         united_terms = []
         queries = set()
+        near_distance = None
         for token in query_parts:
             if len(stack) > 1:
                 raise QueryError(raw_query)
+            near = NEAR_PATTERN.fullmatch(token)
+            if near_distance is not None and (near or token in ('||', '&&')):
+                raise QueryError(raw_query)
             if token == '||':
                 united_terms.extend(stack)
                 if not united_terms:
@@ -61,9 +111,18 @@ class QueryParser:
             elif token == '&&':
                 united_terms.extend(stack)
                 stack.clear()
+            elif near:
+                if len(stack) != 1:
+                    raise QueryError(raw_query)
+                near_distance = int(near.group(1))
+            elif near_distance is not None:
+                stack.append(QueryParser.create_near(
+                    stack.pop(), QueryParser.create_operand(token),
+                    near_distance, raw_query))
+                near_distance = None
             else:
-                stack.append(token)
-        if len(stack) > 1:
+                stack.append(QueryParser.create_operand(token))
+        if len(stack) > 1 or near_distance is not None:
             raise QueryError(raw_query)
         if stack:
             united_terms.extend(stack)
@@ -77,17 +136,71 @@ class QueryParser:
         return queries
 
     @staticmethod
-    def create_query(terms: List[str]) -> Optional[Query]:
+    def create_operand(token: str) -> Union[str, Proximity]:
+        if token.startswith('-"'):
+            raise QueryError(token)
+        if not token.startswith('"'):
+            return token
+        terms = tuple(TOKEN_PATTERN.findall(token))
+        if len(terms) == 1:
+            return terms[0]
+        if not terms:
+            return ''
+        return Proximity(terms)
+
+    @staticmethod
+    def create_near(left: Union[str, Proximity], right: Union[str, Proximity],
+                    distance: int, raw_query: str) -> Proximity:
+        operands = []
+        for operand in (left, right):
+            if isinstance(operand, Proximity) or operand.startswith('-'):
+                raise QueryError(raw_query)
+            operands.append(re.sub(r'[\W_]+', '', operand))
+        return Proximity(tuple(operands), distance)
+
+    @staticmethod
+    def create_expansion(term: str) -> Optional[Expansion]:
+        fuzzy = FUZZY_PATTERN.fullmatch(term)
+        if fuzzy:
+            distance = int(fuzzy.group(2) or DEFAULT_FUZZY_DISTANCE)
+            if distance > MAX_FUZZY_DISTANCE:
+                raise QueryError(term)
+            return Expansion(fuzzy.group(1), distance)
+        if '*' not in term and '?' not in term:
+            return None
+        pattern = WILDCARD_PATTERN.sub('', term)
+        if not pattern.strip('*?'):
+            raise QueryError(term)
+        return Expansion(pattern)
+
+    @staticmethod
+    def create_query(terms: List[Union[str, Proximity]]) -> Optional[Query]:
         good_terms = set()
         bad_terms = set()
+        proximities = set()
+        expansions = set()
+        bad_expansions = set()
         pattern = re.compile(r'[\W_]+')
         for term in terms:
-            if term.startswith('-'):
+            if isinstance(term, Proximity):
+                proximities.add(term)
+                good_terms.update(term.terms)
+                continue
+            excluded = term.startswith('-')
+            expansion = QueryParser.create_expansion(
+                term[1:] if excluded else term)
+            if expansion is not None:
+                if excluded:
+                    bad_expansions.add(expansion)
+                else:
+                    expansions.add(expansion)
+            elif excluded:
                 term = pattern.sub('', term[1:])
                 bad_terms.add(term)
             else:
                 term = pattern.sub('', term)
                 good_terms.add(term)
-        if not good_terms & bad_terms:
-            return Query(good_terms, bad_terms)
+        if not good_terms & bad_terms and not expansions & bad_expansions:
+            return Query(good_terms, bad_terms, proximities, expansions,
+                         bad_expansions)
         return None
@@ -0,0 +1,71 @@
+import heapq
+from array import array
+from typing import List, Optional, Sequence, Tuple, Union
+
+from foogle.engine import postings
+from foogle.engine.index import CollectionStatistics, Index
+
+Statistics = Union[Index, CollectionStatistics]
+
+
+class TermScorer:
+
+    def __init__(self, index: Index, term: str,
+                 statistics: Optional[Statistics] = None):
+        self.doc_ids = index.postings(term)
+        self.tf = index.tf[term]
+        self.idf = (statistics or index).idf(term)
+        self.max_score = index.max_tf[term] * self.idf
+
+    def score(self, doc_id: int) -> float:
+        position = postings.find(self.doc_ids, doc_id)
+        if position == -1:
+            return 0.0
+        return self.tf[position] * self.idf
+
+
+def rank(index: Index, terms: Sequence[str], candidates: array,
+         limit: Optional[int] = None) -> List[int]:
+    return [doc_id for doc_id, _ in
+            rank_scored(index, terms, candidates, limit)]
+
+
+def rank_scored(index: Index, terms: Sequence[str], candidates: array,
+                limit: Optional[int] = None,
+                statistics: Optional[Statistics] = None) -> \
+        List[Tuple[int, float]]:
+    scorers = [TermScorer(index, term, statistics) for term in terms]
+    if limit is None or limit >= len(candidates):
+        scores = {doc_id: sum(scorer.score(doc_id) for scorer in scorers)
+                  for doc_id in candidates}
+        ranked = sorted(candidates,
+                        key=lambda doc_id: (-scores[doc_id], doc_id))
+        return [(doc_id, scores[doc_id]) for doc_id in ranked]
+    return top_k(scorers, candidates, limit)
+
+
+def top_k(scorers: List[TermScorer], candidates: array,
+          limit: int) -> List[Tuple[int, float]]:
+    if limit <= 0:
+        return []
+    scorers = sorted(scorers, key=lambda scorer: -scorer.max_score)
+    remaining_bounds = [0.0] * (len(scorers) + 1)
+    for i in range(len(scorers) - 1, -1, -1):
+        remaining_bounds[i] = remaining_bounds[i + 1] + scorers[i].max_score
+    heap = []
+    for doc_id in candidates:
+        threshold = heap[0][0] if len(heap) == limit else None
+        if threshold is not None and remaining_bounds[0] <= threshold:
+            break
+        score = 0.0
+        for i, scorer in enumerate(scorers):
+            if threshold is not None and \
+                    score + remaining_bounds[i] <= threshold:
+                break
+            score += scorer.score(doc_id)
+        else:
+            if threshold is None:
+                heapq.heappush(heap, (score, -doc_id))
+            elif score > threshold:
+                heapq.heapreplace(heap, (score, -doc_id))
+    return [(-doc_id, score) for score, doc_id in sorted(heap, reverse=True)]
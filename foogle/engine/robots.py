@@ -0,0 +1,63 @@
+import re
+from pathlib import Path
+from typing import Iterable, List, Optional
+
+from foogle.engine.errors import RobotTxtNotFound
+
+
+class ExclusionRules:
+
+    def __init__(self, patterns: Iterable[str]):
+        self.patterns: List[str] = []
+        for pattern in patterns:
+            pattern = pattern.strip()
+            if not pattern or pattern.startswith('#'):
+                continue
+            self.patterns.append(pattern)
+        self.regex: Optional[re.Pattern] = None
+        if self.patterns:
+            self.regex = re.compile('|'.join(
+                self.translate(pattern) for pattern in self.patterns))
+
+    @staticmethod
+    def from_file(robot_txt: str) -> 'ExclusionRules':
+        robot_txt_path = Path(robot_txt).absolute()
+        if not robot_txt_path.exists() or robot_txt_path.is_dir():
+            raise RobotTxtNotFound(robot_txt)
+        with robot_txt_path.open('r') as f:
+            return ExclusionRules(f)
+
+    @staticmethod
+    def translate(pattern: str) -> str:
+        anchored = pattern.startswith('/')
+        pattern = pattern.strip('/')
+        if pattern.startswith('./'):
+            pattern = pattern[2:]
+        regex = []
+        i = 0
+        while i < len(pattern):
+            char = pattern[i]
+            if pattern.startswith('**', i):
+                regex.append('.*')
+                i += 2
+                continue
+            if char == '*':
+                regex.append('[^/]*')
+            elif char == '?':
+                regex.append('[^/]')
+            elif char == '[' and ']' in pattern[i + 2:]:
+                end = pattern.index(']', i + 2)
+                char_class = pattern[i + 1:end].replace('\\', '\\\\')
+                if char_class.startswith('!'):
+                    char_class = '^' + char_class[1:]
+                regex.append(f'[{char_class}]')
+                i = end
+            else:
+                regex.append(re.escape(char))
+            i += 1
+        prefix = '' if anchored else '(?:.*/)?'
+        return f'(?:{prefix}{"".join(regex)})'
+
+    def excludes(self, relative_path: str) -> bool:
+        return self.regex is not None and \
+            self.regex.fullmatch(relative_path) is not None
@@ -1,40 +1,49 @@
 import collections
-import math
-import pickle
-import re
+import dataclasses
+import functools
+import itertools
+import os
+import tempfile
+import threading
 import time
+from array import array
+from concurrent.futures import Future, ProcessPoolExecutor
 from dataclasses import dataclass
-from hashlib import md5
 from pathlib import Path
-from typing import Generator, Set, Dict, List, Tuple, Counter, Optional
-
-import magic
-
+from typing import Iterator, Dict, List, Tuple, Counter, Optional, \
+    Iterable, NamedTuple, Set
+
+from foogle.engine import classifier, metrics, postings, ranking, segment, \
+    spimi, trigrams, weighting
+from foogle.engine.cache import QueryCache
+from foogle.engine.crawler import Crawler, CrawlOptions, CrawledFile
+from foogle.engine.index import CollectionStatistics, Index, Fingerprint
+from foogle.engine.jobs import BuildProgress
+from foogle.engine.metrics import Metrics, MetricsReport
+from foogle.engine.planner import QueryPlan, QueryPlanner
 from foogle.engine.query_parser import Query, QueryParser
+from foogle.engine.robots import ExclusionRules
+from foogle.engine.tokenizer import Tokenizer
 from foogle.engine.errors import IndexEmptyError, IndexBrokenError, \
-    IndexNotExistError, IndexOutDatedError, InvalidRootDirectory, \
-    RobotTxtNotFound
+    IndexNotExistError, InvalidWorkersCount, InvalidResultsLimit, \
+    InvalidResultsOffset, InvalidMemoryBudget, QueryError
 
+INDEX_PATH = Path('search_index')
+PATHS_QUERY = 'paths'
 
-@dataclass
-class Index:
-    root_path: Path
-    mtime: float
-    documents_to_terms: Dict[Path, Counter[str]]
-    terms_to_documents: Dict[str, List[Path]]
-    tf_idf: Dict[Path, Dict[str, float]]
+Collected = Tuple[Dict[Path, Counter[str]], Dict[Path, Fingerprint],
+                  Dict[Path, Dict[str, bytes]]]
 
-    @property
-    def unique_terms(self) -> Set[str]:
-        return set(self.terms_to_documents.keys())
 
-    @property
-    def documents(self) -> Set[Path]:
-        return set(self.documents_to_terms)
+@dataclass
+class UpdateResult:
+    added: int = 0
+    modified: int = 0
+    removed: int = 0
 
-    @property
-    def collection_size(self) -> int:
-        return len(self.documents_to_terms)
+    def __str__(self) -> str:
+        return f'{self.added} added, {self.modified} modified,' \
+               f' {self.removed} removed'
 
 
 @dataclass
@@ -82,193 +91,662 @@ class SearchByManyQueriesResult:
         return self.search_results.__iter__()
 
 
-class SearchEngine:
+@dataclass
+class ScoredSearchResult:
+    query: Query
+    total: int
+    hits: List[Tuple[Path, float]]
+    elapsed: float
+
+    def as_dict(self) -> dict:
+        return {'query': {'terms': sorted(self.query.good_terms),
+                          'excluded': sorted(self.query.bad_terms)},
+                'total': self.total,
+                'hits': [{'path': str(path), 'score': score}
+                         for path, score in self.hits],
+                'elapsed': self.elapsed}
+
+
+@dataclass
+class PathSearchResult:
+    query: str
+    documents: List[Path]
+
+    def __str__(self) -> str:
+        return 'Searched paths with pattern {}\n' \
+               'Found {} files(s):\n{}\n'.format(
+                   self.query, len(self.documents),
+                   '\n'.join(map(str, self.documents)))
+
+    def as_dict(self) -> dict:
+        return {'pattern': self.query,
+                'paths': [str(path) for path in self.documents]}
+
+
+class Snapshot(NamedTuple):
+    index: Optional[Index]
+    generation: int
+
 
-    def __init__(self):
+class SearchEngine:
+    shards_per_worker = 4
+    external_chunk_size = 64
+
+    def __init__(self, use_numpy: bool = False,
+                 tokenizer: Optional[Tokenizer] = None,
+                 cache: Optional[QueryCache] = None,
+                 crawl_options: Optional[CrawlOptions] = None,
+                 metrics: Optional[Metrics] = None):
+        self.cache = cache or QueryCache()
+        self.metrics = metrics or Metrics()
+        self.crawl_options = crawl_options or CrawlOptions()
+        self.generations = itertools.count()
+        self.write_lock = threading.RLock()
+        self.footprint: Optional[Tuple[int, Dict[str, int]]] = None
         self.index: Optional[Index] = None
+        self.use_numpy = use_numpy
+        self.tokenizer = tokenizer or Tokenizer()
+
+    @property
+    def index(self) -> Optional[Index]:
+        return self.snapshot.index
+
+    @index.setter
+    def index(self, index: Optional[Index]):
+        self.snapshot = Snapshot(index, next(self.generations))
+        self.cache.invalidate()
 
     def check_index_exist(self):
         if not self.index:
             raise IndexEmptyError()
 
-    def load_index(self):
-        index_path = Path('search_index').absolute()
+    def load_index(self, index_path: Path = INDEX_PATH):
+        index_path = index_path.absolute()
+        with self.write_lock, self.metrics.stage('load'):
+            try:
+                self.index = segment.open_segment(index_path)
+            except IndexBrokenError:
+                index_path.unlink()
+                raise
+            except FileNotFoundError:
+                raise IndexNotExistError()
+
+    def save_index(self, index_path: Path = INDEX_PATH):
+        index = self.index
+        if not index:
+            raise IndexEmptyError()
+        with self.metrics.stage('save'):
+            segment.write_segment(index, index_path.absolute())
+
+    def size_report(self, index_path: Path = INDEX_PATH) -> \
+            segment.SizeReport:
         try:
-            with index_path.open('rb') as f:
-                check_sum = f.read(16)
-                raw_index = f.read()
-                assert check_sum == self.calc_md5(raw_index)
-                index: Index = pickle.loads(raw_index)
-                if index.mtime < index.root_path.stat().st_mtime:
-                    root_path = index.root_path
-                    raise IndexOutDatedError(str(root_path))
-                self.index = index
-        except (AssertionError, pickle.PickleError):
-            index_path.unlink()
-            raise IndexBrokenError()
+            return segment.size_report(index_path.absolute())
         except FileNotFoundError:
             raise IndexNotExistError()
 
-    def save_index(self):
-        self.check_index_exist()
-        index_path = Path('search_index').absolute()
-        pickled_index = pickle.dumps(self.index)
-        check_sum = self.calc_md5(pickled_index)
-        with index_path.open('wb') as f:
-            f.write(check_sum)
-            f.write(pickled_index)
-
-    def search(self, query: str) -> SearchByManyQueriesResult:
-        self.check_index_exist()
+    def search(self, query: str, limit: Optional[int] = None) -> \
+            SearchByManyQueriesResult:
+        snapshot = self.snapshot
+        if not snapshot.index:
+            raise IndexEmptyError()
+        if limit is not None and limit < 0:
+            raise InvalidResultsLimit(str(limit))
+        started = time.perf_counter()
         queries = QueryParser.parse_query(query)
         results = []
+        planner = QueryPlanner(snapshot.index)
         for query in queries:
-            results.append(self.search_by_one_query(query))
+            key = snapshot.generation, query, limit
+            result = self.cache.get(key)
+            if result is None:
+                result = self.search_by_one_query(query, limit,
+                                                  snapshot.index, planner)
+                self.cache.put(key, result)
+            results.append(result)
+        if self.metrics.enabled:
+            self.metrics.observe_query(metrics.query_shape(queries),
+                                       time.perf_counter() - started)
         return SearchByManyQueriesResult(results)
 
-    def search_by_one_query(self, query: Query) -> SearchByOneQueryResult:
-        documents_score = collections.Counter()
-        bad_docs = set()
-        for bad_term in query.bad_terms:
-            if bad_term in self.index.terms_to_documents:
-                bad_docs |= set(
-                    self.index.terms_to_documents[bad_term]
-                )
-        if not query.good_terms:
-            found_docs = list(self.index.documents_to_terms.keys() - bad_docs)
-            return SearchByOneQueryResult(query, found_docs)
-        good_docs = set()
-        for term in query.good_terms:
-            if term not in self.index.terms_to_documents:
-                continue
-            if not good_docs:
-                good_docs = set(self.index.terms_to_documents[term])
+    def search_paths(self, pattern: str, limit: Optional[int] = None) -> \
+            PathSearchResult:
+        snapshot = self.snapshot
+        if not snapshot.index:
+            raise IndexEmptyError()
+        if not pattern:
+            raise QueryError(pattern)
+        if limit is not None and limit < 0:
+            raise InvalidResultsLimit(str(limit))
+        started = time.perf_counter()
+        key = snapshot.generation, (PATHS_QUERY, pattern), limit
+        result = self.cache.get(key)
+        if result is None:
+            result = PathSearchResult(pattern, trigrams.search(
+                snapshot.index, pattern, limit))
+            self.cache.put(key, result)
+        self.metrics.observe_query(PATHS_QUERY, time.perf_counter() - started)
+        return result
+
+    def explain(self, query: str) -> QueryPlan:
+        index = self.index
+        if not index:
+            raise IndexEmptyError()
+        planner = QueryPlanner(index)
+        for parsed_query in QueryParser.parse_query(query):
+            planner.match(parsed_query)
+        return planner.plan()
+
+    def search_page(self, query: str, offset: int = 0,
+                    limit: Optional[int] = None) -> List[ScoredSearchResult]:
+        return next(self.search_batch([query], offset, limit))
+
+    def search_batch(self, queries: List[str], offset: int = 0,
+                     limit: Optional[int] = None) -> \
+            Iterator[List[ScoredSearchResult]]:
+        index = self.index
+        if not index:
+            raise IndexEmptyError()
+        if offset < 0:
+            raise InvalidResultsOffset(str(offset))
+        if limit is not None and limit < 0:
+            raise InvalidResultsLimit(str(limit))
+        parsed = [QueryParser.parse_query(query) for query in queries]
+        planner = QueryPlanner(index)
+        return map(functools.partial(self.search_scored_batch, offset=offset,
+                                     limit=limit, index=index,
+                                     planner=planner), parsed)
+
+    def search_scored_batch(self, queries: List[Query], offset: int,
+                            limit: Optional[int], index: Index,
+                            planner: QueryPlanner) -> \
+            List[ScoredSearchResult]:
+        started = time.perf_counter()
+        results = [self.search_scored(query, offset, limit, index, planner)
+                   for query in queries]
+        if self.metrics.enabled:
+            self.metrics.observe_query(metrics.query_shape(queries),
+                                       time.perf_counter() - started)
+        return results
+
+    def search_scored(self, query: Query, offset: int,
+                      limit: Optional[int], index: Index,
+                      planner: QueryPlanner,
+                      statistics: Optional[CollectionStatistics] = None) -> \
+            ScoredSearchResult:
+        started = time.perf_counter()
+        good_terms, found_docs = planner.match(query)
+        end = offset + limit if limit is not None else None
+        if not good_terms:
+            hits = [(doc_id, 0.0) for doc_id in found_docs[offset:end]]
+        elif self.use_numpy:
+            hits = weighting.rank_scored(index, good_terms, found_docs,
+                                         end, statistics)[offset:]
+        else:
+            hits = ranking.rank_scored(index, good_terms, found_docs,
+                                       end, statistics)[offset:]
+        hits = [(index.doc_table[doc_id], score) for doc_id, score in hits]
+        return ScoredSearchResult(query, len(found_docs), hits,
+                                  time.perf_counter() - started)
+
+    def search_by_one_query(self, query: Query,
+                            limit: Optional[int] = None,
+                            index: Optional[Index] = None,
+                            planner: Optional[QueryPlanner] = None) -> \
+            SearchByOneQueryResult:
+        index = index or self.index
+        planner = planner or QueryPlanner(index)
+        good_terms, found_docs = planner.match(query)
+        if not good_terms:
+            return SearchByOneQueryResult(query,
+                                          index.paths(found_docs[:limit]))
+        if self.use_numpy:
+            ranked = weighting.rank(index, good_terms, found_docs, limit)
+        else:
+            ranked = ranking.rank(index, good_terms, found_docs, limit)
+        return SearchByOneQueryResult(query, index.paths(ranked))
+
+    def build_index(self, root_dir: str, robot_txt: str, workers: int = 1,
+                    progress: Optional[BuildProgress] = None,
+                    store_positions: bool = False,
+                    memory_budget: Optional[int] = None):
+        if workers < 1:
+            raise InvalidWorkersCount(str(workers))
+        if memory_budget is not None and memory_budget < 1:
+            raise InvalidMemoryBudget(str(memory_budget))
+        rules = self.load_rules(robot_txt)
+        if memory_budget is not None:
+            self.build_external(root_dir, robot_txt, rules, workers,
+                                progress, store_positions, memory_budget)
+            return
+        with self.metrics.stage('collect'):
+            documents_to_terms, fingerprints, documents_to_positions = \
+                self.collect_documents_and_terms(root_dir, rules, workers,
+                                                 progress, store_positions)
+        self.record_collected(documents_to_terms, fingerprints)
+        doc_table = sorted(fingerprints)
+        documents_to_terms = {doc_id: documents_to_terms[doc]
+                              for doc_id, doc in enumerate(doc_table)
+                              if doc in documents_to_terms}
+        index_positions = None
+        if store_positions:
+            index_positions = {doc_id: documents_to_positions[doc]
+                               for doc_id, doc in enumerate(doc_table)
+                               if doc in documents_to_positions}
+        with self.metrics.stage('invert'):
+            if self.use_numpy:
+                terms_to_documents, tf, max_tf = \
+                    weighting.invert(documents_to_terms)
             else:
-                good_docs &= set(self.index.terms_to_documents[term])
-        good_docs -= bad_docs
-        for term in query.good_terms:
-            if term not in self.index.terms_to_documents:
-                continue
-            for doc in good_docs:
-                document_tf_idf = self.index.tf_idf[doc]
-                documents_score[doc] += document_tf_idf[term]
-        return SearchByOneQueryResult(query, sorted(documents_score,
-                                                    key=lambda document: -
-                                                    documents_score[
-                                                        document]))
-
-    def build_index(self, root_dir: str, robot_txt: str):
-        ignored = self.collect_ignored(robot_txt) if robot_txt else set()
-        documents_to_terms, terms_to_documents = \
-            self.collect_documents_and_terms(root_dir, ignored)
-        tf = self.compute_tf(documents_to_terms)
-        idf = self.compute_idf(documents_to_terms)
-        tf_idf = self.compute_tf_idf(tf, idf)
-        self.index = Index(Path(root_dir).absolute(),
-                           time.time(),
-                           documents_to_terms,
-                           terms_to_documents,
-                           tf_idf)
-
-    def collect_documents_and_terms(self, root_dir: str,
-                                    ignored: Set[Path]) -> \
-            Tuple[Dict[Path, Counter[str]], Dict[str, List[Path]]]:
-        documents_to_terms = {}
-        terms_to_documents = collections.defaultdict(list)
-        for doc in self.walk_documents(root_dir, ignored):
-            doc_size = doc.stat().st_size
-            if doc_size == 0:
-                continue
-            encoding = self.get_file_encoding(str(doc))
-            if encoding == 'binary':
-                continue
-            document_terms = self.read_document(doc, encoding)
-            documents_to_terms[doc] = collections.Counter(document_terms)
-            for term in document_terms:
-                terms_to_documents[term].append(doc)
-        return documents_to_terms, terms_to_documents
+                terms_to_documents, tf, max_tf = \
+                    self.invert(documents_to_terms)
+        with self.metrics.stage('path_trigrams'):
+            path_trigrams = trigrams.build(Path(root_dir).absolute(),
+                                           doc_table)
+        robot_txt = str(Path(robot_txt).absolute()) if robot_txt else ''
+        index = Index(Path(root_dir).absolute(),
+                      time.time(),
+                      doc_table,
+                      documents_to_terms,
+                      terms_to_documents,
+                      tf,
+                      max_tf,
+                      fingerprints,
+                      robot_txt,
+                      index_positions,
+                      path_trigrams)
+        with self.metrics.stage('term_dictionary'):
+            index.term_dictionary()
+        with self.write_lock:
+            self.index = index
+
+    def build_external(self, root_dir: str, robot_txt: str,
+                       rules: Optional[ExclusionRules], workers: int,
+                       progress: Optional[BuildProgress],
+                       store_positions: bool, memory_budget: int):
+        known = self.known_fingerprints(root_dir)
+        documents = self.crawl(root_dir, rules)
+        if progress is not None:
+            documents = progress.discover(documents)
+        documents = sorted(documents, key=lambda document: document[0])
+        builder = spimi.ExternalIndexBuilder(memory_budget, store_positions)
+        fingerprints = {}
+        for documents_to_terms, chunk_fingerprints, documents_to_positions \
+                in self.collect_chunks(documents, known, workers, progress,
+                                       store_positions):
+            self.record_collected(documents_to_terms, chunk_fingerprints)
+            fingerprints.update(chunk_fingerprints)
+            for doc in sorted(chunk_fingerprints):
+                if doc in documents_to_terms:
+                    builder.add_document(doc, documents_to_terms[doc],
+                                         documents_to_positions.get(doc))
+                else:
+                    builder.add_path(doc)
+        root_path = Path(root_dir).absolute()
+        descriptor, index_path = tempfile.mkstemp(prefix='foogle-',
+                                                  suffix='.segment')
+        os.close(descriptor)
+        index_path = Path(index_path)
+        try:
+            with self.metrics.stage('merge_runs'):
+                builder.write(index_path, root_path, fingerprints,
+                              {'root_path': str(root_path),
+                               'mtime': time.time(),
+                               'robot_txt': str(Path(robot_txt).absolute())
+                               if robot_txt else ''})
+            index = segment.open_segment(index_path)
+        finally:
+            index_path.unlink()
+        self.metrics.increment('runs_spilled', builder.runs_count)
+        index.term_dictionary()
+        with self.write_lock:
+            self.index = index
+
+    def collect_chunks(self, documents: List[CrawledFile],
+                       known: Dict[Path, Fingerprint], workers: int,
+                       progress: Optional[BuildProgress],
+                       store_positions: bool) -> Iterator[Collected]:
+        chunks = [documents[i:i + self.external_chunk_size]
+                  for i in range(0, len(documents), self.external_chunk_size)]
+        if workers == 1:
+            for chunk in chunks:
+                yield self.collect_shard(chunk, known, self.tokenizer,
+                                         progress, store_positions,
+                                         self.metrics)
+            return
+        pending = collections.deque()
+        with ProcessPoolExecutor(workers) as executor:
+            try:
+                for chunk in chunks:
+                    pending.append(executor.submit(
+                        self.collect_timed_shard, chunk,
+                        {doc: known[doc] for doc, _ in chunk if doc in known},
+                        self.tokenizer, store_positions,
+                        self.metrics.enabled))
+                    if len(pending) > 2 * workers:
+                        yield self.collected_chunk(pending.popleft(),
+                                                   progress)
+                while pending:
+                    yield self.collected_chunk(pending.popleft(), progress)
+            finally:
+                for future in pending:
+                    future.cancel()
+
+    def collected_chunk(self, future: Future,
+                        progress: Optional[BuildProgress]) -> Collected:
+        collected, stages = future.result()
+        self.metrics.merge_stages(stages)
+        if progress is not None:
+            for fingerprint in collected[1].values():
+                progress.scanned(fingerprint)
+            progress.check_cancelled()
+        return collected
+
+    def update_index(self) -> UpdateResult:
+        with self.write_lock, self.metrics.stage('update'):
+            self.check_index_exist()
+            return self.update_snapshot(self.index)
+
+    def update_paths(self, paths: Iterable[Path]) -> UpdateResult:
+        with self.write_lock, self.metrics.stage('update_paths'):
+            self.check_index_exist()
+            index = self.index
+            crawler = Crawler(str(index.root_path),
+                              self.load_rules(index.robot_txt),
+                              self.crawl_options)
+            current = {}
+            directories = set()
+            scope = set()
+            for path in paths:
+                if path.is_dir():
+                    current.update(crawler.subtree(path))
+                    directories.add(path)
+                    continue
+                crawled = crawler.crawl_path(path)
+                if crawled is not None:
+                    current[path] = crawled[1]
+                if path in index.fingerprints:
+                    scope.add(path)
+                elif not os.path.lexists(path):
+                    directories.add(path)
+            if directories:
+                scope.update(doc for doc in index.fingerprints
+                             if not directories.isdisjoint(doc.parents))
+            return self.apply_changes(index, current, scope)
+
+    def update_snapshot(self, index: Index) -> UpdateResult:
+        rules = self.load_rules(index.robot_txt)
+        current = dict(self.crawl(str(index.root_path), rules))
+        return self.apply_changes(index, current, index.fingerprints.keys())
+
+    def apply_changes(self, index: Index, current: Dict[Path, Fingerprint],
+                      scope: Iterable[Path]) -> UpdateResult:
+        stale = [doc for doc in scope
+                 if current.get(doc) != index.fingerprints.get(doc)]
+        changed = [doc for doc, fingerprint in current.items()
+                   if index.fingerprints.get(doc) != fingerprint]
+        result = UpdateResult(
+            added=sum(doc not in index.fingerprints for doc in current),
+            removed=sum(doc not in current for doc in stale))
+        result.modified = len(changed) - result.added
+        if not stale and not changed:
+            return result
+        previous, index = index, index.copy()
+        copied = set()
+        copied_trigrams = set()
+        doc_ids = index.doc_ids()
+        for doc in stale:
+            del index.fingerprints[doc]
+            if doc in doc_ids:
+                self.remove_document(index, doc_ids[doc], copied)
+        documents_to_terms, fingerprints, documents_to_positions = \
+            self.collect_shard([(doc, current[doc]) for doc in changed],
+                               tokenizer=self.tokenizer,
+                               store_positions=index.positions is not None,
+                               metrics=self.metrics)
+        self.record_collected(documents_to_terms, fingerprints)
+        index.fingerprints.update(fingerprints)
+        for doc in fingerprints:
+            doc_id = doc_ids.get(doc)
+            if doc_id is None:
+                doc_id = doc_ids[doc] = len(index.doc_table)
+                index.doc_table.append(doc)
+                trigrams.add_path(index, doc_id, copied_trigrams)
+            if doc in documents_to_terms:
+                self.add_document(index, doc_id, documents_to_terms[doc],
+                                  copied, documents_to_positions.get(doc))
+        for doc in stale:
+            if doc in doc_ids and doc not in fingerprints:
+                doc_id = doc_ids.pop(doc)
+                trigrams.remove_path(index, doc_id, copied_trigrams)
+                index.doc_table[doc_id] = None
+        index.mtime = time.time()
+        index.dictionary = previous.term_dictionary().updated(
+            [term for term in copied if term in index.terms_to_documents
+             and term not in previous.terms_to_documents],
+            [term for term in copied if term not in index.terms_to_documents
+             and term in previous.terms_to_documents])
+        self.index = index
+        return result
 
     @staticmethod
-    def compute_tf(documents_to_terms: Dict[Path, Counter[str]]) -> \
-            Dict[Path, Dict[str, float]]:
-        tf = {}
-        for document, terms in documents_to_terms.items():
-            tf_by_document = {}
-            total_terms = sum(terms.values())
-            for term, count in terms.items():
-                tf_by_document[term] = count / total_terms
-            tf[document] = tf_by_document
-        return tf
+    def add_document(index: Index, doc_id: int, terms: Counter[str],
+                     copied: Set[str],
+                     doc_positions: Optional[Dict[str, bytes]] = None):
+        index.documents_to_terms[doc_id] = terms
+        if index.positions is not None:
+            index.positions[doc_id] = doc_positions
+        total_terms = sum(terms.values())
+        for term, count in terms.items():
+            if term not in index.terms_to_documents:
+                index.terms_to_documents[term] = postings.empty_postings()
+                index.tf[term] = postings.empty_weights()
+                index.max_tf[term] = 0
+                copied.add(term)
+            SearchEngine.copy_on_write(index, term, copied)
+            term_tf = count / total_terms
+            postings.insert(index.terms_to_documents[term], index.tf[term],
+                            doc_id, term_tf)
+            index.max_tf[term] = max(index.max_tf[term], term_tf)
 
     @staticmethod
-    def compute_idf(documents_to_terms: Dict[Path, Counter[str]]) -> \
-            Dict[str, float]:
-        idf = {}
-        terms_to_docs_count_with_term = collections.Counter()
-        for document in documents_to_terms:
-            for term in documents_to_terms[document]:
-                terms_to_docs_count_with_term[term] += 1
-        for term, count in terms_to_docs_count_with_term.items():
-            idf[term] = math.log(len(documents_to_terms) / count, math.e)
-        return idf
+    def remove_document(index: Index, doc_id: int, copied: Set[str]):
+        terms = index.documents_to_terms.pop(doc_id, None)
+        if terms is None:
+            return
+        if index.positions is not None:
+            index.positions.pop(doc_id, None)
+        for term in terms:
+            SearchEngine.copy_on_write(index, term, copied)
+            term_tf = postings.remove(index.terms_to_documents[term],
+                                      index.tf[term], doc_id)
+            if not index.terms_to_documents[term]:
+                del index.terms_to_documents[term]
+                del index.tf[term]
+                del index.max_tf[term]
+            elif term_tf == index.max_tf[term]:
+                index.max_tf[term] = max(index.tf[term])
 
     @staticmethod
-    def compute_tf_idf(tf: Dict[Path, Dict[str, float]],
-                       idf: Dict[str, float]) -> Dict[Path, Dict[str, float]]:
-        tf_idf = {}
-        for document, document_tf in tf.items():
-            tf_idf[document] = {}
-            for term in document_tf:
-                tf_idf[document][term] = document_tf.get(term, 0) * idf[term]
-        return tf_idf
+    def copy_on_write(index: Index, term: str, copied: Set[str]):
+        if term in copied:
+            return
+        index.terms_to_documents[term] = array(
+            postings.DOC_ID_TYPE, index.terms_to_documents[term])
+        index.tf[term] = array(postings.WEIGHT_TYPE, index.tf[term])
+        copied.add(term)
+
+    def collect_documents_and_terms(self, root_dir: str,
+                                    rules: Optional[ExclusionRules],
+                                    workers: int = 1,
+                                    progress: Optional[BuildProgress] = None,
+                                    store_positions: bool = False) -> \
+            Collected:
+        known = self.known_fingerprints(root_dir)
+        documents = self.crawl(root_dir, rules)
+        if progress is not None:
+            documents = list(progress.discover(documents))
+        if workers == 1:
+            return self.collect_shard(documents, known, self.tokenizer,
+                                      progress, store_positions,
+                                      self.metrics)
+        documents = list(documents)
+        documents_to_terms = {}
+        fingerprints = {}
+        documents_to_positions = {}
+        with ProcessPoolExecutor(workers) as executor:
+            shards = self.split_to_shards(documents,
+                                          workers * self.shards_per_worker)
+            futures = [executor.submit(self.collect_timed_shard, shard,
+                                       {doc: known[doc] for doc, _ in shard
+                                        if doc in known},
+                                       self.tokenizer, store_positions,
+                                       self.metrics.enabled)
+                       for shard in shards]
+            try:
+                for future in futures:
+                    (shard_documents_to_terms, shard_fingerprints,
+                     shard_positions), stages = future.result()
+                    self.metrics.merge_stages(stages)
+                    documents_to_terms.update(shard_documents_to_terms)
+                    fingerprints.update(shard_fingerprints)
+                    documents_to_positions.update(shard_positions)
+                    if progress is not None:
+                        for fingerprint in shard_fingerprints.values():
+                            progress.scanned(fingerprint)
+                        progress.check_cancelled()
+            finally:
+                for future in futures:
+                    future.cancel()
+        return documents_to_terms, fingerprints, documents_to_positions
+
+    def crawl(self, root_dir: str, rules: Optional[ExclusionRules]) -> \
+            Iterator[CrawledFile]:
+        crawler = iter(Crawler(root_dir, rules, self.crawl_options,
+                               self.metrics))
+        if not self.metrics.enabled:
+            return crawler
+        return self.timed_crawl(crawler)
+
+    def timed_crawl(self, crawler: Iterator[CrawledFile]) -> \
+            Iterator[CrawledFile]:
+        while True:
+            with self.metrics.stage('crawl'):
+                crawled = next(crawler, None)
+            if crawled is None:
+                return
+            yield crawled
+
+    def record_collected(self, documents_to_terms: Dict[Path, Counter[str]],
+                         fingerprints: Dict[Path, Fingerprint]):
+        if not self.metrics.enabled:
+            return
+        for fingerprint in fingerprints.values():
+            if fingerprint.size == 0:
+                self.metrics.increment('files_empty')
+            elif fingerprint.encoding == classifier.BINARY:
+                self.metrics.increment('files_binary')
+            else:
+                self.metrics.increment('files_indexed')
+                self.metrics.increment('bytes_read', fingerprint.size)
+        self.metrics.increment('terms_emitted', sum(
+            sum(terms.values()) for terms in documents_to_terms.values()))
+
+    def stats(self) -> MetricsReport:
+        return self.metrics.report(self.index_footprint(self.snapshot),
+                                   self.cache.stats())
+
+    def index_footprint(self, snapshot: Snapshot) -> \
+            Optional[Dict[str, int]]:
+        if not snapshot.index or not self.metrics.enabled:
+            return None
+        footprint = self.footprint
+        if footprint is None or footprint[0] != snapshot.generation:
+            footprint = self.footprint = (
+                snapshot.generation, metrics.index_footprint(snapshot.index))
+        return footprint[1]
+
+    def known_fingerprints(self, root_dir: str) -> Dict[Path, Fingerprint]:
+        if not self.index or \
+                self.index.root_path != Path(root_dir).absolute():
+            return {}
+        return self.index.fingerprints
 
     @staticmethod
-    def walk_documents(root_dir: str, ignored: Set[Path]) -> \
-            Generator[Path, None, None]:
-        root_path = Path(root_dir).absolute()
-        if not root_path.is_dir():
-            raise InvalidRootDirectory(root_dir)
-        for path in root_path.rglob('*'):
-            if path.is_dir() or path in ignored:
+    def collect_shard(documents: Iterable[CrawledFile],
+                      known: Optional[Dict[Path, Fingerprint]] = None,
+                      tokenizer: Optional[Tokenizer] = None,
+                      progress: Optional[BuildProgress] = None,
+                      store_positions: bool = False,
+                      metrics: Metrics = metrics.DISABLED) -> Collected:
+        known = known or {}
+        tokenizer = tokenizer or Tokenizer()
+        documents_to_terms = {}
+        fingerprints = {}
+        documents_to_positions = {}
+        for doc, fingerprint in documents:
+            if progress is not None:
+                progress.check_cancelled()
+                progress.scanned(fingerprint)
+            if fingerprint.size == 0:
+                fingerprints[doc] = fingerprint
+                continue
+            known_fingerprint = known.get(doc)
+            if known_fingerprint == fingerprint and \
+                    known_fingerprint.encoding:
+                fingerprint = known_fingerprint
+            else:
+                with metrics.stage('classify'):
+                    encoding = classifier.classify(doc, fingerprint.size)
+                fingerprint = dataclasses.replace(fingerprint,
+                                                  encoding=encoding)
+            fingerprints[doc] = fingerprint
+            if fingerprint.encoding == classifier.BINARY:
                 continue
-            yield path
+            with metrics.stage('tokenize'):
+                if store_positions:
+                    documents_to_terms[doc], documents_to_positions[doc] = \
+                        tokenizer.count_positions(doc, fingerprint.encoding)
+                else:
+                    documents_to_terms[doc] = tokenizer.count(
+                        doc, fingerprint.encoding)
+        return documents_to_terms, fingerprints, documents_to_positions
 
     @staticmethod
-    def read_document(document: Path, encoding: str) -> List[str]:
-        terms = []
-        with document.open('r', encoding=encoding) as f:
-            while True:
-                line = f.readline().lower()
-                if not line:
-                    return terms
-                terms.extend(re.sub(r'[\W_\-]', ' ', line).split())
+    def collect_timed_shard(documents: Iterable[CrawledFile],
+                            known: Dict[Path, Fingerprint],
+                            tokenizer: Tokenizer, store_positions: bool,
+                            enabled: bool) -> \
+            Tuple[Collected, Dict[str, Tuple[int, float]]]:
+        shard_metrics = Metrics(enabled)
+        collected = SearchEngine.collect_shard(documents, known, tokenizer,
+                                               None, store_positions,
+                                               shard_metrics)
+        return collected, shard_metrics.report().stages
 
     @staticmethod
-    def collect_ignored(robot_txt: str) -> Set[Path]:
-        robot_txt_path = Path(robot_txt).absolute()
-        if not robot_txt_path.exists() or robot_txt_path.is_dir():
-            raise RobotTxtNotFound(robot_txt)
-        ignored = set()
-        cwd = Path.cwd()
-        with robot_txt_path.open('r') as f:
-            while True:
-                line = f.readline()
-                if not line:
-                    break
-                if line[-1] == '\n':
-                    line = line[:-1]
-                for path in cwd.rglob(line):
-                    if not path.is_dir():
-                        ignored.add(path)
-                    else:
-                        for path1 in path.rglob('*'):
-                            ignored.add(path1)
-        return ignored
+    def split_to_shards(documents: List[CrawledFile], shards_count: int) -> \
+            List[List[CrawledFile]]:
+        shard_size = max(1, -(-len(documents) // shards_count))
+        return [documents[i:i + shard_size]
+                for i in range(0, len(documents), shard_size)]
 
     @staticmethod
-    def get_file_encoding(file: str) -> str:
-        return magic.Magic(mime_encoding=True).from_file(file)
+    def invert(documents_to_terms: Dict[int, Counter[str]]) -> \
+            Tuple[Dict[str, array], Dict[str, array], Dict[str, float]]:
+        terms_to_documents = {}
+        tf = {}
+        for doc_id, terms in documents_to_terms.items():
+            total_terms = sum(terms.values())
+            for term, count in terms.items():
+                if term not in terms_to_documents:
+                    terms_to_documents[term] = postings.empty_postings()
+                    tf[term] = postings.empty_weights()
+                terms_to_documents[term].append(doc_id)
+                tf[term].append(count / total_terms)
+        max_tf = {term: max(term_tf) for term, term_tf in tf.items()}
+        return terms_to_documents, tf, max_tf
 
     @staticmethod
-    def calc_md5(data: bytes) -> bytes:
-        return md5(data).digest()
+    def load_rules(robot_txt: str) -> Optional[ExclusionRules]:
+        return ExclusionRules.from_file(robot_txt) if robot_txt else None
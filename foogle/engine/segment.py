@@ -0,0 +1,704 @@
+import collections
+import itertools
+import json
+import mmap
+import os
+import shutil
+import struct
+import tempfile
+import zlib
+from array import array
+from dataclasses import dataclass
+from functools import lru_cache
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple, Counter, Iterator, \
+    Mapping, Sequence, BinaryIO
+
+from foogle.engine import codec, postings
+from foogle.engine.errors import IndexBrokenError, IndexRecordBrokenError
+from foogle.engine.index import Index, Fingerprint
+
+MAGIC = b'FOOGLSEG'
+VERSION = 7
+TOMBSTONE = 0xFFFFFFFF
+PATH_ONLY = 0xFFFFFFFE
+
+HEADER = struct.Struct('<8sHH')
+SECTION = struct.Struct('<4sQQI')
+HEADER_CRC = struct.Struct('<I')
+DOC_RECORD = struct.Struct('<QII')
+DOC_LENGTH = struct.Struct('<I')
+PATH_BLOCK = struct.Struct('<QII')
+TERM_RECORD = struct.Struct('<QIQIIdI')
+FILE_RECORD = struct.Struct('<dQQ')
+POSITION_RECORD = struct.Struct('<QII')
+
+META = b'META'
+DOCS = b'DOCS'
+LENGTHS = b'LENS'
+PATH_BLOCKS = b'PBLK'
+PATHS = b'PATH'
+FORWARD = b'FWRD'
+TERMS = b'TERM'
+TERM_POOL = b'TPOL'
+POSTINGS = b'POST'
+FILES = b'FILE'
+POSITION_INDEX = b'PIDX'
+POSITIONS = b'POSN'
+TRIGRAMS = b'TGRM'
+TRIGRAM_POSTINGS = b'TGPS'
+SECTIONS = (META, DOCS, LENGTHS, PATH_BLOCKS, PATHS, FORWARD, TERMS,
+            TERM_POOL, POSTINGS, FILES, POSITION_INDEX, POSITIONS, TRIGRAMS,
+            TRIGRAM_POSTINGS)
+
+DOC_ID_SIZE = array(postings.DOC_ID_TYPE).itemsize
+WEIGHT_SIZE = array(postings.WEIGHT_TYPE).itemsize
+FORWARD_ENTRY_SIZE = 2 * DOC_ID_SIZE
+POSITION_SIZE = DOC_ID_SIZE
+PATH_BLOCK_SIZE = 16
+POSTINGS_CACHE_SIZE = 1024
+PATH_BLOCKS_CACHE_SIZE = 256
+
+REPORT_SECTIONS = {
+    'postings': (POSTINGS,),
+    'forward index': (FORWARD,),
+    'paths': (PATH_BLOCKS, PATHS),
+    'positions': (POSITION_INDEX, POSITIONS),
+    'files': (FILES,),
+    'path trigrams': (TRIGRAMS, TRIGRAM_POSTINGS),
+}
+
+
+@dataclass
+class SizeReport:
+    raw_sizes: Dict[str, int]
+    compressed_sizes: Dict[str, int]
+    file_size: int
+
+    def __str__(self) -> str:
+        lines = []
+        for name, raw_size in self.raw_sizes.items():
+            compressed_size = self.compressed_sizes[name]
+            ratio = raw_size / compressed_size if compressed_size else 0.0
+            lines.append(f'{name}: {raw_size} -> {compressed_size} bytes'
+                         f' ({ratio:.2f}x)')
+        lines.append(f'index file: {self.file_size} bytes')
+        return '\n'.join(lines)
+
+
+class SectionWriter:
+
+    def __init__(self):
+        self.file = tempfile.TemporaryFile()
+        self.length = 0
+        self.crc = 0
+
+    def write(self, data: bytes) -> int:
+        offset = self.length
+        self.file.write(data)
+        self.crc = zlib.crc32(data, self.crc)
+        self.length += len(data)
+        return offset
+
+    def copy_to(self, file: BinaryIO):
+        self.file.seek(0)
+        shutil.copyfileobj(self.file, file)
+        self.file.close()
+
+
+class SegmentWriter:
+
+    def __init__(self, positions: bool = False):
+        self.sections = {name: SectionWriter() for name in SECTIONS}
+        self.positions = positions
+        self.documents_count = 0
+        self.live_documents_count = 0
+        self.terms_count = 0
+        self.path_block = []
+        self.raw_sizes = collections.Counter(
+            {name: 0 for name in REPORT_SECTIONS})
+
+    def add_document(self, path: Optional[Path],
+                     forward: Optional[Sequence[Tuple[int, int]]],
+                     positions: Sequence[bytes] = ()):
+        self.documents_count += 1
+        path_bytes = os.fsencode(path) if path is not None else b''
+        self.add_path(path_bytes)
+        length = sum(count for _, count in forward or ())
+        self.sections[LENGTHS].write(DOC_LENGTH.pack(length))
+        if self.positions:
+            self.add_positions(positions, length)
+        if path is None:
+            self.sections[DOCS].write(DOC_RECORD.pack(0, TOMBSTONE, 0))
+            return
+        if forward is None:
+            self.sections[DOCS].write(DOC_RECORD.pack(0, PATH_ONLY, 0))
+            return
+        self.live_documents_count += 1
+        forward_values = []
+        previous = 0
+        for term_id, count in forward:
+            forward_values += term_id - previous, count
+            previous = term_id
+        forward_bytes = codec.encode_varints(forward_values)
+        forward_offset = self.sections[FORWARD].write(forward_bytes)
+        self.sections[DOCS].write(DOC_RECORD.pack(
+            forward_offset, len(forward_bytes), zlib.crc32(forward_bytes)))
+        self.raw_sizes['forward index'] += len(forward) * FORWARD_ENTRY_SIZE
+
+    def add_path(self, path_bytes: bytes):
+        self.raw_sizes['paths'] += len(path_bytes)
+        self.path_block.append(path_bytes)
+        if len(self.path_block) == PATH_BLOCK_SIZE:
+            self.flush_paths()
+
+    def flush_paths(self):
+        if not self.path_block:
+            return
+        block_bytes = codec.front_code(self.path_block)
+        offset = self.sections[PATHS].write(block_bytes)
+        self.sections[PATH_BLOCKS].write(PATH_BLOCK.pack(
+            offset, len(block_bytes), zlib.crc32(block_bytes)))
+        self.path_block = []
+
+    def add_positions(self, positions: Sequence[bytes], length: int):
+        buffer = bytearray()
+        for term_positions in positions:
+            codec.write_varint(buffer, len(term_positions))
+            buffer += term_positions
+        positions_bytes = bytes(buffer)
+        offset = self.sections[POSITIONS].write(positions_bytes)
+        self.sections[POSITION_INDEX].write(POSITION_RECORD.pack(
+            offset, len(positions_bytes), zlib.crc32(positions_bytes)))
+        self.raw_sizes['positions'] += length * POSITION_SIZE
+
+    def add_term(self, term: str, doc_ids: Sequence[int],
+                 counts: Sequence[int], max_tf: float):
+        self.terms_count += 1
+        term_bytes = term.encode()
+        postings_bytes = codec.encode_deltas(doc_ids) + \
+            codec.encode_varints(counts)
+        term_offset = self.sections[TERM_POOL].write(term_bytes)
+        postings_offset = self.sections[POSTINGS].write(postings_bytes)
+        self.sections[TERMS].write(TERM_RECORD.pack(
+            term_offset, len(term_bytes), postings_offset,
+            len(postings_bytes), len(doc_ids), max_tf,
+            zlib.crc32(postings_bytes, zlib.crc32(term_bytes))))
+        self.raw_sizes['postings'] += len(doc_ids) * \
+            (DOC_ID_SIZE + WEIGHT_SIZE)
+
+    def add_files(self, fingerprints: Mapping[Path, Fingerprint]):
+        buffer = bytearray()
+        previous = b''
+        for path_bytes, fingerprint in sorted(
+                (os.fsencode(path), fingerprint)
+                for path, fingerprint in fingerprints.items()):
+            encoding_bytes = fingerprint.encoding.encode()
+            shared = codec.common_prefix_length(previous, path_bytes)
+            codec.write_varint(buffer, shared)
+            codec.write_varint(buffer, len(path_bytes) - shared)
+            buffer += path_bytes[shared:]
+            buffer += FILE_RECORD.pack(fingerprint.mtime, fingerprint.size,
+                                       fingerprint.inode)
+            codec.write_varint(buffer, len(encoding_bytes))
+            buffer += encoding_bytes
+            previous = path_bytes
+            self.raw_sizes['files'] += len(path_bytes) + \
+                len(encoding_bytes) + FILE_RECORD.size + 2 * DOC_ID_SIZE
+        self.sections[FILES].write(bytes(buffer))
+
+    def add_trigrams(self, trigram_postings: Mapping[str, array]):
+        directory = bytearray()
+        for trigram in sorted(trigram_postings, key=os.fsencode):
+            trigram_bytes = os.fsencode(trigram)
+            doc_ids = trigram_postings[trigram]
+            postings_bytes = codec.encode_deltas(doc_ids)
+            offset = self.sections[TRIGRAM_POSTINGS].write(postings_bytes)
+            codec.write_varint(directory, len(trigram_bytes))
+            directory += trigram_bytes
+            for value in (len(doc_ids), offset, len(postings_bytes),
+                          zlib.crc32(postings_bytes)):
+                codec.write_varint(directory, value)
+            self.raw_sizes['path trigrams'] += len(trigram_bytes) + \
+                len(doc_ids) * DOC_ID_SIZE
+        self.sections[TRIGRAMS].write(bytes(directory))
+
+    def write(self, path: Path, meta: dict):
+        self.flush_paths()
+        meta = dict(meta, documents_count=self.documents_count,
+                    live_documents_count=self.live_documents_count,
+                    terms_count=self.terms_count, positions=self.positions,
+                    raw_sizes=self.raw_sizes)
+        self.sections[META].write(json.dumps(meta).encode())
+        offset = HEADER.size + SECTION.size * len(SECTIONS) + HEADER_CRC.size
+        header = HEADER.pack(MAGIC, VERSION, len(SECTIONS))
+        for name in SECTIONS:
+            section = self.sections[name]
+            header += SECTION.pack(name, offset, section.length, section.crc)
+            offset += section.length
+        header += HEADER_CRC.pack(zlib.crc32(header))
+        temp_path = path.with_name(path.name + '.tmp')
+        with temp_path.open('wb') as f:
+            f.write(header)
+            for name in SECTIONS:
+                self.sections[name].copy_to(f)
+        os.replace(temp_path, path)
+
+
+class Segment:
+
+    def __init__(self, path: Path):
+        with path.open('rb') as f:
+            try:
+                self.buffer = mmap.mmap(f.fileno(), 0,
+                                        access=mmap.ACCESS_READ)
+            except ValueError:
+                raise IndexBrokenError()
+        self.sections = self.read_header()
+        try:
+            self.meta = json.loads(self.verified_section(META).decode())
+            self.check_records()
+        except (KeyError, ValueError):
+            raise IndexBrokenError()
+        self.postings_at = lru_cache(POSTINGS_CACHE_SIZE)(self.decode_postings)
+        self.path_block = lru_cache(PATH_BLOCKS_CACHE_SIZE)(
+            self.decode_path_block)
+        self.doc_lengths = None
+        self.trigrams_directory = None
+        self.trigram_postings_at = lru_cache(POSTINGS_CACHE_SIZE)(
+            self.decode_trigram_postings)
+
+    def read_header(self) -> Dict[bytes, Tuple[int, int, int]]:
+        try:
+            magic, version, count = HEADER.unpack_from(self.buffer, 0)
+            if magic != MAGIC or version != VERSION:
+                raise IndexBrokenError()
+            sections_end = HEADER.size + SECTION.size * count
+            crc, = HEADER_CRC.unpack_from(self.buffer, sections_end)
+        except struct.error:
+            raise IndexBrokenError()
+        if crc != zlib.crc32(self.buffer[:sections_end]):
+            raise IndexBrokenError()
+        sections = {}
+        for i in range(count):
+            name, offset, length, crc = SECTION.unpack_from(
+                self.buffer, HEADER.size + SECTION.size * i)
+            if offset < sections_end or \
+                    offset + length > len(self.buffer):
+                raise IndexBrokenError()
+            sections[name] = offset, length, crc
+        if set(sections) != set(SECTIONS):
+            raise IndexBrokenError()
+        return sections
+
+    def check_records(self):
+        documents_count = self.documents_count
+        records = [(DOCS, DOC_RECORD, documents_count),
+                   (LENGTHS, DOC_LENGTH, documents_count),
+                   (PATH_BLOCKS, PATH_BLOCK,
+                    -(-documents_count // PATH_BLOCK_SIZE)),
+                   (TERMS, TERM_RECORD, self.terms_count)]
+        if self.meta['positions']:
+            records.append((POSITION_INDEX, POSITION_RECORD,
+                            documents_count))
+        for section, record, count in records:
+            if self.sections[section][1] != record.size * count:
+                raise IndexBrokenError()
+
+    def verified_section(self, name: bytes) -> bytes:
+        offset, length, crc = self.sections[name]
+        data = self.buffer[offset:offset + length]
+        if zlib.crc32(data) != crc:
+            raise IndexBrokenError()
+        return data
+
+    def read(self, section: bytes, offset: int, length: int) -> bytes:
+        start = self.sections[section][0] + offset
+        return self.buffer[start:start + length]
+
+    def record(self, section: bytes, record: struct.Struct,
+               number: int) -> tuple:
+        offset, length, _ = self.sections[section]
+        if not 0 <= number < length // record.size:
+            raise IndexRecordBrokenError(
+                f'record {number} of section {section.decode()}')
+        return record.unpack_from(self.buffer, offset + record.size * number)
+
+    @property
+    def documents_count(self) -> int:
+        return self.meta['documents_count']
+
+    @property
+    def terms_count(self) -> int:
+        return self.meta['terms_count']
+
+    @property
+    def lengths(self) -> array:
+        if self.doc_lengths is None:
+            lengths = array(postings.DOC_ID_TYPE)
+            lengths.frombytes(self.verified_section(LENGTHS))
+            self.doc_lengths = lengths
+        return self.doc_lengths
+
+    def is_tombstone(self, doc_id: int) -> bool:
+        return self.record(DOCS, DOC_RECORD, doc_id)[1] == TOMBSTONE
+
+    def has_terms(self, doc_id: int) -> bool:
+        return self.record(DOCS, DOC_RECORD, doc_id)[1] not in (TOMBSTONE,
+                                                                PATH_ONLY)
+
+    def decode_path_block(self, block_id: int) -> List[bytes]:
+        offset, length, crc = self.record(PATH_BLOCKS, PATH_BLOCK, block_id)
+        block_bytes = self.read(PATHS, offset, length)
+        if zlib.crc32(block_bytes) != crc:
+            raise IndexRecordBrokenError(f'paths block {block_id}')
+        return codec.front_decode(block_bytes)[0]
+
+    def document_path(self, doc_id: int) -> Optional[Path]:
+        if self.is_tombstone(doc_id):
+            return None
+        block = self.path_block(doc_id // PATH_BLOCK_SIZE)
+        return Path(os.fsdecode(block[doc_id % PATH_BLOCK_SIZE]))
+
+    def document_terms(self, doc_id: int) -> Optional[Counter[str]]:
+        forward_offset, forward_length, forward_crc = self.record(
+            DOCS, DOC_RECORD, doc_id)
+        if forward_length in (TOMBSTONE, PATH_ONLY):
+            return None
+        forward_bytes = self.read(FORWARD, forward_offset, forward_length)
+        if zlib.crc32(forward_bytes) != forward_crc:
+            raise IndexRecordBrokenError(f'document {doc_id}')
+        values = codec.decode_varints(forward_bytes)[0]
+        term_ids = itertools.accumulate(values[::2])
+        return collections.Counter({
+            self.term_at(term_id): count
+            for term_id, count in zip(term_ids, values[1::2])})
+
+    def document_positions(self, doc_id: int) -> Optional[Dict[str, bytes]]:
+        terms = self.document_terms(doc_id)
+        if terms is None:
+            return None
+        offset, length, crc = self.record(POSITION_INDEX, POSITION_RECORD,
+                                          doc_id)
+        positions_bytes = self.read(POSITIONS, offset, length)
+        if zlib.crc32(positions_bytes) != crc:
+            raise IndexRecordBrokenError(f'positions of document {doc_id}')
+        positions = {}
+        position = 0
+        for term in terms:
+            (size,), position = codec.decode_varints(positions_bytes,
+                                                     position, 1)
+            positions[term] = positions_bytes[position:position + size]
+            position += size
+        return positions
+
+    def term_bytes_at(self, term_id: int) -> bytes:
+        term_offset, term_len = self.record(TERMS, TERM_RECORD, term_id)[:2]
+        return self.read(TERM_POOL, term_offset, term_len)
+
+    def term_at(self, term_id: int) -> str:
+        return self.term_bytes_at(term_id).decode()
+
+    def find_term(self, term: str) -> int:
+        term_bytes = term.encode()
+        low, high = 0, self.terms_count
+        while low < high:
+            middle = (low + high) // 2
+            if self.term_bytes_at(middle) < term_bytes:
+                low = middle + 1
+            else:
+                high = middle
+        if low < self.terms_count and self.term_bytes_at(low) == term_bytes:
+            return low
+        return -1
+
+    def decode_postings(self, term_id: int) -> Tuple[array, array]:
+        term_offset, term_len, postings_offset, postings_len, frequency, \
+            _, crc = self.record(TERMS, TERM_RECORD, term_id)
+        term_bytes = self.read(TERM_POOL, term_offset, term_len)
+        postings_bytes = self.read(POSTINGS, postings_offset, postings_len)
+        if zlib.crc32(postings_bytes, zlib.crc32(term_bytes)) != crc:
+            raise IndexRecordBrokenError(f'term "{term_bytes.decode()}"')
+        doc_ids, end = codec.decode_deltas(postings_bytes, 0, frequency)
+        counts = codec.decode_varints(postings_bytes, end, frequency)[0]
+        if len(counts) != frequency:
+            raise IndexRecordBrokenError(f'term "{term_bytes.decode()}"')
+        lengths = self.lengths
+        tf = array(postings.WEIGHT_TYPE, [count / lengths[doc_id]
+                                          for doc_id, count
+                                          in zip(doc_ids, counts)])
+        return array(postings.DOC_ID_TYPE, doc_ids), tf
+
+    def max_tf_at(self, term_id: int) -> float:
+        return self.record(TERMS, TERM_RECORD, term_id)[5]
+
+    def files(self) -> Dict[Path, Fingerprint]:
+        data = self.verified_section(FILES)
+        files = {}
+        previous = b''
+        position = 0
+        while position < len(data):
+            (shared, length), position = codec.decode_varints(data, position,
+                                                              2)
+            previous = previous[:shared] + data[position:position + length]
+            position += length
+            mtime, size, inode = FILE_RECORD.unpack_from(data, position)
+            position += FILE_RECORD.size
+            (length,), position = codec.decode_varints(data, position, 1)
+            encoding = data[position:position + length].decode()
+            position += length
+            files[Path(os.fsdecode(previous))] = Fingerprint(
+                mtime, size, inode, encoding)
+        return files
+
+    @property
+    def trigrams(self) -> Dict[str, Tuple[int, ...]]:
+        if self.trigrams_directory is None:
+            data = self.verified_section(TRIGRAMS)
+            directory = {}
+            position = 0
+            while position < len(data):
+                (length,), position = codec.decode_varints(data, position, 1)
+                trigram = os.fsdecode(data[position:position + length])
+                record, position = codec.decode_varints(data,
+                                                        position + length, 4)
+                directory[trigram] = tuple(record)
+            self.trigrams_directory = directory
+        return self.trigrams_directory
+
+    def decode_trigram_postings(self, trigram: str) -> array:
+        count, offset, length, crc = self.trigrams[trigram]
+        postings_bytes = self.read(TRIGRAM_POSTINGS, offset, length)
+        if zlib.crc32(postings_bytes) != crc:
+            raise IndexRecordBrokenError(f'path trigram "{trigram}"')
+        return array(postings.DOC_ID_TYPE,
+                     codec.decode_deltas(postings_bytes, 0, count)[0])
+
+    def size_report(self) -> SizeReport:
+        compressed_sizes = {
+            name: sum(self.sections[section][1] for section in sections)
+            for name, sections in REPORT_SECTIONS.items()}
+        return SizeReport(self.meta['raw_sizes'], compressed_sizes,
+                          len(self.buffer))
+
+
+class MappedDocTable(Sequence):
+
+    def __init__(self, segment: Segment):
+        self.segment = segment
+
+    def __len__(self) -> int:
+        return self.segment.documents_count
+
+    def __getitem__(self, doc_id: int) -> Optional[Path]:
+        if not 0 <= doc_id < len(self):
+            raise IndexError(doc_id)
+        return self.segment.document_path(doc_id)
+
+    def materialize(self) -> List[Optional[Path]]:
+        return list(self)
+
+
+class MappedDocuments(Mapping):
+
+    def __init__(self, segment: Segment):
+        self.segment = segment
+
+    def __len__(self) -> int:
+        return self.segment.meta['live_documents_count']
+
+    def __iter__(self) -> Iterator[int]:
+        for doc_id in range(self.segment.documents_count):
+            if doc_id in self:
+                yield doc_id
+
+    def __contains__(self, doc_id: object) -> bool:
+        if not isinstance(doc_id, int) or \
+                not 0 <= doc_id < self.segment.documents_count:
+            return False
+        return self.segment.has_terms(doc_id)
+
+    def __getitem__(self, doc_id: int) -> Counter[str]:
+        if doc_id not in self:
+            raise KeyError(doc_id)
+        return self.segment.document_terms(doc_id)
+
+    def materialize(self) -> Dict[int, Counter[str]]:
+        return {doc_id: self[doc_id] for doc_id in self}
+
+
+class MappedPositions(MappedDocuments):
+
+    def __getitem__(self, doc_id: int) -> Dict[str, bytes]:
+        if doc_id not in self:
+            raise KeyError(doc_id)
+        return self.segment.document_positions(doc_id)
+
+
+class MappedTerms(Sequence):
+
+    def __init__(self, segment: Segment):
+        self.segment = segment
+
+    def __len__(self) -> int:
+        return self.segment.terms_count
+
+    def __getitem__(self, term_id: int) -> str:
+        if not 0 <= term_id < len(self):
+            raise IndexError(term_id)
+        return self.segment.term_at(term_id)
+
+
+class MappedPostings(Mapping):
+
+    def __init__(self, segment: Segment, part: int):
+        self.segment = segment
+        self.part = part
+
+    def __len__(self) -> int:
+        return self.segment.terms_count
+
+    def __iter__(self) -> Iterator[str]:
+        for term_id in range(self.segment.terms_count):
+            yield self.segment.term_at(term_id)
+
+    def __contains__(self, term: object) -> bool:
+        return isinstance(term, str) and self.segment.find_term(term) != -1
+
+    def __getitem__(self, term: str) -> array:
+        term_id = self.segment.find_term(term)
+        if term_id == -1:
+            raise KeyError(term)
+        return self.segment.postings_at(term_id)[self.part]
+
+    def sorted_terms(self) -> 'MappedTerms':
+        return MappedTerms(self.segment)
+
+    def materialize(self) -> Dict[str, array]:
+        return {self.segment.term_at(term_id):
+                self.segment.decode_postings(term_id)[self.part]
+                for term_id in range(self.segment.terms_count)}
+
+
+class MappedTermBounds(Mapping):
+
+    def __init__(self, segment: Segment):
+        self.segment = segment
+
+    def __len__(self) -> int:
+        return self.segment.terms_count
+
+    def __iter__(self) -> Iterator[str]:
+        for term_id in range(self.segment.terms_count):
+            yield self.segment.term_at(term_id)
+
+    def __getitem__(self, term: str) -> float:
+        term_id = self.segment.find_term(term)
+        if term_id == -1:
+            raise KeyError(term)
+        return self.segment.max_tf_at(term_id)
+
+    def materialize(self) -> Dict[str, float]:
+        return {self.segment.term_at(term_id): self.segment.max_tf_at(term_id)
+                for term_id in range(self.segment.terms_count)}
+
+
+class MappedFiles(Mapping):
+
+    def __init__(self, segment: Segment):
+        self.segment = segment
+        self.files = None
+
+    def load(self) -> Dict[Path, Fingerprint]:
+        if self.files is None:
+            self.files = self.segment.files()
+        return self.files
+
+    def __len__(self) -> int:
+        return len(self.load())
+
+    def __iter__(self) -> Iterator[Path]:
+        return iter(self.load())
+
+    def __getitem__(self, path: Path) -> Fingerprint:
+        return self.load()[path]
+
+    def materialize(self) -> Dict[Path, Fingerprint]:
+        return dict(self.load())
+
+
+class MappedTrigrams(Mapping):
+
+    def __init__(self, segment: Segment):
+        self.segment = segment
+
+    def __len__(self) -> int:
+        return len(self.segment.trigrams)
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(self.segment.trigrams)
+
+    def __contains__(self, trigram: object) -> bool:
+        return trigram in self.segment.trigrams
+
+    def __getitem__(self, trigram: str) -> array:
+        if trigram not in self.segment.trigrams:
+            raise KeyError(trigram)
+        return self.segment.trigram_postings_at(trigram)
+
+    def materialize(self) -> Dict[str, array]:
+        return {trigram: self.segment.decode_trigram_postings(trigram)
+                for trigram in self.segment.trigrams}
+
+
+def write_segment(index: Index, path: Path):
+    writer = SegmentWriter(index.positions is not None)
+    terms = sorted(index.terms_to_documents, key=str.encode)
+    term_ids = {term: term_id for term_id, term in enumerate(terms)}
+    lengths = []
+    for doc_id, doc in enumerate(index.doc_table):
+        terms_count = index.documents_to_terms.get(doc_id)
+        if doc is None or terms_count is None:
+            lengths.append(0)
+            writer.add_document(doc, None)
+            continue
+        lengths.append(sum(terms_count.values()))
+        forward = sorted((term_ids[term], term, count)
+                         for term, count in terms_count.items())
+        positions = ()
+        if index.positions is not None:
+            doc_positions = index.positions[doc_id]
+            positions = [doc_positions[term] for _, term, _ in forward]
+        writer.add_document(doc, [(term_id, count)
+                                  for term_id, _, count in forward],
+                            positions)
+    for term in terms:
+        doc_ids = index.terms_to_documents[term]
+        counts = [round(tf * lengths[doc_id])
+                  for doc_id, tf in zip(doc_ids, index.tf[term])]
+        writer.add_term(term, doc_ids, counts, index.max_tf[term])
+    writer.add_files(index.fingerprints)
+    writer.add_trigrams(index.trigrams)
+    writer.write(path, {'root_path': str(index.root_path),
+                        'mtime': index.mtime,
+                        'robot_txt': index.robot_txt})
+
+
+def size_report(path: Path) -> SizeReport:
+    return Segment(path).size_report()
+
+
+def open_segment(path: Path) -> Index:
+    segment = Segment(path)
+    return Index(Path(segment.meta['root_path']),
+                 segment.meta['mtime'],
+                 MappedDocTable(segment),
+                 MappedDocuments(segment),
+                 MappedPostings(segment, 0),
+                 MappedPostings(segment, 1),
+                 MappedTermBounds(segment),
+                 MappedFiles(segment),
+                 segment.meta['robot_txt'],
+                 MappedPositions(segment)
+                 if segment.meta['positions'] else None,
+                 MappedTrigrams(segment))
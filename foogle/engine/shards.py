@@ -0,0 +1,249 @@
+import hashlib
+import heapq
+import itertools
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import Dict, Iterator, List, NamedTuple, Optional, Sequence
+
+from foogle.engine import segment
+from foogle.engine.cache import QueryCache
+from foogle.engine.crawler import CrawlOptions
+from foogle.engine.index import CollectionStatistics, Index
+from foogle.engine.jobs import BuildProgress
+from foogle.engine.planner import QueryPlanner
+from foogle.engine.query_parser import Query, QueryParser
+from foogle.engine.search_engine import SearchEngine, ScoredSearchResult, \
+    SearchByManyQueriesResult, SearchByOneQueryResult, UpdateResult
+from foogle.engine.tokenizer import Tokenizer
+from foogle.engine.errors import IndexEmptyError, IndexNotExistError, \
+    InvalidResultsLimit, InvalidResultsOffset, ShardNotFound
+
+SHARDS_PATH = Path('search_shards')
+SHARD_PREFIX = 'shard-'
+SEARCH_WORKERS = 4
+
+
+class ShardsSnapshot(NamedTuple):
+    shards: Dict[Path, Index]
+    statistics: CollectionStatistics
+    generation: int
+
+
+class ShardedSearchEngine:
+
+    def __init__(self, use_numpy: bool = False,
+                 tokenizer: Optional[Tokenizer] = None,
+                 cache: Optional[QueryCache] = None,
+                 crawl_options: Optional[CrawlOptions] = None,
+                 search_workers: int = SEARCH_WORKERS):
+        self.tokenizer = tokenizer or Tokenizer()
+        self.cache = cache or QueryCache()
+        self.crawl_options = crawl_options or CrawlOptions()
+        self.generations = itertools.count()
+        self.write_lock = threading.RLock()
+        self.engines: Dict[Path, SearchEngine] = {}
+        self.searcher = SearchEngine(use_numpy, self.tokenizer,
+                                     crawl_options=self.crawl_options)
+        self.executor = ThreadPoolExecutor(search_workers,
+                                           thread_name_prefix='shard-search')
+        self.publish()
+
+    @property
+    def use_numpy(self) -> bool:
+        return self.searcher.use_numpy
+
+    @use_numpy.setter
+    def use_numpy(self, use_numpy: bool):
+        with self.write_lock:
+            self.searcher.use_numpy = use_numpy
+            for engine in self.engines.values():
+                engine.use_numpy = use_numpy
+            self.cache.invalidate()
+
+    @property
+    def shards(self) -> Dict[Path, Index]:
+        return self.snapshot.shards
+
+    def publish(self):
+        shards = {root: self.engines[root].index
+                  for root in sorted(self.engines)}
+        self.snapshot = ShardsSnapshot(
+            shards, CollectionStatistics(list(shards.values())),
+            next(self.generations))
+        self.cache.invalidate()
+
+    def shard_engine(self) -> SearchEngine:
+        return SearchEngine(self.use_numpy, self.tokenizer,
+                            crawl_options=self.crawl_options)
+
+    def engine_for(self, root_dir: str) -> SearchEngine:
+        engine = self.engines.get(Path(root_dir).absolute())
+        if engine is None:
+            raise ShardNotFound(root_dir)
+        return engine
+
+    def build_shard(self, root_dir: str, robot_txt: str, workers: int = 1,
+                    progress: Optional[BuildProgress] = None,
+                    store_positions: bool = False) -> Path:
+        engine = self.shard_engine()
+        engine.build_index(root_dir, robot_txt, workers, progress,
+                           store_positions)
+        root = engine.index.root_path
+        with self.write_lock:
+            self.engines[root] = engine
+            self.publish()
+        return root
+
+    def remove_shard(self, root_dir: str):
+        with self.write_lock:
+            engine = self.engine_for(root_dir)
+            del self.engines[engine.index.root_path]
+            self.publish()
+
+    def update_shard(self, root_dir: str) -> UpdateResult:
+        with self.write_lock:
+            result = self.engine_for(root_dir).update_index()
+            self.publish()
+            return result
+
+    def update_index(self) -> UpdateResult:
+        with self.write_lock:
+            if not self.engines:
+                raise IndexEmptyError()
+            total = UpdateResult()
+            for engine in self.engines.values():
+                result = engine.update_index()
+                total.added += result.added
+                total.modified += result.modified
+                total.removed += result.removed
+            self.publish()
+            return total
+
+    def save_shard(self, root_dir: str, shards_path: Path = SHARDS_PATH):
+        shards_path = shards_path.absolute()
+        shards_path.mkdir(exist_ok=True)
+        index = self.engine_for(root_dir).index
+        segment.write_segment(index, shard_path(shards_path, index.root_path))
+
+    def save_index(self, shards_path: Path = SHARDS_PATH):
+        shards = self.shards
+        if not shards:
+            raise IndexEmptyError()
+        shards_path = shards_path.absolute()
+        shards_path.mkdir(exist_ok=True)
+        saved = set()
+        for root, index in shards.items():
+            path = shard_path(shards_path, root)
+            segment.write_segment(index, path)
+            saved.add(path)
+        for path in saved_shards(shards_path):
+            if path not in saved:
+                path.unlink()
+
+    def load_index(self, shards_path: Path = SHARDS_PATH):
+        paths = saved_shards(shards_path.absolute())
+        if not paths:
+            raise IndexNotExistError()
+        engines = {}
+        for path in paths:
+            engine = self.shard_engine()
+            engine.load_index(path)
+            engines[engine.index.root_path] = engine
+        with self.write_lock:
+            self.engines = engines
+            self.publish()
+
+    def search(self, query: str, limit: Optional[int] = None) -> \
+            SearchByManyQueriesResult:
+        snapshot = self.check_snapshot(0, limit)
+        queries = QueryParser.parse_query(query)
+        results = {}
+        for query in queries:
+            result = self.cache.get((snapshot.generation, query, limit))
+            if result is not None:
+                results[query] = result
+        missing = [query for query in queries if query not in results]
+        for query, scored in zip(missing,
+                                 self.scatter(snapshot, missing, 0, limit)):
+            result = SearchByOneQueryResult(
+                query, [path for path, _ in scored.hits])
+            self.cache.put((snapshot.generation, query, limit), result)
+            results[query] = result
+        return SearchByManyQueriesResult([results[query]
+                                          for query in queries])
+
+    def search_page(self, query: str, offset: int = 0,
+                    limit: Optional[int] = None) -> List[ScoredSearchResult]:
+        return next(self.search_batch([query], offset, limit))
+
+    def search_batch(self, queries: List[str], offset: int = 0,
+                     limit: Optional[int] = None) -> \
+            Iterator[List[ScoredSearchResult]]:
+        snapshot = self.check_snapshot(offset, limit)
+        parsed = [QueryParser.parse_query(query) for query in queries]
+        return (self.scatter(snapshot, batch, offset, limit)
+                for batch in parsed)
+
+    def check_snapshot(self, offset: int,
+                       limit: Optional[int]) -> ShardsSnapshot:
+        snapshot = self.snapshot
+        if not snapshot.shards:
+            raise IndexEmptyError()
+        if offset < 0:
+            raise InvalidResultsOffset(str(offset))
+        if limit is not None and limit < 0:
+            raise InvalidResultsLimit(str(limit))
+        return snapshot
+
+    def scatter(self, snapshot: ShardsSnapshot, queries: Sequence[Query],
+                offset: int, limit: Optional[int]) -> \
+            List[ScoredSearchResult]:
+        if not queries:
+            return []
+        started = time.perf_counter()
+        end = offset + limit if limit is not None else None
+        futures = [self.executor.submit(self.search_shard, index, queries,
+                                        end, snapshot.statistics)
+                   for index in snapshot.shards.values()]
+        shard_results = [future.result() for future in futures]
+        elapsed = time.perf_counter() - started
+        return [gather(query, results, offset, end, elapsed)
+                for query, results in zip(queries, zip(*shard_results))]
+
+    def search_shard(self, index: Index, queries: Sequence[Query],
+                     end: Optional[int],
+                     statistics: CollectionStatistics) -> \
+            List[ScoredSearchResult]:
+        planner = QueryPlanner(index)
+        results = []
+        for query in queries:
+            if any(term not in index.terms_to_documents and
+                   statistics.document_frequency(term)
+                   for term in query.good_terms):
+                results.append(ScoredSearchResult(query, 0, [], 0.0))
+                continue
+            results.append(self.searcher.search_scored(
+                query, 0, end, index, planner, statistics))
+        return results
+
+
+def gather(query: Query, results: Sequence[ScoredSearchResult], offset: int,
+           end: Optional[int], elapsed: float) -> ScoredSearchResult:
+    hits = heapq.merge(*(result.hits for result in results),
+                       key=lambda hit: -hit[1])
+    return ScoredSearchResult(query, sum(result.total for result in results),
+                              list(itertools.islice(hits, offset, end)),
+                              elapsed)
+
+
+def shard_path(shards_path: Path, root: Path) -> Path:
+    digest = hashlib.sha1(os.fsencode(root)).hexdigest()[:16]
+    return shards_path / f'{SHARD_PREFIX}{digest}'
+
+
+def saved_shards(shards_path: Path) -> List[Path]:
+    return sorted(path for path in shards_path.glob(SHARD_PREFIX + '*')
+                  if not path.suffix)
@@ -0,0 +1,226 @@
+import heapq
+import itertools
+import struct
+import tempfile
+from array import array
+from operator import itemgetter
+from pathlib import Path
+from typing import Counter, Dict, Iterator, List, Mapping, Optional, \
+    Set, Tuple
+
+from foogle.engine import codec, postings, segment, trigrams
+from foogle.engine.index import Fingerprint
+
+RECORD_HEADER = struct.Struct('<I')
+COUNT_TYPE = 'I'
+TERM_OVERHEAD = 256
+POSTING_OVERHEAD = 8
+BYTES_OVERHEAD = 40
+FORWARD_ENTRY_OVERHEAD = 120
+
+Postings = Tuple[bytes, List[int], List[int], List[bytes]]
+ForwardEntry = Tuple[int, int, int, bytes]
+
+
+class RunFile:
+
+    def __init__(self, directory: Optional[str] = None):
+        self.file = tempfile.TemporaryFile(dir=directory)
+
+    def write(self, payload: bytes):
+        self.file.write(RECORD_HEADER.pack(len(payload)))
+        self.file.write(payload)
+
+    def records(self) -> Iterator[bytes]:
+        self.file.seek(0)
+        try:
+            while True:
+                header = self.file.read(RECORD_HEADER.size)
+                if not header:
+                    return
+                length, = RECORD_HEADER.unpack(header)
+                yield self.file.read(length)
+        finally:
+            self.file.close()
+
+
+class PostingsBlock:
+
+    def __init__(self):
+        self.doc_ids: Dict[str, array] = {}
+        self.counts: Dict[str, array] = {}
+        self.positions: Dict[str, List[bytes]] = {}
+        self.size = 0
+
+    def add(self, doc_id: int, terms: Counter[str],
+            doc_positions: Optional[Dict[str, bytes]]):
+        for term, count in terms.items():
+            doc_ids = self.doc_ids.get(term)
+            if doc_ids is None:
+                doc_ids = self.doc_ids[term] = postings.empty_postings()
+                self.counts[term] = array(COUNT_TYPE)
+                self.positions[term] = []
+                self.size += TERM_OVERHEAD + len(term)
+            doc_ids.append(doc_id)
+            self.counts[term].append(count)
+            self.size += POSTING_OVERHEAD
+            if doc_positions is not None:
+                self.positions[term].append(doc_positions[term])
+                self.size += BYTES_OVERHEAD + len(doc_positions[term])
+
+    def spill(self, directory: Optional[str] = None) -> RunFile:
+        run = RunFile(directory)
+        for term in sorted(self.doc_ids, key=str.encode):
+            run.write(encode_postings(term.encode(), self.doc_ids[term],
+                                      self.counts[term],
+                                      self.positions[term]))
+        return run
+
+
+def encode_postings(term_bytes: bytes, doc_ids: array, counts: array,
+                    positions: List[bytes]) -> bytes:
+    payload = bytearray()
+    codec.write_varint(payload, len(term_bytes))
+    payload += term_bytes
+    codec.write_varint(payload, len(doc_ids))
+    payload += codec.encode_deltas(doc_ids)
+    payload += codec.encode_varints(counts)
+    for term_positions in positions:
+        codec.write_varint(payload, len(term_positions))
+        payload += term_positions
+    return bytes(payload)
+
+
+def decode_postings(payload: bytes) -> Postings:
+    (length,), position = codec.decode_varints(payload, 0, 1)
+    term_bytes = payload[position:position + length]
+    (count,), position = codec.decode_varints(payload, position + length, 1)
+    doc_ids, position = codec.decode_deltas(payload, position, count)
+    counts, position = codec.decode_varints(payload, position, count)
+    positions = []
+    while position < len(payload):
+        (length,), position = codec.decode_varints(payload, position, 1)
+        positions.append(payload[position:position + length])
+        position += length
+    return term_bytes, doc_ids, counts, positions
+
+
+def merge_postings(runs: List[RunFile]) -> Iterator[Postings]:
+    streams = [map(decode_postings, run.records()) for run in runs]
+    merged = heapq.merge(*streams, key=itemgetter(0))
+    for term_bytes, group in itertools.groupby(merged, key=itemgetter(0)):
+        doc_ids, counts, positions = [], [], []
+        for _, run_doc_ids, run_counts, run_positions in group:
+            doc_ids.extend(run_doc_ids)
+            counts.extend(run_counts)
+            positions.extend(run_positions)
+        yield term_bytes, doc_ids, counts, positions
+
+
+class ForwardSorter:
+
+    def __init__(self, memory_budget: int, directory: Optional[str] = None):
+        self.memory_budget = memory_budget
+        self.directory = directory
+        self.entries: List[ForwardEntry] = []
+        self.size = 0
+        self.runs: List[RunFile] = []
+
+    def add(self, doc_id: int, term_id: int, count: int, positions: bytes):
+        self.entries.append((doc_id, term_id, count, positions))
+        self.size += FORWARD_ENTRY_OVERHEAD + len(positions)
+        if self.size >= self.memory_budget:
+            self.spill()
+
+    def spill(self):
+        self.entries.sort()
+        run = RunFile(self.directory)
+        for doc_id, term_id, count, positions in self.entries:
+            run.write(codec.encode_varints((doc_id, term_id, count)) +
+                      positions)
+        self.runs.append(run)
+        self.entries = []
+        self.size = 0
+
+    def documents(self) -> \
+            Iterator[Tuple[int, List[Tuple[int, int]], List[bytes]]]:
+        if self.entries:
+            self.spill()
+        streams = [map(decode_forward, run.records()) for run in self.runs]
+        merged = heapq.merge(*streams)
+        for doc_id, group in itertools.groupby(merged, key=itemgetter(0)):
+            forward, positions = [], []
+            for _, term_id, count, term_positions in group:
+                forward.append((term_id, count))
+                positions.append(term_positions)
+            yield doc_id, forward, positions
+
+
+def decode_forward(payload: bytes) -> ForwardEntry:
+    (doc_id, term_id, count), position = codec.decode_varints(payload, 0, 3)
+    return doc_id, term_id, count, payload[position:]
+
+
+class ExternalIndexBuilder:
+
+    def __init__(self, memory_budget: int, store_positions: bool = False,
+                 directory: Optional[str] = None):
+        self.memory_budget = memory_budget
+        self.store_positions = store_positions
+        self.directory = directory
+        self.doc_table: List[Path] = []
+        self.paths_only: Set[int] = set()
+        self.lengths = array(COUNT_TYPE)
+        self.block = PostingsBlock()
+        self.runs: List[RunFile] = []
+        self.runs_count = 0
+
+    def add_document(self, doc: Path, terms: Counter[str],
+                     doc_positions: Optional[Dict[str, bytes]] = None):
+        doc_id = len(self.doc_table)
+        self.doc_table.append(doc)
+        self.lengths.append(sum(terms.values()))
+        self.block.add(doc_id, terms,
+                       doc_positions if self.store_positions else None)
+        if self.block.size >= self.memory_budget:
+            self.spill()
+
+    def add_path(self, doc: Path):
+        self.paths_only.add(len(self.doc_table))
+        self.doc_table.append(doc)
+        self.lengths.append(0)
+
+    def spill(self):
+        self.runs.append(self.block.spill(self.directory))
+        self.runs_count += 1
+        self.block = PostingsBlock()
+
+    def write(self, path: Path, root_path: Path,
+              fingerprints: Mapping[Path, Fingerprint], meta: dict):
+        if self.block.doc_ids:
+            self.spill()
+        writer = segment.SegmentWriter(self.store_positions)
+        forward = ForwardSorter(self.memory_budget, self.directory)
+        for term_id, (term_bytes, doc_ids, counts, positions) in \
+                enumerate(merge_postings(self.runs)):
+            max_tf = max(count / self.lengths[doc_id]
+                         for doc_id, count in zip(doc_ids, counts))
+            writer.add_term(term_bytes.decode(), doc_ids, counts, max_tf)
+            for doc_id, count, term_positions in itertools.zip_longest(
+                    doc_ids, counts, positions, fillvalue=b''):
+                forward.add(doc_id, term_id, count, term_positions)
+        self.runs = []
+        documents = forward.documents()
+        next_document = next(documents, None)
+        for doc_id, doc in enumerate(self.doc_table):
+            doc_forward, doc_positions = [], []
+            if next_document is not None and next_document[0] == doc_id:
+                _, doc_forward, doc_positions = next_document
+                next_document = next(documents, None)
+            if doc_id in self.paths_only:
+                writer.add_document(doc, None)
+            else:
+                writer.add_document(doc, doc_forward, doc_positions)
+        writer.add_files(fingerprints)
+        writer.add_trigrams(trigrams.build(root_path, self.doc_table))
+        writer.write(path, meta)
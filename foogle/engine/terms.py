@@ -0,0 +1,138 @@
+import heapq
+import os
+import re
+from bisect import bisect_left, insort
+from typing import AbstractSet, Iterable, Iterator, List, Optional, \
+    Sequence, Tuple
+
+from foogle.engine.cache import QueryCache
+from foogle.engine.overlay import COMPACT_RATIO
+
+MAX_EXPANSIONS = 64
+EXPANSIONS_CACHE_SIZE = 1024
+MAX_CODE_POINT = 0x10FFFF
+WILDCARD_PATTERN = re.compile(r'[*?]')
+
+
+class TermDictionary:
+
+    def __init__(self, terms: Sequence[str],
+                 max_expansions: int = MAX_EXPANSIONS,
+                 added: Sequence[str] = (),
+                 removed: AbstractSet[str] = frozenset()):
+        self.terms = terms
+        self.added = added
+        self.removed = removed
+        self.max_expansions = max_expansions
+        self.cache = QueryCache(EXPANSIONS_CACHE_SIZE)
+
+    def __iter__(self) -> Iterator[str]:
+        return self.range_terms('')
+
+    def updated(self, added: Iterable[str], removed: Iterable[str]) -> \
+            'TermDictionary':
+        added_terms = list(self.added)
+        removed_terms = set(self.removed)
+        for term in added:
+            if term in removed_terms:
+                removed_terms.discard(term)
+            else:
+                insort(added_terms, term)
+        for term in removed:
+            position = bisect_left(added_terms, term)
+            if position < len(added_terms) and added_terms[position] == term:
+                del added_terms[position]
+            else:
+                removed_terms.add(term)
+        dictionary = TermDictionary(self.terms, self.max_expansions,
+                                    added_terms, removed_terms)
+        if (len(added_terms) + len(removed_terms)) * COMPACT_RATIO > \
+                len(self.terms):
+            return TermDictionary(list(dictionary), self.max_expansions)
+        return dictionary
+
+    def expand(self, pattern: str, distance: Optional[int] = None) -> \
+            List[str]:
+        key = pattern, distance
+        terms = self.cache.get(key)
+        if terms is None:
+            if distance is None:
+                terms = self.wildcard(pattern)
+            else:
+                terms = self.fuzzy(pattern, distance)
+            self.cache.put(key, terms)
+        return terms
+
+    def prefix_range(self, prefix: str, start: int = 0) -> Tuple[int, int]:
+        return prefix_range(self.terms, prefix, start)
+
+    def range_terms(self, prefix: str) -> Iterator[str]:
+        parts = []
+        for terms in (self.terms, self.added):
+            start, end = prefix_range(terms, prefix)
+            parts.append(map(terms.__getitem__, range(start, end)))
+        return (term for term in heapq.merge(*parts)
+                if term not in self.removed)
+
+    def wildcard(self, pattern: str) -> List[str]:
+        literal = WILDCARD_PATTERN.split(pattern, 1)[0]
+        terms = self.range_terms(literal)
+        if pattern != literal + '*':
+            regex = re.compile(''.join(
+                '.' if char == '?' else '.*' if char == '*'
+                else re.escape(char) for char in pattern))
+            terms = filter(regex.fullmatch, terms)
+        matches = []
+        for term in terms:
+            if len(matches) == self.max_expansions:
+                break
+            matches.append(term)
+        return matches
+
+    def fuzzy(self, word: str, distance: int) -> List[str]:
+        matches = [match for terms in (self.terms, self.added)
+                   for match in fuzzy_matches(terms, word, distance)
+                   if match[1] not in self.removed]
+        matches.sort()
+        return [term for _, term in matches[:self.max_expansions]]
+
+
+def prefix_range(terms: Sequence[str], prefix: str,
+                 start: int = 0) -> Tuple[int, int]:
+    start = bisect_left(terms, prefix, start)
+    if not prefix or ord(prefix[-1]) == MAX_CODE_POINT:
+        return start, len(terms)
+    successor = prefix[:-1] + chr(ord(prefix[-1]) + 1)
+    return start, bisect_left(terms, successor, start)
+
+
+def fuzzy_matches(terms: Sequence[str], word: str,
+                  distance: int) -> List[Tuple[int, str]]:
+    matches = []
+    rows = [list(range(len(word) + 1))]
+    previous = ''
+    i = 0
+    while i < len(terms):
+        term = terms[i]
+        common = min(len(os.path.commonprefix([previous, term])),
+                     len(rows) - 1)
+        del rows[common + 1:]
+        previous = term
+        for char in term[common:]:
+            rows.append(edit_distances(rows[-1], word, char))
+            if min(rows[-1]) > distance:
+                i = prefix_range(terms, term[:len(rows) - 1], i)[1]
+                break
+        else:
+            if rows[-1][-1] <= distance:
+                matches.append((rows[-1][-1], term))
+            i += 1
+    return matches
+
+
+def edit_distances(row: List[int], word: str, char: str) -> List[int]:
+    distances = [row[0] + 1]
+    for j, word_char in enumerate(word, 1):
+        distances.append(min(distances[j - 1] + 1, row[j] + 1,
+                             row[j - 1] + (word_char != char)))
+    return distances
@@ -0,0 +1,67 @@
+import collections
+import re
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Counter, Dict, Iterator, Optional, TextIO, Tuple
+
+from foogle.engine import positions
+
+TOKEN_PATTERN = re.compile(r'[^\W_]+')
+
+
+@dataclass(frozen=True)
+class Tokenizer:
+    chunk_size: int = 1 << 16
+    max_document_size: Optional[int] = None
+    max_token_length: int = 256
+
+    def count(self, document: Path, encoding: str) -> Counter[str]:
+        with document.open('r', encoding=encoding, errors='replace') as f:
+            return collections.Counter(self.tokens(f))
+
+    def count_positions(self, document: Path, encoding: str) -> \
+            Tuple[Counter[str], Dict[str, bytes]]:
+        term_positions = collections.defaultdict(list)
+        with document.open('r', encoding=encoding, errors='replace') as f:
+            for position, token in enumerate(self.tokens(f)):
+                term_positions[token].append(position)
+        counts = collections.Counter({term: len(found) for term, found
+                                      in term_positions.items()})
+        return counts, positions.encode_all(term_positions)
+
+    def tokens(self, file: TextIO) -> Iterator[str]:
+        tail = ''
+        skipping = False
+        for chunk in self.chunks(file):
+            if skipping:
+                match = TOKEN_PATTERN.match(chunk)
+                if match and match.end() == len(chunk):
+                    continue
+                skipping = False
+                if match:
+                    chunk = chunk[match.end():]
+            chunk = tail + chunk
+            tail = ''
+            for match in TOKEN_PATTERN.finditer(chunk):
+                token = match.group()
+                if match.end() == len(chunk):
+                    tail = token
+                elif len(token) <= self.max_token_length:
+                    yield token
+            if len(tail) > self.max_token_length:
+                tail = ''
+                skipping = True
+        if tail:
+            yield tail
+
+    def chunks(self, file: TextIO) -> Iterator[str]:
+        remaining = self.max_document_size
+        while remaining is None or remaining > 0:
+            size = self.chunk_size if remaining is None \
+                else min(self.chunk_size, remaining)
+            chunk = file.read(size)
+            if not chunk:
+                return
+            if remaining is not None:
+                remaining -= len(chunk)
+            yield chunk.lower()
@@ -0,0 +1,109 @@
+import fnmatch
+import re
+from array import array
+from collections import defaultdict
+from pathlib import Path
+from typing import Dict, List, Optional, Sequence, Set
+
+from foogle.engine import postings
+from foogle.engine.index import Index
+
+TRIGRAM_SIZE = 3
+GLOB_PATTERN = re.compile(r'[*?]|\[[^\]]*\]')
+
+
+def path_key(root: Path, path: Path) -> str:
+    return path.relative_to(root).as_posix().lower()
+
+
+def trigrams(text: str) -> Set[str]:
+    return {text[i:i + TRIGRAM_SIZE]
+            for i in range(len(text) - TRIGRAM_SIZE + 1)}
+
+
+def build(root: Path, doc_table: Sequence[Optional[Path]]) -> \
+        Dict[str, array]:
+    trigram_postings = defaultdict(postings.empty_postings)
+    for doc_id, doc in enumerate(doc_table):
+        if doc is None:
+            continue
+        for trigram in trigrams(path_key(root, doc)):
+            trigram_postings[trigram].append(doc_id)
+    return dict(trigram_postings)
+
+
+def add_path(index: Index, doc_id: int, copied: Set[str]):
+    key = path_key(index.root_path, index.doc_table[doc_id])
+    for trigram in trigrams(key):
+        if trigram not in copied:
+            index.trigrams[trigram] = array(
+                postings.DOC_ID_TYPE,
+                index.trigrams.get(trigram, postings.empty_postings()))
+            copied.add(trigram)
+        index.trigrams[trigram].append(doc_id)
+
+
+def remove_path(index: Index, doc_id: int, copied: Set[str]):
+    key = path_key(index.root_path, index.doc_table[doc_id])
+    for trigram in trigrams(key):
+        if trigram not in copied:
+            index.trigrams[trigram] = array(postings.DOC_ID_TYPE,
+                                            index.trigrams[trigram])
+            copied.add(trigram)
+        doc_ids = index.trigrams[trigram]
+        del doc_ids[postings.find(doc_ids, doc_id)]
+        if not doc_ids:
+            del index.trigrams[trigram]
+
+
+class PathPattern:
+
+    def __init__(self, pattern: str):
+        self.pattern = pattern.lower()
+        self.is_glob = GLOB_PATTERN.search(self.pattern) is not None
+        self.basename = self.is_glob and '/' not in self.pattern
+        if self.is_glob:
+            literals = GLOB_PATTERN.split(self.pattern)
+            self.regex = re.compile(fnmatch.translate(self.pattern))
+        else:
+            literals = [self.pattern]
+        self.trigrams = set().union(*map(trigrams, literals))
+
+    def matches(self, key: str) -> bool:
+        if not self.is_glob:
+            return self.pattern in key
+        if self.basename:
+            key = key.rsplit('/', 1)[-1]
+        return self.regex.match(key) is not None
+
+
+def candidates(index: Index, required: Set[str]) -> array:
+    if not required:
+        return array(postings.DOC_ID_TYPE, sorted(index.doc_ids().values()))
+    lists = []
+    for trigram in required:
+        doc_ids = index.trigrams.get(trigram)
+        if doc_ids is None:
+            return postings.empty_postings()
+        lists.append(doc_ids)
+    lists.sort(key=len)
+    found_docs = lists[0]
+    for doc_ids in lists[1:]:
+        found_docs = postings.intersect(found_docs, doc_ids)
+        if not found_docs:
+            break
+    return found_docs
+
+
+def search(index: Index, pattern: str,
+           limit: Optional[int] = None) -> List[Path]:
+    path_pattern = PathPattern(pattern)
+    found = []
+    for doc_id in candidates(index, path_pattern.trigrams):
+        if limit is not None and len(found) >= limit:
+            break
+        doc = index.doc_table[doc_id]
+        if doc is not None and \
+                path_pattern.matches(path_key(index.root_path, doc)):
+            found.append(doc)
+    return found
@@ -0,0 +1,295 @@
+import ctypes
+import ctypes.util
+import os
+import select
+import struct
+import sys
+import threading
+import time
+from pathlib import Path
+from typing import Dict, Iterator, NamedTuple, Optional, Set
+
+from foogle.engine.crawler import Crawler
+from foogle.engine.errors import SearcherError, WatchNotSupported
+from foogle.engine.search_engine import INDEX_PATH, SearchEngine, \
+    UpdateResult
+
+if sys.platform.startswith('linux'):
+    libc = ctypes.CDLL(ctypes.util.find_library('c'), use_errno=True)
+else:
+    libc = None
+
+INOTIFY_AVAILABLE = libc is not None and hasattr(libc, 'inotify_init1')
+
+IN_MODIFY = 0x00000002
+IN_ATTRIB = 0x00000004
+IN_CLOSE_WRITE = 0x00000008
+IN_MOVED_FROM = 0x00000040
+IN_MOVED_TO = 0x00000080
+IN_CREATE = 0x00000100
+IN_DELETE = 0x00000200
+IN_DELETE_SELF = 0x00000400
+IN_Q_OVERFLOW = 0x00004000
+IN_IGNORED = 0x00008000
+IN_ONLYDIR = 0x01000000
+IN_ISDIR = 0x40000000
+WATCH_MASK = IN_MODIFY | IN_ATTRIB | IN_CLOSE_WRITE | IN_MOVED_FROM | \
+    IN_MOVED_TO | IN_CREATE | IN_DELETE | IN_DELETE_SELF | IN_ONLYDIR
+EVENT_HEADER = struct.Struct('iIII')
+READ_SIZE = 64 * 1024
+
+DEBOUNCE = 1.0
+MAX_DELAY = 10.0
+CHECKPOINT_INTERVAL = 60.0
+POLL_INTERVAL = 0.2
+
+WATCHING = 'watching'
+STOPPED = 'stopped'
+FAILED = 'failed'
+
+
+class Event(NamedTuple):
+    wd: int
+    mask: int
+    name: str
+
+
+class Inotify:
+
+    def __init__(self):
+        if not INOTIFY_AVAILABLE:
+            raise WatchNotSupported()
+        self.fd = libc.inotify_init1(os.O_NONBLOCK | os.O_CLOEXEC)
+        if self.fd < 0:
+            raise OSError(ctypes.get_errno(), 'inotify_init1 failed')
+
+    def add_watch(self, path: Path, mask: int = WATCH_MASK) -> int:
+        wd = libc.inotify_add_watch(self.fd, os.fsencode(path), mask)
+        if wd < 0:
+            raise OSError(ctypes.get_errno(), 'inotify_add_watch failed',
+                          str(path))
+        return wd
+
+    def remove_watch(self, wd: int):
+        libc.inotify_rm_watch(self.fd, wd)
+
+    def wait(self, timeout: float) -> bool:
+        ready, _, _ = select.select([self.fd], [], [], timeout)
+        return bool(ready)
+
+    def read(self) -> Iterator[Event]:
+        try:
+            buffer = os.read(self.fd, READ_SIZE)
+        except BlockingIOError:
+            return
+        offset = 0
+        while offset < len(buffer):
+            wd, mask, _, length = EVENT_HEADER.unpack_from(buffer, offset)
+            offset += EVENT_HEADER.size
+            name = buffer[offset:offset + length].rstrip(b'\0')
+            offset += length
+            yield Event(wd, mask, os.fsdecode(name))
+
+    def close(self):
+        os.close(self.fd)
+
+
+class IndexWatcher:
+
+    def __init__(self, engine: SearchEngine,
+                 lock: Optional[threading.Lock] = None,
+                 debounce: float = DEBOUNCE, max_delay: float = MAX_DELAY,
+                 checkpoint_interval: float = CHECKPOINT_INTERVAL,
+                 index_path: Path = INDEX_PATH):
+        engine.check_index_exist()
+        self.engine = engine
+        self.lock = lock or threading.Lock()
+        self.debounce = debounce
+        self.max_delay = max_delay
+        self.checkpoint_interval = checkpoint_interval
+        self.index_path = index_path
+        self.root_path = engine.index.root_path
+        self.crawler = Crawler(str(self.root_path),
+                               engine.load_rules(engine.index.robot_txt),
+                               engine.crawl_options)
+        self.inotify = Inotify()
+        self.directories: Dict[int, Path] = {}
+        self.pending: Set[Path] = set()
+        self.overflowed = False
+        self.first_event: Optional[float] = None
+        self.last_event = 0.0
+        self.dirty = False
+        self.lock_busy = False
+        self.last_checkpoint = time.monotonic()
+        self.stopped = threading.Event()
+        self.status = WATCHING
+        self.message = ''
+        self.batches = 0
+        self.changes = UpdateResult()
+        self.last_applied: Optional[float] = None
+        self.checkpoints = 0
+        self.watch_tree(self.root_path)
+        self.thread = threading.Thread(target=self.run, name='index-watcher',
+                                       daemon=True)
+
+    def start(self) -> 'IndexWatcher':
+        self.thread.start()
+        return self
+
+    def stop(self):
+        self.stopped.set()
+        if self.thread.is_alive() and \
+                self.thread is not threading.current_thread():
+            self.thread.join()
+
+    @property
+    def running(self) -> bool:
+        return self.status == WATCHING
+
+    def watch_tree(self, directory: Path):
+        directories = [directory]
+        while directories:
+            directory = directories.pop()
+            relative = self.crawler.relative(directory)
+            if relative is not None and self.crawler.excluded(relative):
+                continue
+            try:
+                wd = self.inotify.add_watch(directory)
+                with os.scandir(directory) as entries:
+                    directories.extend(Path(entry.path) for entry in entries
+                                       if self.crawler.is_directory(entry))
+            except OSError:
+                continue
+            self.directories[wd] = directory
+
+    def unwatch_tree(self, directory: Path):
+        for wd, watched in list(self.directories.items()):
+            if watched == directory or directory in watched.parents:
+                self.inotify.remove_watch(wd)
+                del self.directories[wd]
+
+    def run(self):
+        try:
+            while not self.stopped.is_set():
+                if self.inotify.wait(self.timeout()):
+                    self.collect(self.inotify.read())
+                self.flush()
+                self.checkpoint()
+            self.flush(force=True)
+            self.checkpoint(force=True)
+            if self.status == WATCHING:
+                self.status = STOPPED
+        except SearcherError as e:
+            self.fail(e.message)
+        except Exception as e:
+            self.fail(f'error: {e}')
+        finally:
+            self.inotify.close()
+
+    def fail(self, message: str):
+        self.message = message
+        self.status = FAILED
+
+    def timeout(self) -> float:
+        if self.first_event is None or self.lock_busy:
+            return POLL_INTERVAL
+        deadline = min(self.last_event + self.debounce,
+                       self.first_event + self.max_delay)
+        return max(0.0, min(POLL_INTERVAL, deadline - time.monotonic()))
+
+    def collect(self, events: Iterator[Event]):
+        for event in events:
+            if event.mask & IN_Q_OVERFLOW:
+                self.overflowed = True
+                continue
+            directory = self.directories.get(event.wd)
+            if event.mask & IN_IGNORED:
+                self.directories.pop(event.wd, None)
+                continue
+            if directory is None:
+                continue
+            path = directory / event.name if event.name else directory
+            relative = self.crawler.relative(path)
+            if relative is not None and self.crawler.excluded(relative):
+                continue
+            if event.mask & IN_ISDIR:
+                if event.mask & (IN_CREATE | IN_MOVED_TO):
+                    self.watch_tree(path)
+                elif event.mask & IN_MOVED_FROM:
+                    self.unwatch_tree(path)
+            self.pending.add(path)
+        if self.pending or self.overflowed:
+            now = time.monotonic()
+            if self.first_event is None:
+                self.first_event = now
+            self.last_event = now
+
+    def flush(self, force: bool = False):
+        if self.first_event is None:
+            return
+        now = time.monotonic()
+        if not force and now - self.last_event < self.debounce and \
+                now - self.first_event < self.max_delay:
+            return
+        if not self.acquire(force):
+            return
+        try:
+            index = self.engine.index
+            if index is None or index.root_path != self.root_path:
+                self.message = 'index root changed, watching stopped'
+                self.stopped.set()
+                return
+            if self.overflowed:
+                result = self.engine.update_index()
+            else:
+                result = self.engine.update_paths(self.pending)
+        finally:
+            self.lock.release()
+        self.pending = set()
+        self.overflowed = False
+        self.first_event = None
+        self.batches += 1
+        self.last_applied = time.time()
+        self.changes.added += result.added
+        self.changes.modified += result.modified
+        self.changes.removed += result.removed
+        if result.added or result.modified or result.removed:
+            self.dirty = True
+
+    def acquire(self, force: bool) -> bool:
+        self.lock_busy = not self.lock.acquire(blocking=force)
+        return not self.lock_busy
+
+    def checkpoint(self, force: bool = False):
+        if not self.dirty:
+            return
+        if not force and time.monotonic() - self.last_checkpoint < \
+                self.checkpoint_interval:
+            return
+        if not self.acquire(force):
+            return
+        try:
+            self.engine.save_index(self.index_path)
+        finally:
+            self.lock.release()
+        self.dirty = False
+        self.last_checkpoint = time.monotonic()
+        self.checkpoints += 1
+
+    def as_dict(self) -> dict:
+        return {'root': str(self.root_path), 'status': self.status,
+                'message': self.message,
+                'directories': len(self.directories),
+                'pending': len(self.pending), 'batches': self.batches,
+                'added': self.changes.added,
+                'modified': self.changes.modified,
+                'removed': self.changes.removed,
+                'last_applied': self.last_applied,
+                'checkpoints': self.checkpoints}
+
+    def __str__(self) -> str:
+        message = f'\n{self.message}' if self.message else ''
+        return f'Watching {self.root_path}: {self.status}{message}\n' \
+               f'Directories: {len(self.directories)},' \
+               f' batches applied: {self.batches}, changes: {self.changes},' \
+               f' checkpoints: {self.checkpoints}'
@@ -0,0 +1,105 @@
+from array import array
+from dataclasses import dataclass
+from typing import Dict, List, Optional, Sequence, Tuple, Counter
+
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
+from foogle.engine import postings
+from foogle.engine.index import Index
+from foogle.engine.ranking import Statistics
+
+NUMPY_AVAILABLE = numpy is not None
+
+
+@dataclass
+class CsrMatrix:
+    terms: List[str]
+    indptr: 'numpy.ndarray'
+    indices: 'numpy.ndarray'
+    data: 'numpy.ndarray'
+
+    @staticmethod
+    def from_documents(documents_to_terms: Dict[int, Counter[str]]) -> \
+            'CsrMatrix':
+        term_ids = {}
+        term_column = array('I')
+        doc_column = array('I')
+        counts = array('I')
+        for doc_id, terms in documents_to_terms.items():
+            term_column.extend(term_ids.setdefault(term, len(term_ids))
+                               for term in terms)
+            doc_column.extend([doc_id] * len(terms))
+            counts.extend(terms.values())
+        term_column = numpy.frombuffer(term_column, dtype=numpy.uint32)
+        doc_column = numpy.frombuffer(doc_column, dtype=numpy.uint32)
+        counts = numpy.frombuffer(counts, dtype=numpy.uint32)
+        totals = numpy.bincount(doc_column, weights=counts)
+        order = numpy.lexsort((doc_column, term_column))
+        indptr = numpy.zeros(len(term_ids) + 1, dtype=numpy.int64)
+        numpy.cumsum(numpy.bincount(term_column, minlength=len(term_ids)),
+                     out=indptr[1:])
+        data = counts[order] / totals[doc_column[order]]
+        return CsrMatrix(list(term_ids), indptr, doc_column[order], data)
+
+    def max_tf(self) -> 'numpy.ndarray':
+        if not self.terms:
+            return numpy.zeros(0)
+        return numpy.maximum.reduceat(self.data, self.indptr[:-1])
+
+    def to_postings(self) -> \
+            Tuple[Dict[str, array], Dict[str, array], Dict[str, float]]:
+        terms_to_documents = {}
+        tf = {}
+        indices = self.indices.tobytes()
+        data = self.data.tobytes()
+        doc_id_size = self.indices.itemsize
+        weight_size = self.data.itemsize
+        for term_id, term in enumerate(self.terms):
+            start, end = self.indptr[term_id], self.indptr[term_id + 1]
+            terms_to_documents[term] = postings.empty_postings()
+            terms_to_documents[term].frombytes(
+                indices[start * doc_id_size:end * doc_id_size])
+            tf[term] = postings.empty_weights()
+            tf[term].frombytes(data[start * weight_size:end * weight_size])
+        max_tf = dict(zip(self.terms, self.max_tf().tolist()))
+        return terms_to_documents, tf, max_tf
+
+
+def invert(documents_to_terms: Dict[int, Counter[str]]) -> \
+        Tuple[Dict[str, array], Dict[str, array], Dict[str, float]]:
+    return CsrMatrix.from_documents(documents_to_terms).to_postings()
+
+
+def rank(index: Index, terms: Sequence[str], candidates: array,
+         limit: Optional[int] = None) -> List[int]:
+    return [doc_id for doc_id, _ in
+            rank_scored(index, terms, candidates, limit)]
+
+
+def rank_scored(index: Index, terms: Sequence[str], candidates: array,
+                limit: Optional[int] = None,
+                statistics: Optional[Statistics] = None) -> \
+        List[Tuple[int, float]]:
+    statistics = statistics or index
+    candidates = numpy.frombuffer(candidates, dtype=numpy.uint32)
+    scores = numpy.zeros(len(candidates))
+    for term in terms:
+        row_indices = numpy.frombuffer(index.postings(term),
+                                       dtype=numpy.uint32)
+        row_data = numpy.frombuffer(index.tf[term])
+        positions = numpy.searchsorted(row_indices, candidates)
+        positions[positions == len(row_indices)] = 0
+        found = row_indices[positions] == candidates
+        scores += numpy.where(found, row_data[positions], 0) * \
+            statistics.idf(term)
+    if limit is not None and limit < len(candidates):
+        if limit == 0:
+            return []
+        threshold = numpy.partition(scores, len(scores) - limit)[-limit]
+        selected = scores >= threshold
+        candidates, scores = candidates[selected], scores[selected]
+    order = numpy.lexsort((candidates, -scores))[:limit]
+    return list(zip(candidates[order].tolist(), scores[order].tolist()))
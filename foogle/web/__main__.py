@@ -10,6 +10,17 @@ def parse_args():
     parser.add_argument('--port', help='Web server port', default='5000')
     parser.add_argument('--debug', help='Web server debug option',
                         action='store_true')
+    parser.add_argument('--load-index', help='Load saved index on start',
+                        action='store_true')
+    parser.add_argument('--metrics', help='Collect build and search metrics'
+                                          ' for the /metrics endpoint',
+                        action='store_true')
+    parser.add_argument('--watch', help='Apply file changes under the'
+                                        ' loaded index root as they happen',
+                        action='store_true')
+    parser.add_argument('--numpy', help='Rank with NumPy instead of'
+                                        ' MaxScore top-k pruning',
+                        action='store_true')
     return parser.parse_args().__dict__
 
 
@@ -1,5 +1,6 @@
+import json
 import os
-from flask import Flask, render_template, request
+from flask import Flask, Response, jsonify, render_template, request
 
 from foogle.engine.controller import Controller
 
@@ -19,7 +20,28 @@ def build_index():
         form = request.form
         root_dir = form['root_dir']
         robot_txt = form['robot_txt']
-        res = controller.execute('build_index', root_dir, robot_txt)
+        workers = form.get('workers') or '1'
+        positions = form.get('positions', '')
+        memory = form.get('memory', '')
+        res = controller.execute('start_build', root_dir, robot_txt, workers,
+                                 positions, memory)
+        if isinstance(res, str):
+            return render_template('engine.html', index_status=res)
+    return render_template('engine.html', index_status=str(res),
+                           build_job=res)
+
+
+@server.route('/build_index/status/<job_id>', methods=['GET'])
+def build_status(job_id: str):
+    res = controller.execute('build_status', job_id)
+    if isinstance(res, str):
+        return jsonify(error=res), 404
+    return jsonify(res.as_dict())
+
+
+@server.route('/build_index/cancel/<job_id>', methods=['POST'])
+def cancel_build(job_id: str):
+    res = controller.execute('cancel_build', job_id)
     return render_template('engine.html', index_status=res)
 
 
@@ -31,6 +53,34 @@ def load_index():
     return render_template('engine.html', index_status=res)
 
 
+@server.route('/update_index', methods=['GET'])
+def update_index():
+    res = ''
+    if request.method == 'GET':
+        res = controller.execute('update_index')
+    return render_template('engine.html', index_status=res)
+
+
+@server.route('/watch_index', methods=['GET'])
+def start_watch():
+    res = controller.execute('start_watch')
+    return render_template('engine.html', index_status=str(res))
+
+
+@server.route('/watch_index/stop', methods=['GET'])
+def stop_watch():
+    res = controller.execute('stop_watch')
+    return render_template('engine.html', index_status=str(res))
+
+
+@server.route('/api/watch', methods=['GET'])
+def watch_status():
+    res = controller.execute('watch_status')
+    if isinstance(res, str):
+        return jsonify(error=res), 404
+    return jsonify(res.as_dict())
+
+
 @server.route('/save_index', methods=['GET'])
 def save_index():
     res = ''
@@ -44,16 +94,124 @@ def search():
     res = ''
     if request.method == 'POST':
         query = request.form['query']
-        res = controller.execute('search', query)
+        limit = request.form.get('limit', '')
+        res = controller.execute('search', query, limit)
         if isinstance(res, str) and res.startswith('error'):
             return render_template('engine.html', search_status=res)
     return render_template('search_results.html', search_results=res)
 
 
+@server.route('/search_paths', methods=['POST'])
+def search_paths():
+    pattern = request.form['pattern']
+    limit = request.form.get('limit', '')
+    res = controller.execute('search_paths', pattern, limit)
+    if isinstance(res, str):
+        return render_template('engine.html', search_status=res)
+    return render_template('search_results.html', search_results=[res])
+
+
+def page_param(params, name: str) -> str:
+    value = params.get(name)
+    return '' if value is None else str(value)
+
+
+@server.route('/api/search', methods=['GET', 'POST'])
+def api_search():
+    params = request.get_json(silent=True) or request.values
+    res = controller.execute('search_page', params.get('query', ''),
+                             page_param(params, 'offset'),
+                             page_param(params, 'limit'))
+    if isinstance(res, str):
+        return jsonify(error=res), 400
+    return jsonify(results=[result.as_dict() for result in res])
+
+
+@server.route('/api/paths', methods=['GET', 'POST'])
+def api_paths():
+    params = request.get_json(silent=True) or request.values
+    res = controller.execute('search_paths', params.get('pattern', ''),
+                             page_param(params, 'limit'))
+    if isinstance(res, str):
+        return jsonify(error=res), 400
+    return jsonify(res.as_dict())
+
+
+@server.route('/api/explain', methods=['GET', 'POST'])
+def api_explain():
+    params = request.get_json(silent=True) or request.values
+    res = controller.execute('explain', params.get('query', ''))
+    if isinstance(res, str):
+        return jsonify(error=res), 400
+    return jsonify(res.as_dict())
+
+
+@server.route('/api/search/batch', methods=['POST'])
+def api_search_batch():
+    params = request.get_json(silent=True) or {}
+    queries = params.get('queries')
+    if not isinstance(queries, list) or \
+            not all(isinstance(query, str) for query in queries):
+        return jsonify(error='error: "queries" must be a list of strings'), \
+            400
+    res = controller.execute('search_batch', queries,
+                             page_param(params, 'offset'),
+                             page_param(params, 'limit'))
+    if isinstance(res, str):
+        return jsonify(error=res), 400
+
+    def lines():
+        for query, results in zip(queries, res):
+            if isinstance(results, str):
+                yield json.dumps({'query': query, 'error': results}) + '\n'
+                continue
+            yield json.dumps({'query': query, 'results': [
+                result.as_dict() for result in results]}) + '\n'
+
+    return Response(lines(), mimetype='application/x-ndjson')
+
+
+@server.route('/metrics', methods=['GET'])
+def metrics():
+    res = controller.execute('stats')
+    return Response(res.prometheus(),
+                    mimetype='text/plain; version=0.0.4')
+
+
 @server.route('/about')
 def about():
     return render_template('about.html')
 
 
-def run_server(host: str, port: str, debug: bool):
-    server.run(host, port, debug)
+def preload_index():
+    print(controller.execute('load_index'))
+
+
+def enable_metrics():
+    controller.execute('stats', 'enable')
+
+
+def enable_numpy():
+    print(controller.execute('ranking', 'numpy'))
+
+
+if os.environ.get('FOOGLE_PRELOAD_INDEX'):
+    preload_index()
+if os.environ.get('FOOGLE_METRICS'):
+    enable_metrics()
+if os.environ.get('FOOGLE_NUMPY'):
+    enable_numpy()
+
+
+def run_server(host: str, port: str, debug: bool, load_index: bool = False,
+               metrics: bool = False, watch: bool = False,
+               numpy: bool = False):
+    if metrics:
+        enable_metrics()
+    if numpy:
+        enable_numpy()
+    if load_index:
+        preload_index()
+    if watch:
+        print(controller.execute('start_watch'))
+    server.run(host, port, debug, threaded=True)
@@ -0,0 +1,28 @@
+from benchmarks.corpus import CorpusSpec, Vocabulary, generate_corpus
+from benchmarks.scenarios import SCENARIOS, BenchmarkContext
+from foogle.engine import weighting
+
+
+def test_corpus_is_reproducible(tmp_path):
+    spec = CorpusSpec(files=30, mean_size=200, binary_ratio=0.2, seed=3)
+    first = generate_corpus(tmp_path / 'first', spec)
+    second = generate_corpus(tmp_path / 'second', spec)
+    assert [path.read_bytes() for path in first] == \
+        [path.read_bytes() for path in second]
+    assert any(path.suffix == '.bin' for path in first)
+
+
+def test_vocabulary_words_are_unique():
+    vocabulary = Vocabulary(1000, 1.1)
+    assert len(set(vocabulary.words)) == 1000
+    assert all(word.isalpha() for word in vocabulary.words)
+
+
+def test_ranking_scenario(tmp_path):
+    spec = CorpusSpec(files=30, mean_size=200, seed=3)
+    generate_corpus(tmp_path, spec)
+    context = BenchmarkContext(tmp_path, spec, queries=5)
+    metrics = SCENARIOS['ranking'](context)
+    assert 'python_or_top10_mean_ms' in metrics
+    assert ('numpy_single_all_p99_ms' in metrics) == \
+        weighting.NUMPY_AVAILABLE
@@ -0,0 +1,42 @@
+from pathlib import Path
+
+from foogle.engine import cache
+from foogle.engine.cache import QueryCache
+from foogle.engine.search_engine import SearchEngine
+
+
+def test_lru_eviction():
+    query_cache = QueryCache(max_size=2)
+    query_cache.put('a', 1)
+    query_cache.put('b', 2)
+    assert query_cache.get('a') == 1
+    query_cache.put('c', 3)
+    assert query_cache.get('b') is None
+    assert query_cache.get('a') == 1
+    stats = query_cache.stats()
+    assert (stats.size, stats.hits, stats.misses, stats.evictions) == \
+        (2, 2, 1, 1)
+
+
+def test_ttl_expiration(monkeypatch):
+    now = [100.0]
+    monkeypatch.setattr(cache.time, 'monotonic', lambda: now[0])
+    query_cache = QueryCache(ttl=10)
+    query_cache.put('a', 1)
+    now[0] += 5
+    assert query_cache.get('a') == 1
+    now[0] += 10
+    assert query_cache.get('a') is None
+
+
+def test_engine_cache_invalidation():
+    test_files = Path.cwd() / 'test_files'
+    engine = SearchEngine()
+    engine.build_index(str(test_files), '')
+    first = engine.search('Lorem')
+    assert engine.search('lorem') == first
+    assert engine.cache.stats().hits == 1
+    engine.build_index(str(test_files), '')
+    assert engine.cache.stats().size == 0
+    engine.search('lorem')
+    assert engine.cache.stats().misses == 2
@@ -0,0 +1,35 @@
+from pathlib import Path
+
+import pytest
+
+from foogle.engine import classifier
+from foogle.engine.search_engine import SearchEngine
+
+
+@pytest.mark.parametrize(
+    ('content', 'expected_encoding'), [
+        (b'plain ascii text', 'us-ascii'),
+        ('привет'.encode(), 'utf-8'),
+        (b'a' * (classifier.PREFIX_SIZE - 1) + 'é'.encode(), 'utf-8'),
+        (b'\x7fELF\x00\x01\x02', 'binary'),
+        ('café crème'.encode('latin-1'), 'iso-8859-1')
+    ]
+)
+def test_classify(tmp_path, content, expected_encoding):
+    path = tmp_path / 'file'
+    path.write_bytes(content)
+    assert classifier.classify(path, len(content)) == expected_encoding
+
+
+def test_rebuild_reuses_classification(monkeypatch):
+    test_files = Path.cwd() / 'test_files'
+    engine = SearchEngine()
+    engine.build_index(str(test_files), '')
+    index = engine.index
+
+    def fail_classify(path, size):
+        raise AssertionError(f'{path} classified twice')
+
+    monkeypatch.setattr(classifier, 'classify', fail_classify)
+    engine.build_index(str(test_files), '')
+    assert engine.index.documents_to_terms == index.documents_to_terms
@@ -0,0 +1,43 @@
+import pytest
+
+from foogle.engine import codec
+
+
+@pytest.mark.parametrize('values', [
+    [],
+    [0, 1, 127],
+    [128, 300, 16383, 16384, 2 ** 32 - 1],
+    [5, 0, 200, 7],
+])
+def test_varints_round_trip(values):
+    encoded = codec.encode_varints(values)
+    assert codec.decode_varints(encoded) == (values, len(encoded))
+    assert codec.decode_varints(encoded, 0, len(values)) == \
+        (values, len(encoded))
+
+
+def test_varint_sizes():
+    assert len(codec.encode_varints([127])) == 1
+    assert len(codec.encode_varints([128])) == 2
+    assert len(codec.encode_varints([2 ** 21])) == 4
+
+
+def test_decode_varints_with_count():
+    encoded = codec.encode_varints([1, 300, 2]) + b'tail'
+    assert codec.decode_varints(encoded, 0, 2) == ([1, 300], 3)
+    assert codec.decode_varints(encoded, 3, 1) == ([2], 4)
+
+
+def test_deltas_round_trip():
+    values = [3, 4, 10, 1000, 1001]
+    encoded = codec.encode_deltas(values)
+    assert codec.decode_varints(encoded)[0] == [3, 1, 6, 990, 1]
+    assert codec.decode_deltas(encoded) == (values, len(encoded))
+
+
+def test_front_coding():
+    strings = [b'/docs/a.txt', b'/docs/ab.txt', b'/docs/b.txt', b'/img']
+    encoded = codec.front_code(strings)
+    assert len(encoded) < sum(map(len, strings))
+    assert codec.front_decode(encoded) == (strings, len(encoded))
+    assert codec.front_decode(encoded, 0, 2)[0] == strings[:2]
@@ -1,7 +1,9 @@
 from pathlib import Path
 import pytest
 
+from foogle.engine import watcher, weighting
 from foogle.engine.controller import Controller
+from foogle.engine.errors import NumpyNotAvailable
 from foogle.engine.query_parser import Query
 from foogle.engine.search_engine import SearchByManyQueriesResult, \
     SearchByOneQueryResult
@@ -28,3 +30,139 @@ def test_controller(controller):
         SearchByOneQueryResult(Query({'lorem'}, set()),
                                [test_files_path / 'a.txt'])])
     assert res == expected
+
+
+def test_background_build(controller):
+    test_files_path = Path.cwd() / 'test_files'
+    job = controller.execute('start_build', str(test_files_path))
+    job.thread.join()
+    assert job.status == 'finished'
+    assert job.message == f'Index built for "{test_files_path}"'
+    status = controller.execute('build_status', job.id).as_dict()
+    assert status['files_scanned'] == status['files_discovered'] > 0
+    assert status['bytes_read'] == status['bytes_discovered']
+    assert status['eta'] == 0
+    res = controller.execute('search', 'lorem')
+    assert res.search_results[0].documents == [test_files_path / 'a.txt']
+
+
+def test_build_status_unknown_job(controller):
+    res = controller.execute('build_status', '42')
+    assert res == 'error: index build "42" not found'
+
+
+def test_index_busy_during_build(controller):
+    with controller.index_lock:
+        res = controller.execute('load_index')
+    assert res == 'error: index is being built right now, try again later'
+
+
+def test_search_page_invalid_offset(controller):
+    controller.execute('build_index', str(Path.cwd() / 'test_files'))
+    res = controller.execute('search_page', 'lorem', 'x')
+    assert res == 'error: results offset "x" must be a non-negative integer'
+
+
+def test_search_batch_reports_errors_per_query(controller):
+    controller.execute('build_index', str(Path.cwd() / 'test_files'))
+    batches = list(controller.execute(
+        'search_batch', ['lorem', '"lorem ipsum"', 'lingues']))
+    assert batches[0][0].hits[0][0].name == 'a.txt'
+    assert batches[1] == 'error: index has no term positions, rebuild it' \
+        ' with positions to search phrases'
+    assert [hit[0].name for hit in batches[2][0].hits] == ['b.txt', 'c.txt']
+
+
+def test_shard_commands(controller):
+    test_files_path = Path.cwd() / 'test_files'
+    res = controller.execute('add_shard', str(test_files_path))
+    assert res == f'Shard built for "{test_files_path}"'
+    res = controller.execute('list_shards')
+    assert res.splitlines()[0] == 'Shards: 1'
+    res = controller.execute('search_shards', 'lorem')
+    assert res.search_results[0].documents == [test_files_path / 'a.txt']
+    res = controller.execute('remove_shard', 'unknown')
+    assert res == 'error: index shard for "unknown" not found'
+
+
+def test_search_paths(controller):
+    test_files_path = Path.cwd() / 'test_files'
+    controller.execute('build_index', str(test_files_path))
+    res = controller.execute('search_paths', 'a.t*')
+    assert res.documents == [test_files_path / 'a.txt']
+    res = controller.execute('search_paths', 'a.t*', 'x')
+    assert res == 'error: results limit "x" must be a non-negative integer'
+
+
+def test_build_with_memory_budget(controller):
+    test_files_path = Path.cwd() / 'test_files'
+    res = controller.execute('build_index', str(test_files_path), '', '1',
+                             '', '0')
+    assert res == 'error: memory budget "0" must be a positive integer'
+    res = controller.execute('build_index', str(test_files_path), '', '1',
+                             '', '1')
+    assert res == f'Index built for "{test_files_path}"'
+    assert not (Path.cwd() / 'search_index').exists()
+    assert controller.engine.index.is_mapped()
+    res = controller.execute('search', 'lorem')
+    assert res.search_results[0].documents == [test_files_path / 'a.txt']
+
+
+def test_stats(controller):
+    test_files_path = Path.cwd() / 'test_files'
+    assert not controller.execute('stats').enabled
+    assert controller.execute('stats', 'enable').enabled
+    controller.execute('build_index', str(test_files_path))
+    controller.execute('search', 'lorem')
+    report = controller.execute('stats')
+    assert report.latencies['single'].count == 1
+    assert 'Metrics: enabled' in str(report)
+    assert controller.execute('stats', 'reset').latencies == {}
+    assert controller.execute('stats', 'bogus') == \
+        'error: stats action "bogus" must be one of enable, disable, reset'
+
+
+def test_ranking(controller, monkeypatch):
+    assert controller.execute('ranking') == 'Ranking: python'
+    assert not controller.engine.use_numpy
+    assert controller.execute('ranking', 'bogus') == \
+        'error: ranking "bogus" must be one of python, numpy'
+    if not weighting.NUMPY_AVAILABLE:
+        assert controller.execute('ranking', 'numpy') == \
+            NumpyNotAvailable.message
+        return
+    test_files_path = Path.cwd() / 'test_files'
+    controller.execute('add_shard', str(test_files_path))
+    controller.execute('search_shards', 'lorem')
+    ranked = []
+
+    def rank_scored(*args):
+        ranked.append(args)
+        return rank(*args)
+
+    rank = weighting.rank_scored
+    monkeypatch.setattr(weighting, 'rank_scored', rank_scored)
+    assert controller.execute('ranking', 'numpy') == 'Ranking: numpy'
+    assert controller.engine.use_numpy and controller.shards.use_numpy
+    assert controller.shards.searcher.use_numpy
+    res = controller.execute('search_shards', 'lorem')
+    assert res.search_results[0].documents == [test_files_path / 'a.txt']
+    assert ranked
+    assert controller.execute('ranking', 'python') == 'Ranking: python'
+    assert not controller.shards.searcher.use_numpy
+
+
+@pytest.mark.skipif(not watcher.INOTIFY_AVAILABLE,
+                    reason='inotify is not available')
+def test_watch(controller):
+    assert controller.execute('start_watch') == \
+        'error: you dont have index right now, built it before search'
+    controller.execute('build_index', str(Path.cwd() / 'test_files'))
+    assert controller.execute('start_watch', 'soon') == \
+        'error: watch interval "soon" must be a positive number of seconds'
+    index_watcher = controller.execute('start_watch', '0.5', '30')
+    assert index_watcher.running
+    assert controller.execute('watch_status') is index_watcher
+    assert not controller.execute('stop_watch').running
+    assert controller.execute('stop_watch') == \
+        'error: index watch is not running'
@@ -0,0 +1,66 @@
+import os
+
+import pytest
+
+from foogle.engine.crawler import Crawler, CrawlOptions, SKIP_SYMLINKS, \
+    FOLLOW_SYMLINKS
+from foogle.engine.errors import InvalidRootDirectory
+
+
+@pytest.fixture
+def tree(tmp_path):
+    for i in range(5):
+        directory = tmp_path / f'dir{i}' / 'nested'
+        directory.mkdir(parents=True)
+        (tmp_path / f'dir{i}' / f'top{i}.txt').write_text('x' * i)
+        (directory / f'deep{i}.md').write_text('deep')
+    (tmp_path / 'root.txt').write_text('root')
+    return tmp_path
+
+
+def crawled(root, **options):
+    return {path.relative_to(root).as_posix()
+            for path, _ in Crawler(str(root), options=CrawlOptions(**options))}
+
+
+def test_parallel_matches_sequential(tree):
+    assert crawled(tree, threads=4, queue_size=2) == crawled(tree, threads=1)
+    assert len(crawled(tree)) == 11
+
+
+def test_fingerprints_come_from_scandir(tree):
+    for path, fingerprint in Crawler(str(tree)):
+        assert fingerprint.size == path.stat().st_size
+
+
+def test_filters(tree):
+    assert crawled(tree, max_depth=0) == {'root.txt'}
+    assert crawled(tree, max_depth=1) == \
+        {'root.txt'} | {f'dir{i}/top{i}.txt' for i in range(5)}
+    assert crawled(tree, extensions=frozenset({'.md'})) == \
+        {f'dir{i}/nested/deep{i}.md' for i in range(5)}
+    assert crawled(tree, max_file_size=2) == \
+        {'dir0/top0.txt', 'dir1/top1.txt', 'dir2/top2.txt'}
+
+
+@pytest.mark.skipif(not hasattr(os, 'symlink'), reason='needs symlinks')
+def test_symlink_policies(tree):
+    (tree / 'link.txt').symlink_to(tree / 'root.txt')
+    (tree / 'dir0' / 'loop').symlink_to(tree, target_is_directory=True)
+    default = crawled(tree)
+    assert 'link.txt' in default
+    assert not any(path.startswith('dir0/loop') for path in default)
+    assert 'link.txt' not in crawled(tree, symlinks=SKIP_SYMLINKS)
+    followed = crawled(tree, symlinks=FOLLOW_SYMLINKS, threads=1)
+    assert followed == default
+
+
+def test_abandoned_parallel_crawl_stops(tree):
+    files = iter(Crawler(str(tree), options=CrawlOptions(queue_size=1)))
+    next(files)
+    files.close()
+
+
+def test_invalid_root(tmp_path):
+    with pytest.raises(InvalidRootDirectory):
+        Crawler(str(tmp_path / 'missing'))
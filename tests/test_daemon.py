@@ -0,0 +1,96 @@
+import json
+import socket
+import threading
+from pathlib import Path
+
+import pytest
+
+from foogle.daemon import client as daemon_client
+from foogle.daemon.client import DaemonClient
+from foogle.daemon.server import DaemonServer, remove_stale_socket
+from foogle.engine.errors import DaemonAlreadyRunning, DaemonNotRunning, \
+    NotASocket
+
+
+@pytest.fixture
+def daemon(tmp_path):
+    server = DaemonServer(tmp_path / 'foogle.sock')
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield server
+    server.shutdown()
+    server.server_close()
+    thread.join()
+
+
+def test_daemon_serves_controller_commands(daemon):
+    test_files = Path.cwd() / 'test_files'
+    with DaemonClient(daemon.socket_path) as client:
+        assert client.execute('ping') == 'pong'
+        assert client.execute('build_index', str(test_files)) == \
+            f'Index built for "{test_files}"'
+        assert str(test_files / 'a.txt') in client.execute('search', 'lorem')
+        lines = client.execute('search_batch', ['lorem', 'ipsum'])
+        assert [json.loads(line)['query']['terms']
+                for line in lines.splitlines()] == [['lorem'], ['ipsum']]
+        assert client.execute('nope') == 'error: unknown command "nope"'
+    with DaemonClient(daemon.socket_path) as client:
+        assert str(test_files / 'a.txt') in client.execute('search', 'lorem')
+
+
+def test_daemon_shutdown_removes_socket(tmp_path):
+    server = DaemonServer(tmp_path / 'foogle.sock')
+    thread = threading.Thread(target=server.serve_forever)
+    thread.start()
+    with DaemonClient(server.socket_path) as client:
+        assert client.execute('shutdown') == 'Search daemon stopped'
+    thread.join()
+    server.server_close()
+    assert not server.socket_path.exists()
+    with pytest.raises(DaemonNotRunning):
+        DaemonClient(server.socket_path)
+
+
+def test_stale_socket(daemon, tmp_path):
+    with pytest.raises(DaemonAlreadyRunning):
+        remove_stale_socket(daemon.socket_path)
+    stale_path = tmp_path / 'stale.sock'
+    stale = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    stale.bind(str(stale_path))
+    stale.close()
+    remove_stale_socket(stale_path)
+    assert not stale_path.exists()
+    regular_path = tmp_path / 'regular.sock'
+    regular_path.write_text('keep')
+    with pytest.raises(NotASocket):
+        remove_stale_socket(regular_path)
+    assert regular_path.read_text() == 'keep'
+
+
+def test_daemon_resolves_paths_against_client_cwd(daemon, tmp_path,
+                                                  monkeypatch):
+    (tmp_path / 'docs').mkdir()
+    (tmp_path / 'docs' / 'a.txt').write_text('lorem')
+    (tmp_path / 'robot.txt').write_text('skip/\n')
+    monkeypatch.chdir(tmp_path)
+    with DaemonClient(daemon.socket_path) as client:
+        assert client.execute('build_index', 'docs', 'robot.txt') == \
+            f'Index built for "{tmp_path / "docs"}"'
+        assert client.execute('save_index') == \
+            f'Index for {tmp_path / "docs"} saved'
+        assert (tmp_path / 'search_index').exists()
+        assert client.execute('load_index') == \
+            f'Index for {tmp_path / "docs"} loaded'
+        assert client.execute('add_shard', './docs') == \
+            f'Shard built for "{tmp_path / "docs"}"'
+        assert client.execute('remove_shard', 'docs') == \
+            f'Shard for "{tmp_path / "docs"}" removed'
+
+
+def test_default_socket_path(monkeypatch, tmp_path):
+    monkeypatch.delenv('FOOGLE_SOCKET', raising=False)
+    monkeypatch.setenv('XDG_RUNTIME_DIR', str(tmp_path))
+    assert daemon_client.default_socket_path() == tmp_path / 'foogle.sock'
+    monkeypatch.setenv('FOOGLE_SOCKET', 'other.sock')
+    assert daemon_client.default_socket_path() == \
+        Path.cwd() / 'other.sock'
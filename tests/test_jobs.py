@@ -0,0 +1,65 @@
+import threading
+from pathlib import Path
+
+import pytest
+
+from foogle.engine.errors import BuildCancelledError, BuildJobNotFound
+from foogle.engine.index import Fingerprint
+from foogle.engine.jobs import BuildJobs, BuildProgress
+from foogle.engine.search_engine import SearchEngine
+
+
+def fingerprint(size: int) -> Fingerprint:
+    return Fingerprint(0.0, size, 0)
+
+
+def test_progress_eta_unknown_until_crawl_finished():
+    progress = BuildProgress()
+    documents = progress.discover([(Path('a'), fingerprint(10)),
+                                   (Path('b'), fingerprint(30))])
+    next(documents)
+    progress.scanned(fingerprint(10))
+    assert progress.eta is None
+    list(documents)
+    assert progress.crawl_finished
+    assert progress.bytes_discovered == 40
+    assert progress.eta is not None and progress.eta >= 0
+
+
+def test_progress_cancel():
+    progress = BuildProgress()
+    progress.cancelled.set()
+    with pytest.raises(BuildCancelledError):
+        list(progress.discover([(Path('a'), fingerprint(1))]))
+
+
+def test_cancelled_build_keeps_old_index():
+    engine = SearchEngine()
+    engine.build_index('test_files', '')
+    old_index = engine.index
+    progress = BuildProgress()
+    progress.cancelled.set()
+    with pytest.raises(BuildCancelledError):
+        engine.build_index('test_files', '', progress=progress)
+    assert engine.index is old_index
+
+
+def test_jobs_lifecycle():
+    jobs = BuildJobs()
+    release = threading.Event()
+
+    def build(progress: BuildProgress) -> str:
+        release.wait()
+        progress.check_cancelled()
+        return 'done'
+
+    job = jobs.start(build)
+    assert jobs.get(job.id) is job
+    assert jobs.running()
+    job.cancel()
+    release.set()
+    job.thread.join()
+    assert job.status == 'cancelled'
+    assert not jobs.running()
+    with pytest.raises(BuildJobNotFound):
+        jobs.get('missing')
@@ -0,0 +1,77 @@
+from pathlib import Path
+
+from foogle.engine.metrics import Histogram, Metrics, query_shape
+from foogle.engine.query_parser import QueryParser
+from foogle.engine.search_engine import SearchEngine
+
+
+def test_histogram_quantiles():
+    histogram = Histogram((0.1, 1.0))
+    for value in (0.05, 0.05, 0.5, 2.0):
+        histogram.observe(value)
+    assert histogram.quantile(0.5) == 0.1
+    assert histogram.quantile(0.75) == 1.0
+    assert histogram.quantile(1.0) == float('inf')
+    assert histogram.cumulative() == [('0.1', 2), ('1.0', 3), ('+Inf', 4)]
+
+
+def test_disabled_metrics_record_nothing():
+    metrics = Metrics()
+    with metrics.stage('crawl'):
+        pass
+    metrics.increment('files_indexed')
+    metrics.observe_query('single', 0.01)
+    report = metrics.report()
+    assert (report.stages, report.counters, report.latencies) == ({}, {}, {})
+
+
+def test_query_shape():
+    def shape(query: str) -> str:
+        return query_shape(QueryParser.parse_query(query))
+
+    assert shape('lorem') == 'single'
+    assert shape('lorem && ipsum') == 'and'
+    assert shape('lorem || ipsum') == 'or'
+    assert shape('lorem && -ipsum') == 'not'
+    assert shape('lor*') == 'expansion'
+    assert shape('"lorem ipsum"') == 'phrase'
+
+
+def test_engine_metrics():
+    test_files = Path.cwd() / 'test_files'
+    engine = SearchEngine(metrics=Metrics(enabled=True))
+    engine.build_index(str(test_files), '')
+    engine.search('lorem')
+    engine.search('lorem && ipsum')
+    engine.search_paths('a.txt')
+    report = engine.stats()
+    assert {'crawl', 'classify', 'tokenize', 'invert',
+            'term_dictionary'} <= report.stages.keys()
+    assert report.counters['files_indexed'] > 0
+    assert report.counters['terms_emitted'] > 0
+    assert report.latencies['single'].count == 1
+    assert report.latencies['and'].count == 1
+    assert report.latencies['paths'].count == 1
+    assert report.footprint['postings'] > 0
+    assert engine.stats().footprint is report.footprint
+    engine.build_index(str(test_files), '')
+    assert engine.stats().footprint is not report.footprint
+    exposition = report.prometheus()
+    assert 'foogle_stage_seconds_total{stage="tokenize"}' in exposition
+    assert 'foogle_query_latency_seconds_count{shape="single"} 1' \
+        in exposition
+    assert 'foogle_files_indexed_total' in exposition
+    engine.metrics.reset()
+    assert engine.stats().latencies == {}
+    engine.metrics.enabled = False
+    assert engine.stats().footprint == {}
+
+
+def test_parallel_build_metrics():
+    test_files = Path.cwd() / 'test_files'
+    engine = SearchEngine(metrics=Metrics(enabled=True))
+    engine.build_index(str(test_files), '', workers=2)
+    assert {'classify', 'tokenize'} <= engine.stats().stages.keys()
+    engine = SearchEngine(metrics=Metrics(enabled=True))
+    engine.build_index(str(test_files), '', workers=2, memory_budget=2 ** 20)
+    assert {'classify', 'tokenize'} <= engine.stats().stages.keys()
@@ -0,0 +1,57 @@
+import pytest
+
+from foogle.engine import overlay
+from foogle.engine.overlay import Overlay, OverlaySequence
+
+
+def test_overlay_keeps_base():
+    base = {'a': 1, 'b': 2, 'c': 3}
+    mapping = Overlay(base)
+    mapping['a'] = 10
+    mapping['d'] = 4
+    del mapping['b']
+    assert dict(mapping) == {'a': 10, 'c': 3, 'd': 4}
+    assert len(mapping) == 3
+    assert 'b' not in mapping and 'd' in mapping
+    assert mapping.get('b') is None
+    with pytest.raises(KeyError):
+        del mapping['b']
+    assert base == {'a': 1, 'b': 2, 'c': 3}
+    assert mapping.materialize() == {'a': 10, 'c': 3, 'd': 4}
+    assert mapping == {'a': 10, 'c': 3, 'd': 4}
+
+
+def test_overlay_copy_is_independent():
+    mapping = Overlay({key: key for key in range(100)})
+    mapping[0] = -1
+    copied = Overlay.of(mapping)
+    copied[1] = -1
+    del copied[2]
+    assert mapping[1] == 1 and 2 in mapping
+    assert copied[0] == -1 and copied.base is mapping.base
+    assert len(copied) == 99
+
+
+def test_overlay_compacts():
+    base = {key: key for key in range(8)}
+    mapping = Overlay(base)
+    for key in range(8, 8 + len(base) // overlay.COMPACT_RATIO + 1):
+        mapping[key] = key
+    copied = mapping.copy()
+    assert copied.base is not base and not copied.changes
+    assert copied == mapping
+
+
+def test_overlay_sequence():
+    base = ['a', 'b', 'c']
+    sequence = OverlaySequence(base)
+    sequence[1] = None
+    sequence.append('d')
+    copied = OverlaySequence.of(sequence)
+    copied.append('e')
+    assert list(sequence) == ['a', None, 'c', 'd']
+    assert copied == ['a', None, 'c', 'd', 'e']
+    assert copied.materialize() == ['a', None, 'c', 'd', 'e']
+    assert base == ['a', 'b', 'c']
+    with pytest.raises(IndexError):
+        sequence[4]
@@ -0,0 +1,66 @@
+import pytest
+
+from foogle.engine.planner import QueryPlanner, EXCLUDE, INTERSECT, SCAN
+from foogle.engine.query_parser import QueryParser
+from foogle.engine.search_engine import SearchEngine
+
+
+@pytest.fixture(scope='module')
+def index(tmp_path_factory):
+    tmp_path = tmp_path_factory.mktemp('planner')
+    for i in range(20):
+        words = ['common']
+        if i % 2 == 0:
+            words.append('even')
+        if i % 5 == 0:
+            words.append('fifth')
+        if i == 10:
+            words.append('rare')
+        (tmp_path / f'{i}.txt').write_text(' '.join(words))
+    engine = SearchEngine()
+    engine.build_index(str(tmp_path), '')
+    return engine.index
+
+
+def plan(index, raw_query):
+    planner = QueryPlanner(index)
+    results = {}
+    for query in sorted(QueryParser.parse_query(raw_query), key=str):
+        results[str(query)] = planner.match(query)[1]
+    return planner, results
+
+
+def test_rarest_first(index):
+    planner, _ = plan(index, 'common && even && rare')
+    [branch] = planner.plan().branches
+    assert [(step.operation, step.operand, step.result_size)
+            for step in branch.steps] == [(SCAN, 'rare', 1),
+                                          (INTERSECT, 'even', 1),
+                                          (INTERSECT, 'common', 1)]
+
+
+def test_short_circuit_and_exclusions(index):
+    planner, _ = plan(index, 'rare && fifth && -even && -common')
+    [branch] = planner.plan().branches
+    operations = [(step.operation, step.operand) for step in branch.steps]
+    assert operations[:2] == [(SCAN, 'rare'), (INTERSECT, 'fifth')]
+    assert operations[2][0] == EXCLUDE
+    assert len(operations) == 3
+    assert branch.result_size == 0
+
+
+def test_or_branches_share_sub_results(index):
+    planner, results = plan(index, 'fifth && even && common || '
+                                   'fifth && even && -rare')
+    first, second = planner.plan().branches
+    assert not any(step.shared for step in first.steps)
+    assert [step.shared for step in second.steps[:2]] == [True, True]
+    assert sorted(len(docs) for docs in results.values()) == [1, 2]
+
+
+def test_explain(index):
+    engine = SearchEngine()
+    engine.index = index
+    explained = str(engine.explain('rare && common'))
+    assert 'scan rare [1] -> 1' in explained
+    assert 'intersect common [20] -> 1' in explained
@@ -0,0 +1,33 @@
+import pytest
+
+from foogle.engine import positions
+
+
+@pytest.mark.parametrize('values', [[], [0], [1, 2, 3], [5, 200, 70000,
+                                                         1 << 30]])
+def test_encode_decode(values):
+    assert list(positions.decode(positions.encode(values))) == values
+
+
+def test_encode_is_delta_varint():
+    assert positions.encode([3, 4, 131]) == bytes([3, 1, 0x7F])
+
+
+@pytest.mark.parametrize(('position_lists', 'expected'), [
+    ([[0, 5], [1, 9], [2]], True),
+    ([[0, 5], [6], [8]], False),
+    ([[3], []], False),
+    ([[1, 4], [5]], True),
+])
+def test_phrase(position_lists, expected):
+    assert positions.phrase(position_lists) == expected
+
+
+@pytest.mark.parametrize(('first', 'second', 'distance', 'expected'), [
+    ([1, 20], [4], 3, True),
+    ([10], [4], 5, False),
+    ([10], [4], 6, True),
+    ([], [4], 6, False),
+])
+def test_near(first, second, distance, expected):
+    assert positions.near(first, second, distance) == expected
@@ -0,0 +1,41 @@
+from array import array
+
+import pytest
+
+from foogle.engine import postings
+
+
+def doc_ids(*values):
+    return array(postings.DOC_ID_TYPE, values)
+
+
+@pytest.mark.parametrize(
+    ('left', 'right', 'expected'), [
+        (doc_ids(1, 3, 5, 7), doc_ids(3, 4, 5), doc_ids(3, 5)),
+        (doc_ids(2), doc_ids(*range(100)), doc_ids(2)),
+        (doc_ids(), doc_ids(1, 2), doc_ids())
+    ]
+)
+def test_intersect(left, right, expected):
+    assert postings.intersect(left, right) == expected
+
+
+def test_difference():
+    assert postings.difference(doc_ids(1, 2, 3, 4),
+                               doc_ids(2, 4, 6)) == doc_ids(1, 3)
+
+
+def test_union():
+    assert postings.union(doc_ids(1, 4), doc_ids(2, 4, 6)) == \
+        doc_ids(1, 2, 4, 6)
+
+
+def test_insert_remove():
+    ids = doc_ids(1, 5)
+    weights = array(postings.WEIGHT_TYPE, [0.1, 0.5])
+    postings.insert(ids, weights, 3, 0.3)
+    assert (ids, weights) == (doc_ids(1, 3, 5),
+                              array(postings.WEIGHT_TYPE, [0.1, 0.3, 0.5]))
+    postings.remove(ids, weights, 1)
+    assert (ids, weights) == (doc_ids(3, 5),
+                              array(postings.WEIGHT_TYPE, [0.3, 0.5]))
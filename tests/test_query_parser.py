@@ -1,6 +1,7 @@
 import pytest
 
-from foogle.engine.query_parser import QueryParser, Query
+from foogle.engine.query_parser import QueryParser, Query, Proximity, \
+    Expansion
 from foogle.engine.errors import QueryError
 
 
@@ -9,7 +10,19 @@ from foogle.engine.errors import QueryError
         ('Hello || world', [Query({'hello', }),
                             Query({'world', })]),
         ('ruby || python && -java', [Query({'ruby', }),
-                                     Query({'python', }, {'java', })])
+                                     Query({'python', }, {'java', })]),
+        ('"Hello, big world" && -java',
+         [Query({'hello', 'big', 'world'}, {'java', },
+                {Proximity(('hello', 'big', 'world'))})]),
+        ('"hello" || ruby NEAR/3 python',
+         [Query({'hello', }),
+          Query({'ruby', 'python'}, set(),
+                {Proximity(('ruby', 'python'), 3)})]),
+        ('py* && -j?va && rubby~1 && perl~',
+         [Query(set(), set(), set(),
+                {Expansion('py*'), Expansion('rubby', 1),
+                 Expansion('perl', 2)},
+                {Expansion('j?va')})])
     ]
 )
 def test_queries(raw_query, expected_queries):
@@ -20,7 +33,15 @@ def test_queries(raw_query, expected_queries):
     'query',
     [
         'Hello world',
-        'hello && -hello'
+        'hello && -hello',
+        'hello NEAR/2',
+        'NEAR/2 hello',
+        'hello NEAR/2 -world',
+        'hello NEAR/2 "big world"',
+        '-"hello world"',
+        '*',
+        'hello~3',
+        'py* && -py*'
      ]
 )
 def test_query_error(query):
@@ -0,0 +1,32 @@
+import random
+
+import pytest
+
+from foogle.engine import ranking
+from foogle.engine.search_engine import SearchEngine
+
+
+@pytest.fixture(scope='module')
+def index(tmp_path_factory):
+    tmp_path = tmp_path_factory.mktemp('ranking')
+    generator = random.Random(7)
+    vocabulary = ['alpha', 'beta', 'gamma', 'delta', 'omega']
+    for i in range(60):
+        words = generator.choices(vocabulary, k=generator.randint(3, 30))
+        (tmp_path / f'{i}.txt').write_text(' '.join(words))
+    engine = SearchEngine()
+    engine.build_index(str(tmp_path), '')
+    return engine.index
+
+
+@pytest.mark.parametrize('terms', [['alpha'], ['alpha', 'beta'],
+                                   ['gamma', 'delta', 'omega']])
+@pytest.mark.parametrize('limit', [0, 1, 5, 20])
+def test_top_k_matches_full_ranking(index, terms, limit):
+    candidates = index.postings(terms[0])
+    for term in terms[1:]:
+        candidates = ranking.postings.intersect(candidates,
+                                                index.postings(term))
+    full_ranking = ranking.rank(index, terms, candidates)
+    assert ranking.rank(index, terms, candidates, limit) == \
+        full_ranking[:limit]
@@ -0,0 +1,40 @@
+import pytest
+
+from foogle.engine.robots import ExclusionRules
+from foogle.engine.crawler import Crawler
+
+
+@pytest.mark.parametrize(
+    ('pattern', 'path', 'excluded'), [
+        ('a.txt', 'a.txt', True),
+        ('a.txt', 'deep/dir/a.txt', True),
+        ('a.txt', 'ba.txt', False),
+        ('*.log', 'logs/x.log', True),
+        ('*.log', 'logs/x.log.txt', False),
+        ('/build', 'build', True),
+        ('/build', 'src/build', False),
+        ('src/*.py', 'src/main.py', True),
+        ('src/*.py', 'src/pkg/main.py', False),
+        ('src/**/*.py', 'src/pkg/main.py', True),
+        ('file?.[!c]', 'file1.h', True),
+        ('file?.[!c]', 'file1.c', False)
+    ]
+)
+def test_excludes(pattern, path, excluded):
+    assert ExclusionRules([pattern]).excludes(path) == excluded
+
+
+def test_comments_and_blank_lines_are_skipped():
+    rules = ExclusionRules(['# comment\n', '\n', 'a.txt\n'])
+    assert rules.patterns == ['a.txt']
+
+
+def test_excluded_directories_are_pruned(tmp_path):
+    (tmp_path / 'keep').mkdir()
+    (tmp_path / 'keep' / 'a.txt').write_text('alpha')
+    (tmp_path / 'skip').mkdir()
+    (tmp_path / 'skip' / 'b.txt').write_text('beta')
+    (tmp_path / 'c.log').write_text('gamma')
+    rules = ExclusionRules(['skip', '*.log'])
+    documents = [path for path, _ in Crawler(str(tmp_path), rules)]
+    assert documents == [tmp_path / 'keep' / 'a.txt']
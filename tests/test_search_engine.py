@@ -1,13 +1,21 @@
 import dataclasses
+import os
+import threading
+from array import array
 from pathlib import Path
+from typing import List
 
 import pytest
 
+from foogle.engine import segment
 from foogle.engine.query_parser import Query
 from foogle.engine.search_engine import SearchEngine, \
     SearchByManyQueriesResult, SearchByOneQueryResult
+from foogle.engine.planner import PostingsLookup
 from foogle.engine.errors import IndexNotExistError, IndexEmptyError, \
-    RobotTxtNotFound, InvalidRootDirectory
+    RobotTxtNotFound, InvalidRootDirectory, InvalidWorkersCount, \
+    IndexBrokenError, IndexRecordBrokenError, InvalidResultsLimit, \
+    InvalidResultsOffset, PositionsNotIndexedError, QueryError
 
 
 @pytest.fixture
@@ -29,6 +37,15 @@ def test_search(search_engine):
     assert results == expected
 
 
+def test_search_with_limit(search_engine):
+    test_files = Path.cwd() / 'test_files'
+    search_engine.build_index(str(test_files), '')
+    results, = search_engine.search('lingues', limit=1)
+    assert results.documents == [test_files / 'b.txt']
+    with pytest.raises(InvalidResultsLimit):
+        search_engine.search('lingues', limit=-1)
+
+
 def test_search_with_robot_txt(search_engine):
     test_files = Path.cwd() / 'test_files'
     search_engine.build_index(str(test_files), 'robot.txt')
@@ -43,12 +60,102 @@ def test_save_load(search_engine):
     index_path = Path.cwd() / 'search_index'
     assert index_path.exists()
     index = dataclasses.replace(search_engine.index)
+    expected = search_engine.search('lorem || lingues || -dolor')
     search_engine.index = None
     search_engine.load_index()
-    assert index == search_engine.index
+    assert search_engine.index.is_mapped()
+    assert search_engine.search('lorem || lingues || -dolor') == expected
+    assert index == search_engine.index.materialize()
     index_path.unlink()
 
 
+def test_size_report(search_engine, tmp_path):
+    for i in range(40):
+        (tmp_path / f'document_{i:02}.txt').write_text(
+            ' '.join(f'word{j}' for j in range(i, i + 30)))
+    search_engine.build_index(str(tmp_path), '', store_positions=True)
+    with pytest.raises(IndexNotExistError):
+        search_engine.size_report()
+    search_engine.save_index()
+    report = search_engine.size_report()
+    index_path = Path.cwd() / 'search_index'
+    assert report.file_size == index_path.stat().st_size
+    for name in ('postings', 'forward index', 'paths', 'positions'):
+        assert report.compressed_sizes[name] < report.raw_sizes[name]
+    assert 'postings: ' in str(report)
+    index = search_engine.index
+    search_engine.load_index()
+    index_path.unlink()
+    assert search_engine.index.materialize() == index
+    assert set(search_engine.index.documents) == \
+        {tmp_path / f'document_{i:02}.txt' for i in range(40)}
+
+
+def test_load_broken_index(search_engine):
+    index_path = Path.cwd() / 'search_index'
+    index_path.write_bytes(b'not an index')
+    with pytest.raises(IndexBrokenError):
+        search_engine.load_index()
+    assert not index_path.exists()
+
+
+def test_load_truncated_index(search_engine):
+    search_engine.build_index(str(Path.cwd() / 'test_files'), '')
+    search_engine.save_index()
+    index_path = Path.cwd() / 'search_index'
+    raw_index = index_path.read_bytes()
+    index_path.write_bytes(raw_index[:len(raw_index) // 2])
+    with pytest.raises(IndexBrokenError):
+        search_engine.load_index()
+    assert not index_path.exists()
+
+
+def test_save_undecodable_file_name(search_engine, tmp_path):
+    document = tmp_path / os.fsdecode(b'caf\xe9.txt')
+    try:
+        document.write_text('lorem ipsum')
+    except (OSError, UnicodeEncodeError):
+        pytest.skip('file system does not accept undecodable names')
+    search_engine.build_index(str(tmp_path), '')
+    search_engine.save_index()
+    search_engine.load_index()
+    Path.cwd().joinpath('search_index').unlink()
+    results, = search_engine.search('lorem')
+    assert results.documents == [document]
+    assert document in search_engine.index.fingerprints
+
+
+def test_record_out_of_range(search_engine):
+    search_engine.build_index(str(Path.cwd() / 'test_files'), '')
+    search_engine.save_index()
+    index_path = Path.cwd() / 'search_index'
+    saved_segment = segment.Segment(index_path)
+    index_path.unlink()
+    with pytest.raises(IndexRecordBrokenError):
+        saved_segment.record(segment.TERMS, segment.TERM_RECORD,
+                             saved_segment.terms_count)
+
+
+def test_broken_postings_record(search_engine):
+    test_files = Path.cwd() / 'test_files'
+    search_engine.build_index(str(test_files), '')
+    search_engine.save_index()
+    index_path = Path.cwd() / 'search_index'
+    saved_segment = segment.Segment(index_path)
+    term_id = saved_segment.find_term('lorem')
+    postings_offset = saved_segment.sections[segment.POSTINGS][0] + \
+        saved_segment.record(segment.TERMS, segment.TERM_RECORD, term_id)[2]
+    raw_index = bytearray(index_path.read_bytes())
+    raw_index[postings_offset] ^= 0xFF
+    index_path.write_bytes(bytes(raw_index))
+    search_engine.load_index()
+    index_path.unlink()
+    results, = search_engine.search('lingues')
+    assert len(results.documents) == 2
+    with pytest.raises(IndexRecordBrokenError):
+        search_engine.search('lorem')
+
+
 def test_engine_load_error(search_engine):
     with pytest.raises(IndexNotExistError):
         search_engine.load_index()
@@ -63,9 +170,323 @@ def test_engine_search_error(search_engine):
     'search_arg, expected_error',
     [
         (('./', 'wrong_path'), RobotTxtNotFound),
-        (('wrong_path', 'robot.txt'), InvalidRootDirectory)
+        (('wrong_path', 'robot.txt'), InvalidRootDirectory),
+        (('./', '', 0), InvalidWorkersCount)
     ]
 )
 def test_engine_search_build(search_engine, search_arg, expected_error):
     with pytest.raises(expected_error):
         search_engine.build_index(*search_arg)
+
+
+def test_parallel_build_matches_serial(search_engine):
+    test_files = Path.cwd() / 'test_files'
+    search_engine.build_index(str(test_files), '')
+    serial_index = search_engine.index
+    search_engine.build_index(str(test_files), '', workers=3)
+    parallel_index = search_engine.index
+    assert parallel_index.documents_to_terms == \
+        serial_index.documents_to_terms
+    assert parallel_index.doc_table == serial_index.doc_table
+    assert parallel_index.terms_to_documents == \
+        serial_index.terms_to_documents
+    assert parallel_index.tf == serial_index.tf
+
+
+def test_update_index(search_engine, tmp_path):
+    test_files = Path.cwd() / 'test_files'
+    for doc in test_files.iterdir():
+        (tmp_path / doc.name).write_text(doc.read_text())
+    search_engine.build_index(str(tmp_path), '')
+    (tmp_path / 'a.txt').unlink()
+    (tmp_path / 'b.txt').write_text('Lorem lingues ipsum lorem')
+    (tmp_path / 'nested').mkdir()
+    (tmp_path / 'nested' / 'e.txt').write_text('Europan dreams')
+    result = search_engine.update_index()
+    assert (result.added, result.modified, result.removed) == (1, 1, 1)
+    updated_index = search_engine.index
+    search_engine.build_index(str(tmp_path), '')
+    rebuilt_index = search_engine.index
+    assert updated_index.fingerprints == rebuilt_index.fingerprints
+    assert index_by_path(updated_index) == index_by_path(rebuilt_index)
+
+
+def test_update_paths(search_engine, tmp_path):
+    (tmp_path / 'robot.txt').write_text('ignored/\n')
+    (tmp_path / 'a.txt').write_text('lorem ipsum')
+    (tmp_path / 'old').mkdir()
+    (tmp_path / 'old' / 'b.txt').write_text('lorem dolor')
+    search_engine.build_index(str(tmp_path), str(tmp_path / 'robot.txt'))
+    (tmp_path / 'a.txt').write_text('lorem ipsum sit amet')
+    (tmp_path / 'old' / 'b.txt').unlink()
+    (tmp_path / 'old').rmdir()
+    (tmp_path / 'new').mkdir()
+    (tmp_path / 'new' / 'c.txt').write_text('europan dreams')
+    (tmp_path / 'ignored').mkdir()
+    (tmp_path / 'ignored' / 'd.txt').write_text('hidden')
+    result = search_engine.update_paths([
+        tmp_path / 'a.txt', tmp_path / 'old', tmp_path / 'new',
+        tmp_path / 'ignored' / 'd.txt'])
+    assert (result.added, result.modified, result.removed) == (1, 1, 1)
+    updated_index = search_engine.index
+    search_engine.build_index(str(tmp_path), str(tmp_path / 'robot.txt'))
+    rebuilt_index = search_engine.index
+    assert updated_index.fingerprints == rebuilt_index.fingerprints
+    assert index_by_path(updated_index) == index_by_path(rebuilt_index)
+
+
+def test_update_orders_ties_by_doc_id(search_engine, tmp_path):
+    docs = tmp_path / 'docs'
+    docs.mkdir()
+    for name in ('b.txt', 'c.txt'):
+        (docs / name).write_text('lorem')
+    search_engine.build_index(str(docs), '')
+    (docs / 'a.txt').write_text('lorem')
+    search_engine.update_index()
+    updated = [docs / 'b.txt', docs / 'c.txt', docs / 'a.txt']
+
+    def documents(query: str) -> List[Path]:
+        return search_engine.search(query).search_results[0].documents
+
+    assert documents('lorem') == documents('-dolor') == updated
+    search_engine.save_index(tmp_path / 'index')
+    search_engine.load_index(tmp_path / 'index')
+    assert documents('lorem') == documents('-dolor') == updated
+    search_engine.build_index(str(docs), '')
+    assert documents('lorem') == documents('-dolor') == sorted(updated)
+
+
+def test_update_keeps_published_snapshot(search_engine, tmp_path):
+    (tmp_path / 'a.txt').write_text('lorem ipsum')
+    (tmp_path / 'b.txt').write_text('lorem dolor')
+    search_engine.build_index(str(tmp_path), '')
+    old_index = search_engine.index
+    old_postings = list(old_index.postings('lorem'))
+    (tmp_path / 'b.txt').unlink()
+    (tmp_path / 'c.txt').write_text('lorem sit')
+    search_engine.update_index()
+    assert search_engine.index is not old_index
+    assert list(old_index.postings('lorem')) == old_postings
+    assert old_index.paths(old_postings) == [tmp_path / 'a.txt',
+                                             tmp_path / 'b.txt']
+
+
+def test_concurrent_search_during_rebuild(search_engine):
+    test_files = str(Path.cwd() / 'test_files')
+    search_engine.build_index(test_files, '')
+    expected = search_engine.search('lorem')
+    errors = []
+
+    def search():
+        for _ in range(50):
+            if search_engine.search('lorem') != expected:
+                errors.append('lorem')
+
+    threads = [threading.Thread(target=search) for _ in range(4)]
+    for thread in threads:
+        thread.start()
+    for _ in range(5):
+        search_engine.build_index(test_files, '')
+    for thread in threads:
+        thread.join()
+    assert not errors
+
+
+def index_by_path(index):
+    documents_to_terms = {index.doc_table[doc_id]: terms
+                          for doc_id, terms in
+                          index.documents_to_terms.items()}
+    postings = {}
+    for term, doc_ids in index.terms_to_documents.items():
+        postings[term] = sorted(zip(index.paths(doc_ids), index.tf[term]))
+    return documents_to_terms, postings, index.max_tf
+
+
+def test_postings_are_deduplicated(search_engine):
+    test_files = Path.cwd() / 'test_files'
+    search_engine.build_index(str(test_files), '')
+    index = search_engine.index
+    for term, doc_ids in index.terms_to_documents.items():
+        assert list(doc_ids) == sorted(set(doc_ids))
+        assert len(index.tf[term]) == len(doc_ids)
+
+
+def test_search_page(search_engine, tmp_path):
+    for i, text in enumerate(['lorem', 'lorem lorem ipsum', 'ipsum lorem',
+                              'lorem dolor sit amet']):
+        (tmp_path / f'{i}.txt').write_text(text)
+    search_engine.build_index(str(tmp_path), '')
+    ranked = search_engine.search('lorem').search_results[0].documents
+    [page] = search_engine.search_page('lorem', offset=1, limit=2)
+    assert page.total == len(ranked) == 4
+    assert [path for path, _ in page.hits] == ranked[1:3]
+    [full] = search_engine.search_page('lorem')
+    scores = [score for _, score in full.hits]
+    assert scores == sorted(scores, reverse=True)
+    assert page.hits == full.hits[1:3]
+    with pytest.raises(InvalidResultsOffset):
+        search_engine.search_page('lorem', offset=-1)
+
+
+def test_search_batch_looks_up_shared_terms_once(search_engine, tmp_path,
+                                                 monkeypatch):
+    (tmp_path / 'a.txt').write_text('lorem ipsum')
+    (tmp_path / 'b.txt').write_text('lorem dolor')
+    search_engine.build_index(str(tmp_path), '')
+    looked_up = []
+    missing = PostingsLookup.__missing__
+
+    def lookup(self, term):
+        looked_up.append(term)
+        return missing(self, term)
+
+    monkeypatch.setattr(PostingsLookup, '__missing__', lookup)
+    batches = list(search_engine.search_batch(['lorem', 'lorem && -ipsum',
+                                               'ipsum || dolor']))
+    assert [len(batch) for batch in batches] == [1, 1, 2]
+    assert batches[1][0].hits[0][0] == tmp_path / 'b.txt'
+    assert sorted(looked_up) == ['dolor', 'ipsum', 'lorem']
+
+
+@pytest.fixture
+def phrase_files(tmp_path):
+    (tmp_path / 'a.txt').write_text('the quick brown fox jumps')
+    (tmp_path / 'b.txt').write_text('brown quick the fox')
+    (tmp_path / 'c.txt').write_text('quick and very lazy brown dogs')
+    return tmp_path
+
+
+def phrase_search(search_engine, query):
+    [result] = search_engine.search(query).search_results
+    return sorted(path.name for path in result.documents)
+
+
+@pytest.mark.parametrize('workers', [1, 2])
+def test_phrase_and_near_queries(search_engine, phrase_files, workers):
+    search_engine.build_index(str(phrase_files), '', workers,
+                              store_positions=True)
+    assert phrase_search(search_engine, '"quick brown"') == ['a.txt']
+    assert phrase_search(search_engine, '"the quick brown fox"') == \
+        ['a.txt']
+    assert phrase_search(search_engine, 'quick NEAR/1 the') == \
+        ['a.txt', 'b.txt']
+    assert phrase_search(search_engine, 'quick NEAR/4 brown') == \
+        ['a.txt', 'b.txt', 'c.txt']
+    assert phrase_search(search_engine, 'quick NEAR/3 brown && -dogs') == \
+        ['a.txt', 'b.txt']
+
+
+def test_phrase_queries_after_save_and_update(search_engine, phrase_files):
+    search_engine.build_index(str(phrase_files), '', store_positions=True)
+    search_engine.save_index()
+    search_engine.load_index()
+    (Path.cwd() / 'search_index').unlink()
+    assert search_engine.index.is_mapped()
+    assert phrase_search(search_engine, '"brown fox"') == ['a.txt']
+    (phrase_files / 'c.txt').write_text('lazy brown fox')
+    search_engine.update_index()
+    assert phrase_search(search_engine, '"brown fox"') == ['a.txt', 'c.txt']
+
+
+def test_phrase_query_without_positions(search_engine, phrase_files):
+    search_engine.build_index(str(phrase_files), '')
+    with pytest.raises(PositionsNotIndexedError):
+        search_engine.search('"quick brown"')
+
+
+@pytest.mark.parametrize('use_numpy', [False, True])
+def test_expansion_queries(tmp_path, use_numpy):
+    (tmp_path / 'a.txt').write_text('python programming')
+    (tmp_path / 'b.txt').write_text('pythonic code and pyramids')
+    (tmp_path / 'c.txt').write_text('java programming')
+    engine = SearchEngine(use_numpy=use_numpy)
+    engine.build_index(str(tmp_path), '')
+
+    def names(query):
+        [result] = engine.search(query).search_results
+        return sorted(path.name for path in result.documents)
+
+    assert names('pyth*') == ['a.txt', 'b.txt']
+    assert names('py*') == ['a.txt', 'b.txt']
+    assert names('j?va') == ['c.txt']
+    assert names('pyton~1') == ['a.txt']
+    assert names('programing~') == ['a.txt', 'c.txt']
+    assert names('programming && -pyth*') == ['c.txt']
+    assert names('-pyth*') == ['c.txt']
+    assert names('zz*') == []
+
+
+def test_expansion_on_mapped_index(search_engine, tmp_path):
+    (tmp_path / 'a.txt').write_text('alpha alphabet beta')
+    (tmp_path / 'b.txt').write_text('alps')
+    search_engine.build_index(str(tmp_path), '')
+    search_engine.save_index()
+    search_engine.load_index()
+    (Path.cwd() / 'search_index').unlink()
+    assert search_engine.index.term_dictionary().expand('alp*') == \
+        ['alpha', 'alphabet', 'alps']
+    assert search_engine.index.term_dictionary().expand('bet', 1) == \
+        ['beta']
+    (tmp_path / 'b.txt').unlink()
+    (tmp_path / 'c.txt').write_text('alpine beat')
+    search_engine.update_index()
+    index = search_engine.index
+    assert isinstance(index.terms_to_documents.base, segment.MappedPostings)
+    assert index.term_dictionary().expand('alp*') == \
+        ['alpha', 'alphabet', 'alpine']
+    assert index.term_dictionary().expand('bet', 1) == ['beat', 'beta']
+    assert index.materialize().terms_to_documents == {
+        'alpha': array('I', [0]), 'alphabet': array('I', [0]),
+        'beta': array('I', [0]), 'alpine': array('I', [2]),
+        'beat': array('I', [2])}
+
+
+def test_search_paths(search_engine, tmp_path):
+    (tmp_path / 'docs').mkdir()
+    (tmp_path / 'docs' / 'guide.md').write_text('guide')
+    (tmp_path / 'notes.txt').write_text('notes')
+    search_engine.build_index(str(tmp_path), '')
+    assert search_engine.search_paths('*.md').documents == \
+        [tmp_path / 'docs' / 'guide.md']
+    (tmp_path / 'notes.txt').unlink()
+    (tmp_path / 'docs' / 'index.md').write_text('index')
+    search_engine.update_index()
+    assert search_engine.search_paths('docs/').documents == \
+        [tmp_path / 'docs' / 'guide.md', tmp_path / 'docs' / 'index.md']
+    assert search_engine.search_paths('notes').documents == []
+    search_engine.save_index()
+    search_engine.load_index()
+    (Path.cwd() / 'search_index').unlink()
+    assert search_engine.search_paths('IND*').documents == \
+        [tmp_path / 'docs' / 'index.md']
+    with pytest.raises(QueryError):
+        search_engine.search_paths('')
+
+
+def test_search_paths_without_content(search_engine, tmp_path):
+    (tmp_path / 'photo.png').write_bytes(bytes(range(256)))
+    (tmp_path / 'empty.log').write_text('')
+    (tmp_path / 'notes.txt').write_text('lorem')
+    search_engine.build_index(str(tmp_path), '')
+    assert search_engine.search_paths('photo').documents == \
+        [tmp_path / 'photo.png']
+    assert search_engine.search_paths('*.log').documents == \
+        [tmp_path / 'empty.log']
+    assert search_engine.index.documents == {tmp_path / 'notes.txt'}
+    results, = search_engine.search('-ipsum')
+    assert results.documents == [tmp_path / 'notes.txt']
+    (tmp_path / 'empty.log').write_text('lorem ipsum')
+    (tmp_path / 'photo.png').unlink()
+    (tmp_path / 'logo.png').write_bytes(bytes(range(256)))
+    search_engine.update_index()
+    assert search_engine.search_paths('*.png').documents == \
+        [tmp_path / 'logo.png']
+    results, = search_engine.search('ipsum')
+    assert results.documents == [tmp_path / 'empty.log']
+    index = search_engine.index
+    search_engine.save_index()
+    search_engine.load_index()
+    (Path.cwd() / 'search_index').unlink()
+    assert search_engine.index.materialize() == index
+    assert search_engine.search_paths('png').documents == \
+        [tmp_path / 'logo.png']
@@ -0,0 +1,106 @@
+from pathlib import Path
+
+import pytest
+
+from foogle.engine.search_engine import SearchEngine
+from foogle.engine.shards import ShardedSearchEngine
+from foogle.engine.errors import IndexEmptyError, IndexNotExistError, \
+    InvalidResultsOffset, ShardNotFound
+
+DOCUMENTS = {
+    'first/a.txt': 'apple banana apple cherry',
+    'first/b.txt': 'banana cherry cherry',
+    'first/c.txt': 'apple',
+    'second/d.txt': 'apple banana durian',
+    'second/e.txt': 'durian durian banana',
+    'second/f.txt': 'cherry elderberry apple apple',
+}
+
+
+@pytest.fixture
+def corpus(tmp_path):
+    for name, text in DOCUMENTS.items():
+        path = tmp_path / name
+        path.parent.mkdir(exist_ok=True)
+        path.write_text(text)
+    return tmp_path
+
+
+@pytest.fixture
+def sharded(corpus):
+    engine = ShardedSearchEngine(use_numpy=False)
+    engine.build_shard(str(corpus / 'first'), '')
+    engine.build_shard(str(corpus / 'second'), '')
+    return engine
+
+
+def scored_hits(engine, query, offset=0, limit=None):
+    return [[(path, pytest.approx(score)) for path, score in result.hits]
+            for result in engine.search_page(query, offset, limit)]
+
+
+@pytest.mark.parametrize('query', [
+    'apple', 'banana && cherry', 'apple && durian', 'apple && -banana',
+    'cherry || durian', 'missing', 'apple && missing', '-apple',
+])
+@pytest.mark.parametrize('use_numpy', [False, True])
+def test_sharded_ranking_matches_single_index(corpus, query, use_numpy):
+    single = SearchEngine(use_numpy=use_numpy)
+    single.build_index(str(corpus), '')
+    sharded = ShardedSearchEngine(use_numpy=use_numpy)
+    sharded.build_shard(str(corpus / 'first'), '')
+    sharded.build_shard(str(corpus / 'second'), '')
+    expected = [sorted(hits) for hits in scored_hits(single, query)]
+    assert [sorted(hits) for hits in scored_hits(sharded, query)] == expected
+    assert [result.total for result in sharded.search_page(query)] == \
+        [result.total for result in single.search_page(query)]
+
+
+def test_merged_top_results(sharded, corpus):
+    hits = scored_hits(sharded, 'apple')[0]
+    scores = [score.expected for _, score in hits]
+    assert scores == sorted(scores, reverse=True)
+    assert scored_hits(sharded, 'apple', 1, 2)[0] == hits[1:3]
+    [result] = sharded.search('apple', limit=2)
+    assert result.documents == [path for path, _ in hits[:2]]
+    with pytest.raises(InvalidResultsOffset):
+        sharded.search_page('apple', -1)
+
+
+def test_shards_refresh_independently(sharded, corpus):
+    first = sharded.shards[corpus / 'first']
+    (corpus / 'second' / 'g.txt').write_text('apple figs')
+    result = sharded.update_shard(str(corpus / 'second'))
+    assert result.added == 1
+    assert sharded.shards[corpus / 'first'] is first
+    [result] = sharded.search('figs')
+    assert result.documents == [corpus / 'second' / 'g.txt']
+    sharded.remove_shard(str(corpus / 'second'))
+    [result] = sharded.search('durian')
+    assert result.documents == []
+    with pytest.raises(ShardNotFound):
+        sharded.remove_shard(str(corpus / 'second'))
+
+
+def test_save_load_shards(sharded, tmp_path):
+    shards_path = tmp_path / 'shards'
+    expected = sharded.search_page('apple || banana && durian')
+    sharded.save_index(shards_path)
+    assert len(list(shards_path.iterdir())) == 2
+    loaded = ShardedSearchEngine(use_numpy=False)
+    loaded.load_index(shards_path)
+    assert all(index.is_mapped() for index in loaded.shards.values())
+    assert [result.hits for result in
+            loaded.search_page('apple || banana && durian')] == \
+        [result.hits for result in expected]
+    loaded.remove_shard(str(Path(tmp_path / 'first')))
+    loaded.save_index(shards_path)
+    assert len(list(shards_path.iterdir())) == 1
+
+
+def test_empty_sharded_engine(tmp_path):
+    engine = ShardedSearchEngine()
+    with pytest.raises(IndexEmptyError):
+        engine.search('apple')
+    with pytest.raises(IndexNotExistError):
+        engine.load_index(tmp_path)
@@ -0,0 +1,76 @@
+import collections
+from pathlib import Path
+
+import pytest
+
+from foogle.engine import spimi
+from foogle.engine.search_engine import SearchEngine
+from foogle.engine.errors import InvalidMemoryBudget
+
+WORDS = ['alpha', 'beta', 'gamma', 'delta', 'epsilon', 'zeta', 'eta']
+
+
+@pytest.fixture
+def corpus(tmp_path):
+    root = tmp_path / 'corpus'
+    for i in range(30):
+        directory = root / f'dir{i % 3}'
+        directory.mkdir(parents=True, exist_ok=True)
+        words = [WORDS[(i * j) % len(WORDS)] for j in range(i % 7 + 3)]
+        (directory / f'file{i}.txt').write_text(' '.join(words))
+    (root / 'empty.txt').write_text('')
+    (root / 'photo.png').write_bytes(bytes(range(256)))
+    return root
+
+
+@pytest.mark.parametrize('memory_budget', [1, 2000, 2 ** 30])
+@pytest.mark.parametrize('store_positions', [False, True])
+def test_external_build_matches_in_memory(corpus, memory_budget,
+                                          store_positions):
+    expected = SearchEngine()
+    expected.build_index(str(corpus), '', store_positions=store_positions)
+    engine = SearchEngine()
+    engine.build_index(str(corpus), '', store_positions=store_positions,
+                       memory_budget=memory_budget)
+    assert engine.index.is_mapped()
+    assert not (Path.cwd() / 'search_index').exists()
+    index = engine.index.materialize()
+    index.mtime = expected.index.mtime
+    assert index == expected.index
+    assert [result.hits for result in engine.search_page('alpha || eta')] \
+        == [result.hits for result in expected.search_page('alpha || eta')]
+
+
+def test_external_build_with_workers(corpus):
+    expected = SearchEngine()
+    expected.build_index(str(corpus), '')
+    engine = SearchEngine()
+    engine.external_chunk_size = 4
+    engine.build_index(str(corpus), '', workers=2, memory_budget=500)
+    assert engine.index.materialize().terms_to_documents == \
+        expected.index.terms_to_documents
+
+
+def test_invalid_memory_budget(corpus):
+    with pytest.raises(InvalidMemoryBudget):
+        SearchEngine().build_index(str(corpus), '', memory_budget=0)
+
+
+def test_builder_spills_runs():
+    builder = spimi.ExternalIndexBuilder(memory_budget=1)
+    for terms in ['a b', 'b c', 'c a a']:
+        builder.add_document(Path(terms), collections.Counter(terms.split()))
+    assert builder.runs_count == 3
+    merged = [(term, doc_ids, counts) for term, doc_ids, counts, _
+              in spimi.merge_postings(builder.runs)]
+    assert merged == [(b'a', [0, 2], [1, 2]), (b'b', [0, 1], [1, 1]),
+                      (b'c', [1, 2], [1, 1])]
+
+
+def test_forward_sorter_merges_runs():
+    sorter = spimi.ForwardSorter(memory_budget=1)
+    for doc_id, term_id in [(2, 0), (0, 1), (1, 1), (0, 2), (2, 3)]:
+        sorter.add(doc_id, term_id, term_id + 1, b'')
+    assert len(sorter.runs) == 5
+    assert [(doc_id, forward) for doc_id, forward, _ in sorter.documents()] \
+        == [(0, [(1, 2), (2, 3)]), (1, [(1, 2)]), (2, [(0, 1), (3, 4)])]
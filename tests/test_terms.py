@@ -0,0 +1,79 @@
+import random
+import re
+
+import pytest
+
+from foogle.engine.terms import TermDictionary
+
+
+def levenshtein(first, second):
+    row = list(range(len(second) + 1))
+    for i, first_char in enumerate(first, 1):
+        previous, row[0] = row[0], i
+        for j, second_char in enumerate(second, 1):
+            previous, row[j] = row[j], min(row[j] + 1, row[j - 1] + 1,
+                                           previous + (first_char !=
+                                                       second_char))
+    return row[-1]
+
+
+@pytest.fixture(scope='module')
+def vocabulary():
+    generator = random.Random(3)
+    return sorted({''.join(generator.choices('abcde', k=generator.randint(
+        1, 7))) for _ in range(3000)})
+
+
+def test_prefix_range(vocabulary):
+    dictionary = TermDictionary(vocabulary)
+    start, end = dictionary.prefix_range('ab')
+    assert vocabulary[start:end] == [term for term in vocabulary
+                                     if term.startswith('ab')]
+
+
+@pytest.mark.parametrize('pattern', ['ab*', 'a?c', '*de', 'b*a?', 'c*d*e'])
+def test_wildcard(vocabulary, pattern):
+    dictionary = TermDictionary(vocabulary, max_expansions=10 ** 6)
+    regex = pattern.replace('?', '.').replace('*', '.*')
+    assert dictionary.expand(pattern) == [
+        term for term in vocabulary if re.fullmatch(regex, term)]
+
+
+@pytest.mark.parametrize(('word', 'distance'), [('abc', 1), ('eeda', 2),
+                                                ('a', 1), ('bacde', 0)])
+def test_fuzzy(vocabulary, word, distance):
+    dictionary = TermDictionary(vocabulary, max_expansions=10 ** 6)
+    expected = sorted((levenshtein(word, term), term) for term in vocabulary
+                      if levenshtein(word, term) <= distance)
+    assert dictionary.expand(word, distance) == \
+        [term for _, term in expected]
+
+
+def test_expansions_are_capped_and_cached(vocabulary):
+    dictionary = TermDictionary(vocabulary, max_expansions=5)
+    expanded = dictionary.expand('a*')
+    assert expanded == vocabulary[:5]
+    assert dictionary.expand('a*') is expanded
+    assert len(dictionary.expand('abc', 2)) == 5
+
+
+def test_updated_dictionary(vocabulary):
+    dictionary = TermDictionary(vocabulary, max_expansions=10 ** 6)
+    dictionary.expand('ab*')
+    updated = dictionary.updated(['abzz', 'eeeeeeee'], ['ab', 'abc'])
+    updated = updated.updated(['ab'], ['abzz'])
+    expected = sorted(set(vocabulary) - {'abc'} | {'eeeeeeee'})
+    assert list(updated) == expected
+    assert updated.terms is vocabulary
+    assert updated.expand('ab*') == [term for term in expected
+                                     if term.startswith('ab')]
+    assert updated.expand('abc', 1) == TermDictionary(
+        expected, max_expansions=10 ** 6).expand('abc', 1)
+    assert dictionary.expand('ab*') == [term for term in vocabulary
+                                        if term.startswith('ab')]
+
+
+def test_updated_dictionary_compacts():
+    dictionary = TermDictionary(['a', 'b']).updated(['c'], ['a'])
+    assert dictionary.terms == ['b', 'c']
+    assert not dictionary.added and not dictionary.removed
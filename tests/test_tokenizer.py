@@ -0,0 +1,47 @@
+import io
+import re
+
+import pytest
+
+from foogle.engine import positions
+from foogle.engine.tokenizer import Tokenizer
+
+TEXT = 'Lorem ipsum_dolor-sit, AMET consectetuer!\n' \
+       'Ещё one line\twith   tabs and snake_case_words 42x\n' * 7
+
+
+def line_tokens(text):
+    terms = []
+    for line in io.StringIO(text):
+        terms.extend(re.sub(r'[\W_\-]', ' ', line.lower()).split())
+    return terms
+
+
+@pytest.mark.parametrize('chunk_size', [1, 3, 7, 64, 1 << 16])
+def test_tokens_split_across_chunks(chunk_size):
+    tokenizer = Tokenizer(chunk_size=chunk_size)
+    assert list(tokenizer.tokens(io.StringIO(TEXT))) == line_tokens(TEXT)
+
+
+@pytest.mark.parametrize('chunk_size', [2, 5, 1 << 16])
+def test_max_token_length(chunk_size):
+    tokenizer = Tokenizer(chunk_size=chunk_size, max_token_length=4)
+    text = 'tiny ' + 'x' * 50 + ' word huge' + 'y' * 20
+    assert list(tokenizer.tokens(io.StringIO(text))) == ['tiny', 'word']
+
+
+def test_max_document_size():
+    tokenizer = Tokenizer(chunk_size=4, max_document_size=11)
+    assert list(tokenizer.tokens(io.StringIO('alpha beta gamma'))) == \
+        ['alpha', 'beta']
+
+
+def test_count_positions(tmp_path):
+    document = tmp_path / 'doc.txt'
+    document.write_text('to be or not to be')
+    counts, term_positions = Tokenizer(chunk_size=3).count_positions(
+        document, 'utf-8')
+    assert counts == Tokenizer().count(document, 'utf-8')
+    assert {term: list(positions.decode(encoded))
+            for term, encoded in term_positions.items()} == \
+        {'to': [0, 4], 'be': [1, 5], 'or': [2], 'not': [3]}
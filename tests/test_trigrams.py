@@ -0,0 +1,64 @@
+from pathlib import Path
+
+import pytest
+
+from foogle.engine import trigrams
+from foogle.engine.index import Index
+
+ROOT = Path('/root')
+PATHS = ['docs/Readme.md', 'docs/guide/intro.md', 'src/app/main.py',
+         'src/app/test_main.py', 'src/lib/utils.py', 'notes.txt']
+
+
+@pytest.fixture
+def index():
+    doc_table = [ROOT / path for path in PATHS]
+    return Index(ROOT, 0.0, doc_table,
+                 {doc_id: {} for doc_id in range(len(doc_table))},
+                 {}, {}, {}, {},
+                 trigrams=trigrams.build(ROOT, doc_table))
+
+
+def names(found):
+    return [path.relative_to(ROOT).as_posix() for path in found]
+
+
+def test_trigrams():
+    assert trigrams.trigrams('abcd') == {'abc', 'bcd'}
+    assert trigrams.trigrams('ab') == set()
+
+
+@pytest.mark.parametrize('pattern, expected', [
+    ('readme', ['docs/Readme.md']),
+    ('app/', ['src/app/main.py', 'src/app/test_main.py']),
+    ('main.py', ['src/app/main.py', 'src/app/test_main.py']),
+    ('.py', ['src/app/main.py', 'src/app/test_main.py',
+             'src/lib/utils.py']),
+    ('missing', []),
+    ('*.md', ['docs/Readme.md', 'docs/guide/intro.md']),
+    ('test_*.py', ['src/app/test_main.py']),
+    ('src/*/ma?n.py', ['src/app/main.py']),
+    ('[nu]*', ['src/lib/utils.py', 'notes.txt']),
+    ('docs/*', ['docs/Readme.md', 'docs/guide/intro.md']),
+])
+def test_search(index, pattern, expected):
+    assert names(trigrams.search(index, pattern)) == expected
+
+
+def test_search_limit(index):
+    assert names(trigrams.search(index, '*.py', 2)) == \
+        ['src/app/main.py', 'src/app/test_main.py']
+
+
+def test_add_and_remove_paths(index):
+    snapshot = dict(index.trigrams)
+    copied = set()
+    index.trigrams = dict(index.trigrams)
+    index.doc_table.append(ROOT / 'src/lib/main_utils.py')
+    trigrams.add_path(index, len(PATHS), copied)
+    trigrams.remove_path(index, 2, copied)
+    index.doc_table[2] = None
+    assert names(trigrams.search(index, 'main')) == \
+        ['src/app/test_main.py', 'src/lib/main_utils.py']
+    assert snapshot['mai'] is not index.trigrams['mai']
+    assert list(snapshot['mai']) == [2, 3]
@@ -0,0 +1,89 @@
+import time
+
+import pytest
+
+from foogle.engine import watcher
+from foogle.engine.search_engine import SearchEngine
+from foogle.engine.watcher import IndexWatcher
+
+pytestmark = pytest.mark.skipif(not watcher.INOTIFY_AVAILABLE,
+                                reason='inotify is not available')
+
+
+def wait_for(condition, timeout=5.0):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if condition():
+            return True
+        time.sleep(0.02)
+    return False
+
+
+@pytest.fixture
+def engine(tmp_path):
+    root = tmp_path / 'root'
+    (root / 'docs').mkdir(parents=True)
+    (root / 'docs' / 'a.txt').write_text('lorem ipsum')
+    (root / 'skip').mkdir()
+    robot_txt = tmp_path / 'robot.txt'
+    robot_txt.write_text('skip/\n')
+    search_engine = SearchEngine()
+    search_engine.build_index(str(root), str(robot_txt))
+    return search_engine
+
+
+def test_watch_applies_batched_changes(engine, tmp_path):
+    root = tmp_path / 'root'
+    index_path = tmp_path / 'search_index'
+    index_watcher = IndexWatcher(engine, debounce=0.05,
+                                 checkpoint_interval=0.05,
+                                 index_path=index_path).start()
+    try:
+        assert root / 'skip' not in index_watcher.directories.values()
+        (root / 'docs' / 'b.txt').write_text('europan dreams')
+        (root / 'docs' / 'a.txt').unlink()
+        (root / 'fresh').mkdir()
+        (root / 'fresh' / 'c.txt').write_text('lorem dreams')
+        (root / 'skip' / 'd.txt').write_text('dreams')
+        assert wait_for(lambda: {path.name for path in engine.index.paths(
+            engine.index.postings('dreams'))} == {'b.txt', 'c.txt'})
+        assert not engine.index.postings('ipsum')
+        assert wait_for(index_path.exists)
+    finally:
+        index_watcher.stop()
+    assert index_watcher.status == watcher.STOPPED
+    assert index_watcher.changes.added == 2
+    assert index_watcher.changes.removed == 1
+    loaded = SearchEngine()
+    loaded.load_index(index_path)
+    assert loaded.index.fingerprints == engine.index.fingerprints
+
+
+def test_watch_stops_when_root_changes(engine, tmp_path):
+    index_watcher = IndexWatcher(engine, debounce=0.01,
+                                 index_path=tmp_path / 'search_index').start()
+    other = tmp_path / 'other'
+    other.mkdir()
+    engine.build_index(str(other), '')
+    (tmp_path / 'root' / 'docs' / 'b.txt').write_text('lorem')
+    assert wait_for(lambda: not index_watcher.thread.is_alive())
+    assert index_watcher.message == 'index root changed, watching stopped'
+
+
+def test_watch_backs_off_while_lock_is_busy(engine, tmp_path):
+    index_watcher = IndexWatcher(engine, debounce=0.0,
+                                 checkpoint_interval=0.0,
+                                 index_path=tmp_path / 'search_index')
+    index_watcher.pending.add(tmp_path / 'root' / 'docs' / 'a.txt')
+    index_watcher.first_event = index_watcher.last_event = 0.0
+    index_watcher.dirty = True
+    with index_watcher.lock:
+        index_watcher.flush()
+        assert index_watcher.timeout() == watcher.POLL_INTERVAL
+        index_watcher.checkpoint()
+        assert index_watcher.timeout() == watcher.POLL_INTERVAL
+    assert index_watcher.pending
+    index_watcher.flush()
+    assert not index_watcher.lock_busy
+    assert not index_watcher.pending
+    index_watcher.inotify.close()
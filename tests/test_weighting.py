@@ -0,0 +1,40 @@
+import pytest
+
+from foogle.engine import ranking, weighting
+from foogle.engine.search_engine import SearchEngine
+
+numpy = pytest.importorskip('numpy')
+
+
+@pytest.fixture(scope='module')
+def engines(tmp_path_factory):
+    tmp_path = tmp_path_factory.mktemp('weighting')
+    words = ['alpha', 'beta', 'gamma', 'delta', 'omega']
+    for i in range(40):
+        text = ' '.join(words[j % len(words)] for j in range(i, i * 3 + 2))
+        (tmp_path / f'{i}.txt').write_text(text)
+    python_engine = SearchEngine(use_numpy=False)
+    python_engine.build_index(str(tmp_path), '')
+    numpy_engine = SearchEngine(use_numpy=True)
+    numpy_engine.build_index(str(tmp_path), '')
+    return python_engine, numpy_engine
+
+
+def test_invert_matches_python(engines):
+    python_engine, numpy_engine = engines
+    assert numpy_engine.index.terms_to_documents == \
+        python_engine.index.terms_to_documents
+    assert numpy_engine.index.tf == python_engine.index.tf
+    assert numpy_engine.index.max_tf == python_engine.index.max_tf
+
+
+@pytest.mark.parametrize('terms', [['alpha'], ['beta', 'omega']])
+@pytest.mark.parametrize('limit', [None, 0, 3])
+def test_rank_matches_python(engines, terms, limit):
+    index = engines[0].index
+    candidates = index.postings(terms[0])
+    for term in terms[1:]:
+        candidates = ranking.postings.intersect(candidates,
+                                                index.postings(term))
+    assert weighting.rank(index, terms, candidates, limit) == \
+        ranking.rank(index, terms, candidates, limit)